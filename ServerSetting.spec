@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('conf/app.json', 'conf'), ('conf/setting_key_map.json', 'conf'), ('conf/category.json', 'conf'), ('images/256.ico', 'images'), ('plugins/rcon_plugin.py', 'plugins'), ('plugins/rest_api_plugin.py', 'plugins')],
-    hiddenimports=['PySide6.QtGui', 'PySide6.QtWidgets'],
+    hiddenimports=['PySide6.QtGui', 'PySide6.QtWidgets', 'lib.rest_cache'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -1,7 +1,7 @@
 import logging
 import os
 import sys
-import json
+import time
 import importlib.util
 from typing import Union
 from datetime import datetime
@@ -12,9 +12,31 @@ from discord.app_commands import Choice
 import psutil
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 import asyncio
-from lib.server_control import update_server, start_server, stop_server, check_server_status, check_memory_usage
+from lib.server_control import update_server, start_server, stop_server, check_server_status, check_memory_usage, UPDATE_SUCCESS_TITLE
 from lib.config import Config
+from lib.circuit_breaker import CircuitOpenError
+from lib.metrics_store import MetricsStore, MetricsCollector
+from lib.player_tracker import PlayerStore, PlayerTracker, format_duration
+from lib.steamcmd_runner import ProgressThrottle, format_progress
+from lib.update_checker import UpdateChecker, SteamCmdAppInfoProvider, read_local_build_id
+from lib.staged_update import StagedUpdater
+from lib.integrity import IntegrityVerifier
+from lib.update_orchestrator import UpdateOrchestrator
+from lib.readiness import ReadinessProbe, BootHistory, DEFAULT_GAME_PORT
+from lib.instances import ServerInstance, ProcessSnapshot, load_instances
+from lib.watchdog import ServerWatchdog, LOG_SUBDIR
+from lib.launch_profiles import get_launch_profiles, get_profile, WindowsServerLauncher
+from lib.benchmark import LaunchBenchmark, format_report
+from lib import resource_manager
+from lib.backup import BackupEngine, SAVE_SUBDIR
+from lib.retention import select_expired, DiskForecaster
+from lib.savedata import world_statistics, find_world_dir
+from lib.log_tailer import LogTailer, compile_patterns
+from lib.chat_bridge import ChatBridge
+from lib.discord_outbox import OutboundQueue
+from lib.response_renderer import ResponseRenderer, PaginatorView, ROWS_PER_PAGE, MAX_PAGES
 
 class DiscordBot:
     def __init__(self, token, channel_id, server_path, server_exe, server_cmd_exe, steamcmd_path, app_id, send_flag = True):
@@ -34,6 +56,8 @@ class DiscordBot:
         self.config = Config.load_config()
 
         # pluginsフォルダ内のプラグインを読み込む
+        self.rcon_plugin = None
+        self.rest_api_plugin = None
         self._import_plugins()
 
         # RCONプラグインの使用例
@@ -44,28 +68,162 @@ class DiscordBot:
         if "RestAPIPlugin" in self.plugins:
             self.rest_api_plugin = self.plugins["RestAPIPlugin"]
 
+        # 管理するサーバー（app.json のサーバーと、設定 instances の追加のインスタンス）
+        self.primary_instance = ServerInstance(
+            self.config.get("instance_name", "default"), self.server_path, self.server_exe, self.server_cmd_exe,
+            self.app_id, game_port=int(self.config.get("game_port", DEFAULT_GAME_PORT))
+        )
+        self.primary_instance.rest_api_plugin = self.rest_api_plugin
+        self.primary_instance.rcon_plugin = self.rcon_plugin
+        self.instances = load_instances(self.primary_instance, self.config)
+        self._create_instance_plugins()
+
         # 状態を追跡するための変数を初期化
         self.is_first_run = True
         self.last_alert_level = None
-        self.last_server_status = None
+        # 監視の1周期ごとのプロセス一覧（全インスタンスで共有する）
+        self.process_snapshot = None
+
+        # メトリック時系列ストア（REST APIプラグインがある場合のみ収集）
+        self.metrics_store = None
+        self.metrics_collector = None
+        if self.rest_api_plugin is not None:
+            interval = float(self.config.get("metrics_interval", 30))
+            self.metrics_store = MetricsStore(
+                os.path.join(Config.get_config_directory(), "metrics.db"),
+                sample_interval=interval
+            )
+            self.metrics_collector = MetricsCollector(self.rest_api_plugin, self.metrics_store, interval)
+
+        # プレイヤーの参加/退出とプレイ時間の記録
+        self.player_tracker = None
+        if self.rest_api_plugin is not None:
+            player_store = PlayerStore(os.path.join(Config.get_config_directory(), "players.db"))
+            self.player_tracker = PlayerTracker(
+                self.rest_api_plugin, player_store, float(self.config.get("player_poll_interval", 15)),
+                offline_after_failures=int(self.config.get("player_offline_after_failures", 3)),
+                process_check=self.rest_api_plugin.breaker.process_check
+            )
+            self.player_tracker.add_listener(self._on_player_event)
+
+        # アップデート有無の確認（ローカルとリモートのビルドIDを比較）
+        self.update_checker = UpdateChecker(
+            self.server_path, self.app_id, SteamCmdAppInfoProvider(self.steamcmd_path),
+            cache_ttl=float(self.config.get("update_check_cache_seconds", 600))
+        )
+
+        # 段階的アップデート（カウントダウン中にステージングへダウンロードし、停止時に入れ替える）
+        self.staged_updater = StagedUpdater(
+            self.steamcmd_path, self.server_path, self.app_id, self.config.get("staging_dir") or None
+        )
+
+        # インストールディレクトリの整合性検証（validate が必要かの判断に使用）
+        self.integrity_verifier = IntegrityVerifier(
+            self.server_path, os.path.join(Config.get_config_directory(), "install_manifest.json")
+        )
+
+        self.manifest_task = None
+        self.benchmark_running = False
+
+        # CPU割り当て・優先度の管理（設定 resource_policy がある場合のみ有効）
+        self.resource_manager = None
+        if self.config.get("resource_policy") is not None:
+            self.resource_manager = resource_manager.configure(self.config.get("resource_policy"))
+
+        # 起動後の準備完了確認と起動時間の記録
+        self.boot_history = BootHistory(os.path.join(Config.get_config_directory(), "boot_history.jsonl"))
+
+        # クラッシュ監視（意図しない終了時に自動で再起動する）
+        self.watchdog = None
+        if self.config.get("watchdog_enabled", True):
+            self.watchdog = ServerWatchdog(
+                self.server_cmd_exe, self._watchdog_restart, self._on_server_crash,
+                log_dir=os.path.join(self.server_path, LOG_SUBDIR),
+                base_delay=float(self.config.get("watchdog_base_delay", 5)),
+                max_delay=float(self.config.get("watchdog_max_delay", 300)),
+                max_crashes=int(self.config.get("watchdog_max_crashes", 3)),
+                window=float(self.config.get("watchdog_window_seconds", 600)),
+                install_dir=self._process_filter(self.primary_instance)
+            )
+
+        # セーブデータの重複排除バックアップ（再起動・アップデートの前と定期的に作成する）
+        self.backup_engine = BackupEngine(
+            os.path.join(self.server_path, SAVE_SUBDIR),
+            self.config.get("backup_dir") or self.server_path.rstrip("\\/") + "_backups",
+            workers=self.config.get("backup_workers")
+        )
+        self.backup_lock = asyncio.Lock()
+
+        # バックアップの使用量の推移を記録し、インストール先のボリュームの空き容量がなくなる時期を予測する
+        self.disk_forecaster = DiskForecaster(
+            os.path.join(Config.get_config_directory(), "disk_usage.jsonl"), self.server_path
+        )
+        self.last_disk_alert = None
+
+        # サーバーログの監視（参加・退出・チャット・エラーなどをイベントとして通知する）
+        self.log_tailer = None
+        if self.config.get("log_tailer_enabled", True):
+            self.log_tailer = LogTailer(
+                os.path.join(self.server_path, LOG_SUBDIR),
+                patterns=compile_patterns(self.config.get("log_patterns")),
+                interval=float(self.config.get("log_poll_interval", 1))
+            )
+            self.log_tailer.subscribe(self._on_log_event)
+            for plugin in self.plugins.values():
+                if hasattr(plugin, "on_log_event"):
+                    self.log_tailer.subscribe(plugin.on_log_event)
+
+        # チャンネルごとの送信キュー（Embed のまとめ送り・状態通知の置き換え・送信間隔の制御）
+        self.outboxes = {}
+
+        # Discord とゲーム内チャットの双方向の転送（設定 chat_bridge_channel_id がある場合のみ有効）
+        self.chat_bridge = None
+        self.chat_bridge_channel_id = int(self.config.get("chat_bridge_channel_id") or 0)
+        if self.chat_bridge_channel_id and self.log_tailer is not None:
+            self.chat_bridge = ChatBridge(
+                self._send_bridge_to_discord,
+                self._send_bridge_to_game if self.rest_api_plugin is not None else None,
+                self.config
+            )
+            self.log_tailer.subscribe(self.chat_bridge.from_game, kinds=["chat"])
+
+        # 複数インスタンスの一括アップデート（共有インストールを1回だけ更新し、各インスタンスへ配布する）
+        self.update_orchestrator = None
+        canonical_dir = self.config.get("canonical_install_dir")
+        if canonical_dir:
+            self.update_orchestrator = UpdateOrchestrator(
+                self.steamcmd_path, canonical_dir, self.app_id,
+                [self.server_path] + list(self.config.get("instance_dirs", [])),
+                workers=int(self.config.get("update_fanout_workers", 4)),
+                use_hardlinks=self.config.get("update_use_hardlinks", True)
+            )
 
         # Scheduler初期化
         self.scheduler = AsyncIOScheduler()
 
         # Discordクライアントを初期化
+        intents = discord.Intents.default()
+        if self.chat_bridge is not None:
+            # チャンネルの投稿内容をゲームへ転送するため、メッセージ内容の取得を有効にする
+            # （Developer Portal で Message Content Intent を有効にする必要がある）
+            intents.message_content = True
         self.client = discord.Client(
-            intents=discord.Intents.default(),
+            intents=intents,
             activity=discord.Game(self.server_name)
         )
         self.tree = app_commands.CommandTree(self.client)
         self._register_commands()
 
 
-    async def _send_announcement(self, message: str):
-        """アナウンスを送信するヘルパー関数"""
-        if self.rest_api_plugin:
+    async def _send_announcement(self, message: str, instance: ServerInstance = None):
+        """アナウンスを送信するヘルパー関数（instance を省略した場合は app.json のサーバー）"""
+        rest_api_plugin = (instance or self.primary_instance).rest_api_plugin
+        if rest_api_plugin:
             try:
-                self.rest_api_plugin.send_command("announce", "POST", {"message": message})
+                await rest_api_plugin.async_send_command("announce", "POST", {"message": message})
+            except CircuitOpenError as e:
+                # サーバー停止中は接続を試みずにスキップされる
+                self.logger.info(f"Announcement skipped: {e}")
             except Exception as e:
                 self.logger.error(f"Failed to send announcement: {e}")
 
@@ -83,34 +241,74 @@ class DiscordBot:
             Choice(name="Sunday", value="sun"),
         ]
 
+        async def instance_autocomplete(interaction: discord.Interaction, current: str) -> list:
+            """instance 引数の候補（インスタンス名の部分一致）"""
+            return [
+                Choice(name=name, value=name) for name in self.instances if current.lower() in name.lower()
+            ][:25]
+
         # コマンドを登録
         @self.tree.command(name="update_server", description=f"SteamCMDとゲームサーバーのアップデートを行います")
         async def update_server_command(interaction: discord.Interaction):
             self.logger.info(f"Command executed: update_server by {interaction.user.name}")
-            await self._interraction_send(interaction, "SteamCMDとゲームサーバーのアップデートを行います")
-            embed = await update_server(self.steamcmd_path, self.server_path, self.app_id)
-            await self._interraction_followup_send(interaction, embed)
+            target = await self._command_instance(interaction, "", exclusive=True)
+            if target is None:
+                return
+            async with target.lock:
+                await self._interraction_send(interaction, "SteamCMDとゲームサーバーのアップデートを行います")
+                await self._create_backup("pre-update")
+                embed = await self._update_server_with_progress()
+                await self._interraction_followup_send(interaction, embed)
             self.logger.info(f"Command executed completes: update_server by {interaction.user.name}")
 
         @self.tree.command(name="start_server", description=f"{self.server_exe}を起動します")
-        async def start_server_command(interaction: discord.Interaction):
+        @app_commands.describe(instance="対象のインスタンス（省略時は既定のサーバー）")
+        @app_commands.autocomplete(instance=instance_autocomplete)
+        async def start_server_command(interaction: discord.Interaction, instance: str = ""):
             self.logger.info(f"Command executed: start_server by {interaction.user.name}")
-            embed = await start_server(self.server_path, self.server_exe)
-            await self._interraction_send(interaction, embed)
+            target = await self._command_instance(interaction, instance, exclusive=True)
+            if target is None:
+                return
+            async with target.lock:
+                if target is self.primary_instance and self.watchdog is not None:
+                    self.watchdog.reset()
+                started_at = time.monotonic()
+                _, embed = await self._start_instance(target)
+                await self._interraction_send(interaction, embed)
+                ready_embed = await self._wait_server_ready(started_at, target)
+                await self._interraction_followup_send(interaction, ready_embed)
             self.logger.info(f"Command executed completes: start_server by {interaction.user.name}")
 
         @self.tree.command(name="stop_server", description=f"{self.server_exe}を停止します")
-        async def stop_server_command(interaction: discord.Interaction):
+        @app_commands.describe(instance="対象のインスタンス（省略時は既定のサーバー）")
+        @app_commands.autocomplete(instance=instance_autocomplete)
+        async def stop_server_command(interaction: discord.Interaction, instance: str = ""):
             self.logger.info(f"Command executed: stop_server by {interaction.user.name}")
-            embed = await stop_server(self.server_cmd_exe, self.server_exe)
-            await self._interraction_send(interaction, embed)
+            target = await self._command_instance(interaction, instance, exclusive=True)
+            if target is None:
+                return
+            # 保存と終了待ちに時間がかかるため、先に応答する
+            await interaction.response.defer()
+            async with target.lock:
+                embed = await self._stop_server(target)
+            await self._interraction_followup_send(interaction, embed)
             self.logger.info(f"Command executed completes: stop_server by {interaction.user.name}")
 
         @self.tree.command(name="restart_server", description="サーバーを再起動します")
-        async def restart_server_command(interaction: discord.Interaction, wait_minutes: int, update: bool ):
+        @app_commands.describe(instance="対象のインスタンス（省略時は既定のサーバー）")
+        @app_commands.autocomplete(instance=instance_autocomplete)
+        async def restart_server_command(interaction: discord.Interaction, wait_minutes: int, update: bool, instance: str = ""):
             self.logger.info(f"Command executed: restart_server by {interaction.user.name}")
-            await self._interraction_send(interaction, "サーバーを再起動要求を受け付けました")
-            await self._restart_server(wait_minutes, update)
+            target = await self._command_instance(interaction, instance, exclusive=True)
+            if target is None:
+                return
+            if target.restart_pending:
+                await interaction.response.send_message(f"{target.name} は再起動のカウントダウン中です。", ephemeral=True)
+                return
+            await self._interraction_send(interaction, f"{self._instance_label(target)}サーバーを再起動要求を受け付けました")
+            if target is self.primary_instance and self.watchdog is not None:
+                self.watchdog.reset()
+            await self._restart_server(wait_minutes, update, target)
             self.logger.info(f"Command executed completes: restart_server by {interaction.user.name}")
 
         @self.tree.command(name="add_restart_task", description="サーバー再起動タスクを追加します。指定した曜日、時間にサーバー再起動アナウンスを開始します。")
@@ -118,10 +316,16 @@ class DiscordBot:
             weekday="タスクを実行する曜日を選択してください。",
             hour="タスクを実行する時間（0～23）",
             minute="タスクを実行する分（0～59）",
-            repeat="繰り返し実行する場合はTrue、1回のみ実行する場合はFalseを指定します。"
+            repeat="繰り返し実行する場合はTrue、1回のみ実行する場合はFalseを指定します。",
+            instance="対象のインスタンス（省略時は既定のサーバー）"
         )
         @app_commands.choices(weekday=weekday_choices)
-        async def add_restart_task(interaction: discord.Interaction, weekday: Choice[str], hour: int, minute: int, repeat: bool):
+        @app_commands.autocomplete(instance=instance_autocomplete)
+        async def add_restart_task(interaction: discord.Interaction, weekday: Choice[str], hour: int, minute: int, repeat: bool,
+                                   instance: str = ""):
+            target = await self._command_instance(interaction, instance)
+            if target is None:
+                return
             task = {
                 "name": f"server_restart_{weekday.value}_{hour}_{minute}",
                 "weekday": weekday.value,
@@ -129,6 +333,9 @@ class DiscordBot:
                 "minute": minute,
                 "repeat": repeat
             }
+            if target is not self.primary_instance:
+                task["name"] = f"server_restart_{target.name}_{weekday.value}_{hour}_{minute}"
+                task["instance"] = target.name
             self.logger.info(f"Command executed: add_restart_task by {interaction.user.name}")
             self.logger.info(f"Task: {task}")
 
@@ -176,12 +383,228 @@ class DiscordBot:
                     f"タスク '{task['name']}' を追加しました: {weekday.name} {hour}:{minute} 繰り返し: {repeat}"
                 )
                 
+        @self.tree.command(name="rollback_update", description="直前の段階的アップデートを取り消し、サーバーを再起動します")
+        async def rollback_update_command(interaction: discord.Interaction):
+            self.logger.info(f"Command executed: rollback_update by {interaction.user.name}")
+            target = await self._command_instance(interaction, "", exclusive=True)
+            if target is None:
+                return
+            async with target.lock:
+                await self._interraction_send(interaction, "アップデートの取り消しを開始します")
+                stop_embed = await self._stop_server()
+                await self._interraction_followup_send(interaction, stop_embed)
+                error_embed = await self._check_stopped()
+                if error_embed is not None:
+                    await self._interraction_followup_send(interaction, error_embed)
+                    return
+                try:
+                    restored = await asyncio.to_thread(self.staged_updater.rollback)
+                    self.update_checker.invalidate()
+                    embed = discord.Embed(title="アップデートを取り消しました", description=f"{restored}ファイルを元に戻しました。", color=0x00ff00)
+                except Exception as e:
+                    self.logger.error(f"Error in rollback_update_command: {e}")
+                    embed = discord.Embed(title="アップデートの取り消しに失敗しました", description=f"Error: {e}", color=0xff0000)
+                await self._interraction_followup_send(interaction, embed)
+                started_at = time.monotonic()
+                _, start_embed = await self._start_instance(self.primary_instance)
+                await self._interraction_followup_send(interaction, start_embed)
+                ready_embed = await self._wait_server_ready(started_at)
+                await self._interraction_followup_send(interaction, ready_embed)
+            self.logger.info(f"Command executed completes: rollback_update by {interaction.user.name}")
+
+        @self.tree.command(name="verify_server", description="サーバーファイルの整合性をローカルで検証します")
+        @app_commands.describe(full="Trueの場合、更新日時が変わっていないファイルも含めて全て検証します")
+        async def verify_server_command(interaction: discord.Interaction, full: bool = False):
+            self.logger.info(f"Command executed: verify_server by {interaction.user.name}")
+            await interaction.response.defer(ephemeral=True)
+            try:
+                if not self.integrity_verifier.has_manifest():
+                    manifest = await asyncio.to_thread(self.integrity_verifier.rebuild)
+                    embed = discord.Embed(
+                        title="マニフェストを作成しました",
+                        description=f"{len(manifest['files'])}ファイルの基準を記録しました。次回から検証できます。",
+                        color=0x3498db
+                    )
+                else:
+                    report = await asyncio.to_thread(self.integrity_verifier.verify, full)
+                    embed = discord.Embed(
+                        title="整合性に問題はありません" if report["ok"] else "欠損・破損ファイルがあります",
+                        description=f"検証: {report['hashed']}ファイル / 変更なしでスキップ: {report['skipped']}ファイル（{report['duration']:.1f}秒）",
+                        color=0x00ff00 if report["ok"] else 0xff0000
+                    )
+                    for label, files in (("欠損", report["missing"]), ("破損", report["corrupt"])):
+                        if files:
+                            listed = "\n".join(files[:10]) + (f"\n...他{len(files) - 10}件" if len(files) > 10 else "")
+                            embed.add_field(name=f"{label}（{len(files)}件）", value=f"```\n{listed}\n```", inline=False)
+            except Exception as e:
+                self.logger.error(f"Error in verify_server_command: {e}")
+                embed = discord.Embed(title="整合性の検証に失敗しました", description=f"Error: {e}", color=0xff0000)
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            self.logger.info(f"Command executed completes: verify_server by {interaction.user.name}")
+
+        @self.tree.command(name="benchmark_profiles", description="起動プロファイルごとにサーバーを起動して負荷を比較します（計測中は再起動を繰り返します）")
+        @app_commands.describe(
+            soak_minutes="プロファイルごとの計測時間（1～60分）",
+            profiles="計測するプロファイル名（カンマ区切り、省略時は全て）"
+        )
+        async def benchmark_profiles_command(interaction: discord.Interaction, soak_minutes: int = 5, profiles: str = ""):
+            self.logger.info(f"Command executed: benchmark_profiles by {interaction.user.name}")
+            if self.benchmark_running:
+                await interaction.response.send_message("ベンチマークを実行中です。", ephemeral=True)
+                return
+            target = await self._command_instance(interaction, "", exclusive=True)
+            if target is None:
+                return
+            soak_minutes = max(1, min(soak_minutes, 60))
+            names = [name.strip() for name in profiles.split(",") if name.strip()]
+            await self._interraction_send(interaction, "起動プロファイルのベンチマークを開始します")
+            self.benchmark_running = True
+            try:
+                async with target.lock:
+                    embed = await self._run_benchmark(names, soak_minutes)
+            except Exception as e:
+                self.logger.error(f"Error in benchmark_profiles_command: {e}")
+                embed = discord.Embed(title="ベンチマークに失敗しました", description=f"Error: {e}", color=0xff0000)
+            finally:
+                self.benchmark_running = False
+            await self._interraction_followup_send(interaction, embed)
+            self.logger.info(f"Command executed completes: benchmark_profiles by {interaction.user.name}")
+
+        @self.tree.command(name="resource_placement", description="サーバーとバックグラウンド処理のCPU割り当てを表示します")
+        async def resource_placement_command(interaction: discord.Interaction):
+            self.logger.info(f"Command executed: resource_placement by {interaction.user.name}")
+            if self.resource_manager is None:
+                await interaction.response.send_message("CPU割り当ての管理は無効です（設定 resource_policy）。", ephemeral=True)
+                return
+            policy = self.resource_manager.policy
+            # 途中で起動されたプロセスにも割り当てが反映されるよう、表示の前に適用し直す
+            placements = await self._apply_server_placement()
+            embed = discord.Embed(title="CPU割り当て", color=0x3498db)
+            embed.add_field(
+                name="方針",
+                value=(
+                    f"サーバー: コア {resource_manager.format_cores(policy.server_cores)} / 優先度 {policy.server_priority}\n"
+                    f"バックグラウンド: コア {resource_manager.format_cores(policy.background_cores)} / 優先度 {policy.background_priority}"
+                ),
+                inline=False
+            )
+            embed.add_field(name="サーバー", value=self._format_placements(placements), inline=False)
+            bot_placement = await asyncio.to_thread(resource_manager.describe_process, psutil.Process(os.getpid()))
+            embed.add_field(name="Bot", value=self._format_placements([bot_placement]), inline=False)
+            await self._interraction_send(interaction, embed, ephemeral=True)
+            self.logger.info(f"Command executed completes: resource_placement by {interaction.user.name}")
+
+        @self.tree.command(name="backup_now", description="セーブデータのバックアップを作成します")
+        async def backup_now_command(interaction: discord.Interaction):
+            self.logger.info(f"Command executed: backup_now by {interaction.user.name}")
+            await self._interraction_send(interaction, "セーブデータのバックアップを作成します")
+            _, embed = await self._create_backup("manual")
+            await self._interraction_followup_send(interaction, embed)
+            self.logger.info(f"Command executed completes: backup_now by {interaction.user.name}")
+
+        @self.tree.command(name="backups", description="セーブデータのバックアップ一覧を表示します")
+        @app_commands.describe(limit="表示する件数（1～25）")
+        async def backups_command(interaction: discord.Interaction, limit: int = 10):
+            self.logger.info(f"Command executed: backups by {interaction.user.name}")
+            limit = max(1, min(limit, 25))
+            embed = await asyncio.to_thread(self._backups_embed, limit)
+            await self._interraction_send(interaction, embed, ephemeral=True)
+            self.logger.info(f"Command executed completes: backups by {interaction.user.name}")
+
+        @self.tree.command(name="restore", description="バックアップからセーブデータを復元します（入れ替え時のみサーバーを停止します）")
+        @app_commands.describe(
+            snapshot="復元するスナップショットID（/backups で確認、省略時は最新）",
+            player="指定した場合、このプレイヤーID（Players 以下の .sav）のみ復元します"
+        )
+        async def restore_command(interaction: discord.Interaction, snapshot: str = "", player: str = ""):
+            self.logger.info(f"Command executed: restore by {interaction.user.name}")
+            target = await self._command_instance(interaction, "", exclusive=True)
+            if target is None:
+                return
+            await self._interraction_send(interaction, "バックアップからの復元を開始します")
+            async with target.lock:
+                embed = await self._restore_backup(snapshot.strip() or None, player.strip() or None)
+            await self._interraction_followup_send(interaction, embed)
+            self.logger.info(f"Command executed completes: restore by {interaction.user.name}")
+
+        @self.tree.command(name="verify_backups", description="バックアップのチャンクを検証します（前回以降に追加された分のみ）")
+        @app_commands.describe(full="Trueの場合、検証済みのチャンクも含めて全て検証します")
+        async def verify_backups_command(interaction: discord.Interaction, full: bool = False):
+            self.logger.info(f"Command executed: verify_backups by {interaction.user.name}")
+            await self._interraction_send(interaction, "バックアップの検証を開始します")
+            embed = await self._verify_backups(full)
+            await self._interraction_followup_send(interaction, embed)
+            self.logger.info(f"Command executed completes: verify_backups by {interaction.user.name}")
+
+        @self.tree.command(name="world_stats", description="セーブデータからワールドの統計（パル数・拠点・ギルド・アイテム）を表示します")
+        async def world_stats_command(interaction: discord.Interaction):
+            self.logger.info(f"Command executed: world_stats by {interaction.user.name}")
+            await self._interraction_send(interaction, "セーブデータを解析しています")
+            embed = await self._world_stats()
+            await self._interraction_followup_send(interaction, embed)
+            self.logger.info(f"Command executed completes: world_stats by {interaction.user.name}")
+
+        @self.tree.command(name="instances", description="管理しているサーバーのインスタンス一覧を表示します")
+        async def instances_command(interaction: discord.Interaction):
+            self.logger.info(f"Command executed: instances by {interaction.user.name}")
+            snapshot = await asyncio.to_thread(ProcessSnapshot, self.instances.values())
+            embed = discord.Embed(title="インスタンス一覧", color=0x3498db)
+            for instance in self.instances.values():
+                running = snapshot.is_running(instance)
+                lines = [
+                    f"状態: {'起動中' if running else '停止中'}" + (f"（{snapshot.rss(instance) / 1024 ** 3:.2f}GB）" if running else ""),
+                    f"インストール先: {instance.server_path}",
+                    f"ゲームポート: {instance.game_port}",
+                ]
+                if instance.rest_api_plugin is not None:
+                    lines.append(f"REST API: {instance.rest_api_plugin.host}:{instance.rest_api_plugin.port}")
+                if instance.lock.locked():
+                    lines.append("操作を実行中です")
+                elif instance.restart_pending:
+                    lines.append("再起動のカウントダウン中です")
+                name = instance.name + ("（既定）" if instance is self.primary_instance else "")
+                embed.add_field(name=name, value="\n".join(lines), inline=False)
+            await self._interraction_send(interaction, embed, ephemeral=True)
+            self.logger.info(f"Command executed completes: instances by {interaction.user.name}")
+
+        @self.tree.command(name="outbox_stats", description="チャンネルへの送信キューの状態を表示します")
+        async def outbox_stats_command(interaction: discord.Interaction):
+            self.logger.info(f"Command executed: outbox_stats by {interaction.user.name}")
+            embed = self._outbox_stats_embed()
+            await self._interraction_send(interaction, embed, ephemeral=True)
+            self.logger.info(f"Command executed completes: outbox_stats by {interaction.user.name}")
+
+        @self.tree.command(name="boot_history", description="サーバーの起動時間の履歴を表示します")
+        @app_commands.describe(limit="表示する件数（1～25）")
+        async def boot_history_command(interaction: discord.Interaction, limit: int = 10):
+            self.logger.info(f"Command executed: boot_history by {interaction.user.name}")
+            limit = max(1, min(limit, 25))
+            entries = await asyncio.to_thread(self.boot_history.recent, limit)
+            embed = discord.Embed(title="サーバー起動時間の履歴", color=0x3498db)
+            if not entries:
+                embed.description = "起動の記録はありません。"
+            else:
+                lines = []
+                for entry in entries:
+                    when = datetime.fromtimestamp(entry["ts"]).strftime("%m/%d %H:%M")
+                    result = f"{entry['duration']:.0f}秒" if entry.get("ready") else f"失敗（{entry.get('failed_phase')}）"
+                    lines.append(f"{when}  {result}  ビルド {entry.get('build_id') or '-'}")
+                embed.description = "```\n" + "\n".join(lines) + "\n```"
+            await self._interraction_send(interaction, embed, ephemeral=True)
+            self.logger.info(f"Command executed completes: boot_history by {interaction.user.name}")
+
         @self.tree.command(name="check_server", description="現在サーバーが起動しているかを調べます")
-        async def check_server_command(interaction: discord.Interaction):
+        @app_commands.describe(instance="対象のインスタンス（省略時は既定のサーバー）")
+        @app_commands.autocomplete(instance=instance_autocomplete)
+        async def check_server_command(interaction: discord.Interaction, instance: str = ""):
             self.logger.info(f"Command executed: check_server by {interaction.user.name}")
-            status = await check_server_status(self.server_exe)
+            target = await self._command_instance(interaction, instance)
+            if target is None:
+                return
+            status = await check_server_status(target.server_exe, self._process_filter(target))
+            label = self._instance_label(target)
             embed = discord.Embed(
-                title="サーバーは起動中です" if status else "サーバーは停止中です",
+                title=f"{label}サーバーは起動中です" if status else f"{label}サーバーは停止中です",
                 color=0x00ff00 if status else 0xff0000
             )
             await self._interraction_send(interaction, embed, ephemeral=True)
@@ -191,6 +614,15 @@ class DiscordBot:
         async def check_memory_command(interaction: discord.Interaction):
             self.logger.info(f"Command executed: check_memory by {interaction.user.name}")
             embed = await check_memory_usage()
+            if len(self.instances) > 1:
+                # インスタンスごとのメモリ使用量（1回のプロセス走査で集計する）
+                snapshot = await asyncio.to_thread(ProcessSnapshot, self.instances.values())
+                for instance in self.instances.values():
+                    embed.add_field(
+                        name=instance.name,
+                        value=f"{snapshot.rss(instance) / 1024 ** 3:.2f}GB" if snapshot.is_running(instance) else "停止中",
+                        inline=True
+                    )
             await self._interraction_send(interaction, embed)
             self.logger.info(f"Command executed completes: check_memory by {interaction.user.name}")
 
@@ -206,6 +638,18 @@ class DiscordBot:
             embed.add_field(name="/start_server", value=f"{self.server_exe}を起動します", inline=False)
             embed.add_field(name="/stop_server", value=f"{self.server_exe}を停止します", inline=False)
             embed.add_field(name="/restart_server", value=f"{self.server_exe}を再起動します", inline=False)
+            embed.add_field(name="/rollback_update", value="直前の段階的アップデートを取り消し、サーバーを再起動します", inline=False)
+            embed.add_field(name="/verify_server", value="サーバーファイルの整合性をローカルで検証します", inline=False)
+            embed.add_field(name="/backup_now", value="セーブデータのバックアップを作成します", inline=False)
+            embed.add_field(name="/backups", value="セーブデータのバックアップ一覧を表示します", inline=False)
+            embed.add_field(name="/restore", value="バックアップからセーブデータを復元します", inline=False)
+            embed.add_field(name="/verify_backups", value="バックアップのチャンクを検証します", inline=False)
+            embed.add_field(name="/world_stats", value="セーブデータからワールドの統計を表示します", inline=False)
+            embed.add_field(name="/boot_history", value="サーバーの起動時間の履歴を表示します", inline=False)
+            embed.add_field(name="/instances", value="管理しているサーバーのインスタンス一覧を表示します", inline=False)
+            embed.add_field(name="/outbox_stats", value="チャンネルへの送信キューの状態を表示します", inline=False)
+            embed.add_field(name="/resource_placement", value="サーバーとバックグラウンド処理のCPU割り当てを表示します", inline=False)
+            embed.add_field(name="/benchmark_profiles", value="起動プロファイルごとにサーバーを起動して負荷を比較します", inline=False)
             embed.add_field(name="/check_server", value="現在サーバーが起動しているかを調べます", inline=False)
             embed.add_field(name="/check_memory", value="現在のサーバーのメモリ使用量を調べます", inline=False)
             embed.add_field(name="/reset_commands", value="全てのスラッシュコマンドをリセット", inline=False)
@@ -214,6 +658,8 @@ class DiscordBot:
                 embed.add_field(name="/show_player", value="REST APIを使用してログイン中のプレイヤーを取得します", inline=False)
                 embed.add_field(name="/show_settings", value="REST APIを使用してサーバー設定を取得します", inline=False)
                 embed.add_field(name="/show_metrics", value="REST APIを使用してサーバー メトリックを取得します", inline=False)
+                embed.add_field(name="/metrics_history", value="指定期間のサーバー メトリック推移を表示します", inline=False)
+                embed.add_field(name="/playtime", value="プレイ時間のランキングを表示します", inline=False)
             embed.add_field(name="/help", value="利用可能なコマンド一覧を表示します", inline=False)
             await self._interraction_send(interaction, embed, ephemeral=True)
             self.logger.info(f"Command executed completes: help by {interaction.user.name}")
@@ -226,7 +672,9 @@ class DiscordBot:
         if self.rest_api_plugin is not None:
             # パルワールドのみの処理
             @self.tree.command(name="send_announce", description="REST APIを使用してアナウンスを送信します")
-            async def send_rest_api_announce_command(interaction: discord.Interaction, message: str):
+            @app_commands.describe(instance="対象のインスタンス（省略時は既定のサーバー）")
+            @app_commands.autocomplete(instance=instance_autocomplete)
+            async def send_rest_api_announce_command(interaction: discord.Interaction, message: str, instance: str = ""):
                 """
                 スラッシュコマンドを処理し、REST APIを使用してメッセージを送信
                 :param interaction: Discordのコマンドのインタラクション
@@ -234,7 +682,10 @@ class DiscordBot:
                 """
                 try:
                     self.logger.info(f"Command executed: send_announce by {interaction.user.name}")
-                    await self._send_announcement(message)
+                    target = await self._command_rest_instance(interaction, instance)
+                    if target is None:
+                        return
+                    await self._send_announcement(message, target)
                     await interaction.response.send_message("アナウンスを送信しました。", ephemeral=True)
                     self.logger.info(f"Command executed completes: send_announce by {interaction.user.name}")
                 except Exception as e:
@@ -242,7 +693,9 @@ class DiscordBot:
                     await interaction.response.send_message(f"アナウンスの送信に失敗しました: {e}", ephemeral=True)
 
             @self.tree.command(name="show_player", description="REST APIを使用してログイン中のプレイヤーを取得します")
-            async def send_rest_api_show_player_command(interaction: discord.Interaction):
+            @app_commands.describe(instance="対象のインスタンス（省略時は既定のサーバー）")
+            @app_commands.autocomplete(instance=instance_autocomplete)
+            async def send_rest_api_show_player_command(interaction: discord.Interaction, instance: str = ""):
                 """
                 スラッシュコマンドを処理し、REST APIを使用してログイン中のプレイヤーを取得
                 :param interaction: Discordのコマンドのインタラクション
@@ -250,18 +703,24 @@ class DiscordBot:
                 try:
                     self.logger.info(f"Command executed: show_player by {interaction.user.name}")
                     
-                    # REST API プラグインの send_command メソッドを使用
-                    response = self.rest_api_plugin.send_command("players", "GET", {})
+                    target = await self._command_rest_instance(interaction, instance)
+                    if target is None:
+                        return
+
+                    # キャッシュ経由で取得（同時リクエストは1回のHTTP呼び出しにまとめられる）
+                    response = await target.rest_api_plugin.async_get_cached("players")
 
                     # レスポンスを解析して送信
-                    await self._send_response(interaction, response, title="ログイン中のプレイヤー", ephemeral=True)
+                    await self._send_response(interaction, response, title=f"{self._instance_label(target)}ログイン中のプレイヤー", ephemeral=True)
                     self.logger.info(f"Command executed completes: show_player by {interaction.user.name}")
                 except Exception as e:
                     self.logger.error(f"Error in send_rest_api_show_player_command: {e}")
                     await interaction.response.send_message(f"ログイン中のプレイヤー取得に失敗しました: {e}", ephemeral=True)
 
             @self.tree.command(name="show_settings", description="REST APIを使用してサーバー設定を取得します")
-            async def send_rest_api_show_settings_command(interaction: discord.Interaction):
+            @app_commands.describe(instance="対象のインスタンス（省略時は既定のサーバー）")
+            @app_commands.autocomplete(instance=instance_autocomplete)
+            async def send_rest_api_show_settings_command(interaction: discord.Interaction, instance: str = ""):
                 """
                 スラッシュコマンドを処理し、REST APIを使用してサーバー設定を取得
                 :param interaction: Discordのコマンドのインタラクション
@@ -269,18 +728,24 @@ class DiscordBot:
                 try:
                     self.logger.info(f"Command executed: show_settings by {interaction.user.name}")
                     
-                    # REST API プラグインの send_command メソッドを使用
-                    response = self.rest_api_plugin.send_command("settings", "GET", {})
+                    target = await self._command_rest_instance(interaction, instance)
+                    if target is None:
+                        return
+
+                    # キャッシュ経由で取得（同時リクエストは1回のHTTP呼び出しにまとめられる）
+                    response = await target.rest_api_plugin.async_get_cached("settings")
                     
                     # レスポンスを解析して送信
-                    await self._send_response(interaction, response, title="サーバー設定", ephemeral=True)
+                    await self._send_response(interaction, response, title=f"{self._instance_label(target)}サーバー設定", ephemeral=True)
                     self.logger.info(f"Command executed completes: show_settings by {interaction.user.name}")
                 except Exception as e:
                     self.logger.error(f"Error in send_rest_api_show_settings_command: {e}")
                     await interaction.response.send_message(f"サーバー設定取得に失敗しました: {e}", ephemeral=True)
 
             @self.tree.command(name="show_metrics", description="REST APIを使用してサーバー メトリックを取得します")
-            async def send_rest_api_show_metrics_command(interaction: discord.Interaction):
+            @app_commands.describe(instance="対象のインスタンス（省略時は既定のサーバー）")
+            @app_commands.autocomplete(instance=instance_autocomplete)
+            async def send_rest_api_show_metrics_command(interaction: discord.Interaction, instance: str = ""):
                 """
                 スラッシュコマンドを処理し、REST APIを使用してサーバー メトリックを取得
                 :param interaction: Discordのコマンドのインタラクション
@@ -288,60 +753,176 @@ class DiscordBot:
                 try:
                     self.logger.info(f"Command executed: show_metrics by {interaction.user.name}")
                     
-                    # REST API プラグインの send_command メソッドを使用
-                    response = self.rest_api_plugin.send_command("metrics", "GET", {})
+                    target = await self._command_rest_instance(interaction, instance)
+                    if target is None:
+                        return
+
+                    # キャッシュ経由で取得（同時リクエストは1回のHTTP呼び出しにまとめられる）
+                    response = await target.rest_api_plugin.async_get_cached("metrics")
                     
                     # レスポンスを解析して送信
-                    await self._send_response(interaction, response, title="サーバー メトリック", ephemeral=True)
+                    await self._send_response(interaction, response, title=f"{self._instance_label(target)}サーバー メトリック", ephemeral=True)
 
                     self.logger.info(f"Command executed completes: show_metrics by {interaction.user.name}")
                 except Exception as e:
                     self.logger.error(f"Error in send_rest_api_show_metrics_command: {e}")
                     await interaction.response.send_message(f"サーバー メトリック取得に失敗しました: {e}", ephemeral=True)
 
+            @self.tree.command(name="metrics_history", description="指定期間のサーバー メトリック推移を表示します")
+            @app_commands.describe(
+                hours="さかのぼる時間（1～8760）",
+                fps_threshold="このFPSを下回った時間帯を表示します"
+            )
+            async def metrics_history_command(interaction: discord.Interaction, hours: int = 24, fps_threshold: int = 30):
+                """
+                保存済みのメトリックから、期間内の集計とFPSが落ち込んだ時間帯を表示
+                :param interaction: Discordのコマンドのインタラクション
+                :param hours: さかのぼる時間
+                :param fps_threshold: FPSの閾値
+                """
+                self.logger.info(f"Command executed: metrics_history by {interaction.user.name}")
+                hours = max(1, min(hours, 8760))
+                end = int(datetime.now().timestamp())
+                start = end - hours * 3600
+                try:
+                    fps, players = await asyncio.gather(
+                        asyncio.to_thread(self.metrics_store.aggregate, "fps", start, end),
+                        asyncio.to_thread(self.metrics_store.aggregate, "players", start, end),
+                    )
+                    drops = await asyncio.to_thread(self.metrics_store.find_below, "fps", fps_threshold, start, end, 5)
+                except Exception as e:
+                    self.logger.error(f"Error in metrics_history_command: {e}")
+                    await interaction.response.send_message(f"メトリック履歴の取得に失敗しました: {e}", ephemeral=True)
+                    return
+
+                embed = discord.Embed(title=f"サーバー メトリック（過去{hours}時間）", color=0x3498db)
+                if fps["count"] == 0:
+                    embed.description = "この期間のデータはありません。"
+                else:
+                    embed.add_field(name="FPS", value=f"最小 {fps['min']:.1f} / 平均 {fps['avg']:.1f} / 最大 {fps['max']:.1f}", inline=False)
+                    embed.add_field(name="プレイヤー数", value=f"平均 {players['avg'] or 0:.1f} / 最大 {players['max'] or 0:.0f}", inline=False)
+                    if drops:
+                        lines = [
+                            f"{datetime.fromtimestamp(d['ts']).strftime('%m/%d %H:%M')}  FPS {d['fps']:.1f}" for d in drops
+                        ]
+                        embed.add_field(name=f"FPS {fps_threshold} 未満の時間帯", value="\n".join(lines), inline=False)
+                    else:
+                        embed.add_field(name=f"FPS {fps_threshold} 未満の時間帯", value="ありません", inline=False)
+                    embed.set_footer(text=f"サンプル数: {fps['count']}")
+                await self._interraction_send(interaction, embed, ephemeral=True)
+                self.logger.info(f"Command executed completes: metrics_history by {interaction.user.name}")
+
+            @self.tree.command(name="playtime", description="プレイ時間のランキングを表示します")
+            @app_commands.describe(limit="表示する人数（1～25）")
+            async def playtime_command(interaction: discord.Interaction, limit: int = 10):
+                """
+                累計プレイ時間のランキングを表示（ログイン中のセッション時間を含む）
+                :param interaction: Discordのコマンドのインタラクション
+                :param limit: 表示する人数
+                """
+                self.logger.info(f"Command executed: playtime by {interaction.user.name}")
+                limit = max(1, min(limit, 25))
+                try:
+                    board = await asyncio.to_thread(
+                        self.player_tracker.store.leaderboard, limit, dict(self.player_tracker.online)
+                    )
+                except Exception as e:
+                    self.logger.error(f"Error in playtime_command: {e}")
+                    await interaction.response.send_message(f"プレイ時間の取得に失敗しました: {e}", ephemeral=True)
+                    return
+
+                embed = discord.Embed(title="プレイ時間ランキング", color=0x3498db)
+                if not board:
+                    embed.description = "まだ記録がありません。"
+                else:
+                    lines = []
+                    for rank, entry in enumerate(board, start=1):
+                        online = " ログイン中" if entry["key"] in self.player_tracker.online else ""
+                        lines.append(f"{rank}. {entry['name']} - {format_duration(entry['seconds'])}（{entry['sessions']}回）{online}")
+                    embed.description = "\n".join(lines)
+                await self._interraction_send(interaction, embed, ephemeral=True)
+                self.logger.info(f"Command executed completes: playtime by {interaction.user.name}")
+
         self.logger.info("Commands registered")
 
     async def _send_response(self, interaction: discord.Interaction, response_data, title="レスポンス", ephemeral=False):
         """
         Discordメッセージとしてレスポンスを送信する汎用関数。
+        表・キーと値の一覧に整形し、複数ページになる場合はボタンでページを切り替える1つのメッセージで送る
+        ページ数が多い場合は全体をファイルとして添付する
         """
         try:
             # 応答を保留
             await interaction.response.defer(ephemeral=ephemeral)
 
-            # JSONデータの整形
-            if isinstance(response_data, dict):
-                formatted_response = json.dumps(response_data, indent=4, ensure_ascii=False)
-            elif isinstance(response_data, str):
-                formatted_response = response_data
-            else:
-                formatted_response = str(response_data)
-
-            # Discordメッセージ制限（2000文字）を確認
-            chunk_size = 1990  # 安全マージンを取って1990文字に設定
-            if len(formatted_response) > chunk_size:
-                # 長いメッセージを分割して送信
-                chunks = [formatted_response[i:i + chunk_size] for i in range(0, len(formatted_response), chunk_size)]
-
-                # フォローアップメッセージとして分割メッセージを送信
-                await interaction.followup.send(f"{title}が複数メッセージに分割されます:", ephemeral=ephemeral)
-                for i, chunk in enumerate(chunks):
-                    try:
-                        await interaction.followup.send(f"```\n{chunk}\n```", ephemeral=ephemeral)
-                    except Exception as e:
-                        self.logger.error(f"Failed to send followup message (chunk {i+1}/{len(chunks)}): {e}")
-                        await interaction.followup.send(
-                            f"フォローアップ送信中にエラーが発生しました (chunk {i+1}/{len(chunks)}): {e}",
-                            ephemeral=True
-                        )
+            renderer = ResponseRenderer(
+                response_data, title,
+                rows_per_page=int(self.config.get("response_rows_per_page", ROWS_PER_PAGE)),
+                max_pages=int(self.config.get("response_max_pages", MAX_PAGES))
+            )
+            if renderer.needs_attachment:
+                file = await asyncio.to_thread(renderer.render_attachment)
+                await interaction.followup.send(
+                    f"**{title}**（全{len(renderer.rows)}件、ファイルを添付します）", file=file, ephemeral=ephemeral
+                )
+            elif renderer.page_count > 1:
+                view = PaginatorView(renderer, interaction.user.id)
+                view.message = await interaction.followup.send(
+                    renderer.render_page(0), view=view, ephemeral=ephemeral, wait=True
+                )
             else:
-                # 短いメッセージの場合
-                await interaction.followup.send(f"{title}:\n```\n{formatted_response}\n```", ephemeral=ephemeral)
+                await interaction.followup.send(renderer.render_page(0), ephemeral=ephemeral)
         except Exception as e:
             # フォローアップでエラーを送信
             self.logger.error(f"Failed to send response: {e}")
             await interaction.followup.send(f"レスポンス送信中にエラーが発生しました: {e}", ephemeral=True)
 
+    def _post(self, *args: Union[str, discord.Embed], key: str = None, channel_id: int = None, **options):
+        """
+        チャンネルへのメッセージを送信キューに積む（送信完了は待たない）
+        :param key: 同じ key の未送信のメッセージを置き換える
+        :param channel_id: 送信先のチャンネル（省略時は通知用のチャンネル）
+        :return: 送信したメッセージを結果とする Future（送信しない設定の場合は None）
+        """
+        if not self.send_flag:
+            return None
+        content = None
+        embed = options.pop("embed", None)
+        for arg in args:
+            if isinstance(arg, discord.Embed):
+                embed = arg
+            else:
+                content = arg
+        channel_id = channel_id or self.channel_id
+        outbox = self.outboxes.get(channel_id)
+        if outbox is None:
+            outbox = OutboundQueue(f"channel {channel_id}", lambda: self.client.get_channel(channel_id))
+            self.outboxes[channel_id] = outbox
+        return outbox.post(content=content, embed=embed, key=key, **options)
+
+    def _outbox_stats_embed(self) -> discord.Embed:
+        embed = discord.Embed(title="送信キューの状態", color=0x3498db)
+        if not self.outboxes:
+            embed.description = "まだメッセージを送信していません。"
+            return embed
+        for channel_id, outbox in self.outboxes.items():
+            stats = outbox.stats()
+            latency = (
+                f"平均 {stats['latency_avg']:.2f}秒 / p95 {stats['latency_p95']:.2f}秒 / 最大 {stats['latency_max']:.2f}秒"
+                if stats["latency_avg"] is not None else "-"
+            )
+            embed.add_field(
+                name=f"チャンネル {channel_id}",
+                value=(
+                    f"待機中: {stats['depth']}件\n"
+                    f"送信: {stats['sent_items']}件（{stats['sent_messages']}メッセージ、まとめ送り {stats['merged']}件）\n"
+                    f"置き換え: {stats['collapsed']}件 / 失敗: {stats['failed']}件 / 429: {stats['rate_limited']}回\n"
+                    f"遅延: {latency}"
+                ),
+                inline=False
+            )
+        return embed
+
     async def _interraction_send(
         self, 
         interaction, 
@@ -380,86 +961,894 @@ class DiscordBot:
             else:
                 raise ValueError("複数の位置引数が渡されました。content または embed のみ指定してください。")
 
-    async def _restart_server(self, wait_minutes: int, update: bool ):
-        self.logger.info(f"Task executed: restart_server")
+    def _make_progress_reporter(self, title: str):
+        """
+        steamcmdの進捗をチャンネルの1つのメッセージを編集して通知するコールバックを作成
+        編集は update_progress_interval 秒（既定5秒）に1回までに間引く
+        """
+        if not self.send_flag:
+            return None
+        throttle = ProgressThrottle(float(self.config.get("update_progress_interval", 5)))
+        progress_message = None
+
+        async def on_progress(event):
+            nonlocal progress_message
+            if event["type"] not in ("progress", "success", "error"):
+                return
+            is_progress = event["type"] == "progress"
+            if is_progress and not throttle.ready():
+                return
+            embed = discord.Embed(
+                title=title,
+                description=format_progress(event) if is_progress else event["text"],
+                color=0x3498db if event["type"] != "error" else 0xff0000
+            )
+            try:
+                if progress_message is None:
+                    progress_message = await self._post(embed=embed)
+                else:
+                    await progress_message.edit(embed=embed)
+            except (discord.HTTPException, RuntimeError) as e:
+                # 進捗通知の失敗でアップデート自体は止めない
+                self.logger.warning(f"Failed to report update progress: {e}")
+
+        return on_progress
+
+    async def _update_server_with_progress(self, validate: bool = True) -> discord.Embed:
+        """サーバーをアップデートし、進捗をチャンネルに通知する"""
+        if self.update_orchestrator is not None:
+            return await self._update_instances_with_progress(validate)
+        ok, embed = await update_server(
+            self.steamcmd_path, self.server_path, self.app_id,
+            progress_callback=self._make_progress_reporter("サーバーアップデート進捗"), validate=validate
+        )
+        self.update_checker.invalidate()
+        if ok:
+            await self._rebuild_install_manifest()
+        return embed
+
+    async def _update_instances_with_progress(self, validate: bool = True) -> discord.Embed:
+        """
+        共有インストールを更新し、各インスタンスへ配布する
+        インスタンスごとの配布結果と所要時間をEmbedにまとめる
+        """
+        progress = self._make_progress_reporter("サーバーアップデート進捗")
+
+        async def on_event(event):
+            if progress is not None and event["type"] in ("progress", "success", "error"):
+                await progress(event)
+
+        # 実行中のサーバーのファイルは置き換えない（停止中のインスタンスにのみ配布する）
+        instance_dirs = self.update_orchestrator.instance_dirs
+        running = await self._running_instance_dirs(instance_dirs)
+        if running and self.update_orchestrator.use_hardlinks:
+            # ハードリンクで配布したファイルは共有インストールと実体を共有するため、更新自体を行わない
+            return discord.Embed(
+                title="エラー",
+                description=(
+                    "実行中のインスタンスがあるため、共有インストールを更新できません。\n"
+                    + "\n".join(running)
+                ),
+                color=0xff0000
+            )
+
+        try:
+            summary = await self.update_orchestrator.run(
+                on_event, validate, [d for d in instance_dirs if d not in running]
+            )
+        except Exception as e:
+            self.logger.error(f"Error in update orchestrator: {e}")
+            return discord.Embed(title="エラー", description=f"コマンドが失敗しました: {e}", color=0xff0000)
+        self.update_checker.invalidate()
+
+        result = summary["result"]
+        if result.returncode != 0:
+            return discord.Embed(
+                title="エラー",
+                description=f"コマンドが失敗しました。\nステータスコード: {result.returncode}\n```\n{result.tail_text(10)}\n```",
+                color=0xff0000
+            )
+
+        failed = [r for r in summary["instances"] if "error" in r]
+        embed = discord.Embed(
+            title=UPDATE_SUCCESS_TITLE if not failed else "一部のインスタンスの更新に失敗しました",
+            description=f"ダウンロード: {summary['download_duration']:.0f}秒",
+            color=0x00ff00 if not failed else 0xff0000
+        )
+        for report in summary["instances"]:
+            if "error" in report:
+                value = f"Error: {report['error']}"
+            else:
+                value = (
+                    f"変更: {report['changed']}ファイル（リンク {report['linked']} / コピー {report['copied']}）"
+                    f" / 削除: {report['removed']}ファイル / {report['duration']:.1f}秒"
+                )
+            embed.add_field(name=report["instance"], value=value, inline=False)
+        for instance_dir in running:
+            embed.add_field(
+                name=instance_dir, value="実行中のため配布をスキップしました（停止中のアップデート・再起動時に配布します）", inline=False
+            )
+        if not failed and os.path.normpath(self.server_path) not in running:
+            await self._rebuild_install_manifest()
+        return embed
+
+    async def _running_instance_dirs(self, instance_dirs: list) -> list:
+        """配布先のうち、サーバーが実行中のディレクトリ"""
+        by_dir = {os.path.normcase(os.path.abspath(i.server_path)): i for i in self.instances.values()}
+        running = []
+        for instance_dir in instance_dirs:
+            instance = by_dir.get(os.path.normcase(os.path.abspath(instance_dir)))
+            if instance is not None:
+                is_running = await check_server_status(instance.server_exe, self._process_filter(instance))
+            else:
+                is_running = await check_server_status(self.server_exe, instance_dir)
+            if is_running:
+                running.append(instance_dir)
+        return running
+
+    async def _rebuild_install_manifest(self):
+        """
+        アップデート後のファイル構成で整合性マニフェストを更新する
+        サーバーの起動を遅らせないよう、バックグラウンドで実行する（変更ファイルのみハッシュ計算）
+        """
+        async def rebuild():
+            try:
+                await asyncio.to_thread(self.integrity_verifier.rebuild)
+            except Exception as e:
+                self.logger.error(f"Failed to rebuild install manifest: {e}")
+
+        self.manifest_task = asyncio.create_task(rebuild())
+
+    async def _needs_validate(self) -> bool:
+        """
+        ローカルの整合性検証で問題がなければ、steamcmd の validate を省略できる
+        マニフェストがない、または欠損・破損がある場合は validate が必要
+        """
+        try:
+            report = await asyncio.to_thread(self.integrity_verifier.verify)
+        except Exception as e:
+            self.logger.error(f"Integrity verification failed: {e}")
+            return True
+        if report is None:
+            return True
+        return not report["ok"]
+
+    async def _swap_staged_update(self, prepared: dict) -> discord.Embed:
+        """
+        事前にダウンロードしたアップデートを入れ替える（サーバー停止中に実行）
+        入れ替えに失敗した場合は元に戻してから通常のアップデートに切り替える
+        """
+        try:
+            swapped = await asyncio.to_thread(self.staged_updater.swap)
+        except Exception as e:
+            self.logger.error(f"Staged update swap failed, rolling back: {e}")
+            try:
+                await asyncio.to_thread(self.staged_updater.rollback)
+            except Exception as rollback_error:
+                self.logger.error(f"Rollback failed: {rollback_error}")
+            return await self._update_server_with_progress()
+        self.update_checker.invalidate()
+        await self._rebuild_install_manifest()
+        return discord.Embed(
+            title=UPDATE_SUCCESS_TITLE,
+            description=(
+                f"事前ダウンロード済みのアップデートを適用しました。\n"
+                f"入れ替え: {swapped['changed']}ファイル / 削除: {swapped['removed']}ファイル\n"
+                f"入れ替え時間: {swapped['duration']:.1f}秒（事前準備: {prepared['duration']:.0f}秒）"
+            ),
+            color=0x00ff00
+        )
+
+    async def _stop_server(self, instance: ServerInstance = None) -> discord.Embed:
+        """
+        サーバーを停止する（REST APIが使える場合は保存・停止要求を行い、プロセスの終了を待つ）
+        :param instance: 対象のインスタンス（省略時は app.json のサーバー）
+        """
+        instance = instance or self.primary_instance
+        embed = await stop_server(
+            instance.server_cmd_exe, instance.server_exe, instance.rest_api_plugin,
+            shutdown_wait=int(self.config.get("shutdown_wait_seconds", 10)),
+            exit_timeout=float(self.config.get("stop_timeout", 60)),
+            install_dir=self._process_filter(instance)
+        )
+        embed.title = self._instance_label(instance) + embed.title
+        return embed
+
+    async def _check_stopped(self, instance: ServerInstance = None) -> discord.Embed:
+        """
+        停止処理の後にサーバーのプロセスが残っていないか確認する
+        ファイルの入れ替えは停止を確認してから行う（残っている場合はエラーのEmbed、停止済みの場合は None）
+        """
+        instance = instance or self.primary_instance
+        if not await check_server_status(instance.server_exe, self._process_filter(instance)):
+            return None
+        return discord.Embed(
+            title=f"{self._instance_label(instance)}サーバーを停止できませんでした",
+            description="サーバーが実行中のため、処理を中止しました。",
+            color=0xff0000
+        )
+
+    async def _start_instance(self, instance: ServerInstance) -> tuple:
+        """
+        インスタンスを起動する（起動オプションの指定がなければ起動プロファイルに従う）
+        戻り値は start_server と同じく (ok, embed)
+        """
+        launch_args = instance.launch_args if instance.launch_args is not None else self._launch_args()
+        ok, embed = await start_server(instance.server_path, instance.server_exe, launch_args)
+        embed.title = self._instance_label(instance) + embed.title
+        if ok:
+            # 起動したサーバーは Bot のバックグラウンド用の割り当てを引き継ぐため、準備完了を待たずに適用する
+            await self._apply_server_placement(instance)
+        return ok, embed
+
+    async def _apply_server_placement(self, instance: ServerInstance = None) -> list:
+        """
+        インスタンスのプロセスにサーバー用のCPU割り当てを適用する（リソース管理が無効な場合は None）
+        :param instance: 対象のインスタンス（省略時は全インスタンス）
+        """
+        if self.resource_manager is None:
+            return None
+        placements = []
+        for target in [instance] if instance is not None else self.instances.values():
+            placements += await asyncio.to_thread(
+                self.resource_manager.apply_server, target.process_names, self._process_filter(target)
+            )
+        return placements
+
+    async def _sync_instance(self, instance: ServerInstance) -> discord.Embed:
+        """追加のインスタンスに共有インストールのファイルを配布する（停止中に呼ぶこと）"""
+        label = self._instance_label(instance)
+        if self.update_orchestrator is None or os.path.normpath(instance.server_path) not in self.update_orchestrator.instance_dirs:
+            return discord.Embed(
+                title=f"{label}サーバーアップデート",
+                description="共有インストール（canonical_install_dir / instance_dirs）が設定されていないため、アップデートをスキップします。",
+                color=0xff0000
+            )
+        try:
+            result = await asyncio.to_thread(self.update_orchestrator.sync_instance, instance.server_path)
+        except Exception as e:
+            self.logger.error(f"Failed to sync instance {instance.name}: {e}")
+            return discord.Embed(title=f"{label}アップデートに失敗しました", description=f"Error: {e}", color=0xff0000)
+        return discord.Embed(
+            title=f"{label}{UPDATE_SUCCESS_TITLE}",
+            description=(
+                f"共有インストールから配布しました。\n"
+                f"変更: {result['changed']}ファイル / 削除: {result['removed']}ファイル（{result['duration']:.1f}秒）"
+            ),
+            color=0x00ff00
+        )
+
+    def _create_instance_plugins(self):
+        """追加のインスタンスごとに REST API / RCON の接続を作成する（プラグインが有効な場合のみ）"""
+        for instance in self.instances.values():
+            if instance is self.primary_instance:
+                continue
+            try:
+                if instance.rest_api is not None and self.rest_api_plugin is not None:
+                    instance.rest_api_plugin = type(self.rest_api_plugin)(instance.rest_api, instance.server_cmd_exe)
+                if instance.rcon is not None and self.rcon_plugin is not None:
+                    instance.rcon_plugin = type(self.rcon_plugin)(instance.rcon, instance.server_cmd_exe)
+            except Exception as e:
+                self.logger.error(f"Failed to create plugins for instance {instance.name}: {e}")
+
+    def _get_instance(self, name: str) -> ServerInstance:
+        """インスタンス名から取得する（省略時は app.json のサーバー、存在しない場合は None）"""
+        if not name:
+            return self.primary_instance
+        return self.instances.get(name)
+
+    async def _command_instance(self, interaction: discord.Interaction, name: str, exclusive: bool = False) -> ServerInstance:
+        """
+        コマンドの instance 引数からインスタンスを取得する
+        存在しない場合や、exclusive で同じインスタンスへの別の操作を実行中の場合は、応答して None を返す
+        """
+        instance = self._get_instance(name)
+        if instance is None:
+            await interaction.response.send_message(f"インスタンス {name} はありません。", ephemeral=True)
+            return None
+        if exclusive and instance.lock.locked():
+            await interaction.response.send_message(
+                f"{instance.name} は別の操作を実行中です。完了してから実行してください。", ephemeral=True
+            )
+            return None
+        return instance
+
+    async def _command_rest_instance(self, interaction: discord.Interaction, name: str) -> ServerInstance:
+        """REST API を使うコマンドの対象インスタンス（REST API の接続設定がない場合は応答して None を返す）"""
+        instance = await self._command_instance(interaction, name)
+        if instance is not None and instance.rest_api_plugin is None:
+            await interaction.response.send_message(f"{instance.name} には REST API の接続設定がありません。", ephemeral=True)
+            return None
+        return instance
+
+    def _instance_label(self, instance: ServerInstance) -> str:
+        """複数インスタンスを管理している場合のみ、通知のタイトルにインスタンス名を付ける"""
+        return f"[{instance.name}] " if len(self.instances) > 1 else ""
+
+    def _process_filter(self, instance: ServerInstance) -> str:
+        """
+        プロセスを探すときに使うインストール先
+        同じ実行ファイル名のインスタンスが複数ある場合のみ、実行ファイルのパスで区別する
+        """
+        return instance.server_path if len(self.instances) > 1 else None
+
+    async def _scheduled_restart(self, instance: ServerInstance):
+        # 停止から起動までは instance.lock で他の操作と直列化する（カウントダウン中はロックしない）
+        await self._restart_server(60, True, instance)
+
+    async def _create_backup(self, reason: str) -> tuple:
+        """
+        セーブデータのスナップショットを作成する
+        サーバーが稼働中で REST API が使える場合は、先にワールドを保存させる
+        戻り値は (ok, embed)。成否は ok で判定し、embed は通知用に使う
+        """
+        async with self.backup_lock:
+            if self.rest_api_plugin is not None and await check_server_status(self.server_exe, self._process_filter(self.primary_instance)):
+                try:
+                    await self.rest_api_plugin.async_send_command("save", "POST")
+                except Exception as e:
+                    self.logger.warning(f"Failed to save world before backup: {e}")
+            try:
+                manifest = await asyncio.to_thread(self.backup_engine.snapshot, reason)
+            except Exception as e:
+                self.logger.error(f"Backup failed: {e}")
+                return False, discord.Embed(title="バックアップに失敗しました", description=f"Error: {e}", color=0xff0000)
+        stats = manifest["stats"]
+        return True, discord.Embed(
+            title="バックアップを作成しました",
+            description=(
+                f"スナップショット: {manifest['id']}\n"
+                f"ファイル: {stats['files']}（変更 {stats['changed_files']}） / {stats['bytes'] / 1024 / 1024:.1f}MB\n"
+                f"新規チャンク: {stats['new_chunks']}（{stats['stored_bytes'] / 1024 / 1024:.1f}MB） / 所要時間: {stats['duration']:.1f}秒"
+            ),
+            color=0x00ff00
+        )
+
+    async def _scheduled_backup(self):
+        ok, embed = await self._create_backup("scheduled")
+        if not ok:
+            self._post(embed=embed)
+
+    def _backups_embed(self, limit: int) -> discord.Embed:
+        embed = discord.Embed(title="バックアップ一覧", color=0x3498db)
+        snapshot_ids = self.backup_engine.list_snapshots()
+        if not snapshot_ids:
+            embed.description = "バックアップはありません。"
+            return embed
+        lines = []
+        for snapshot_id in reversed(snapshot_ids[-limit:]):
+            stats = self.backup_engine.load(snapshot_id)["stats"]
+            lines.append(
+                f"{snapshot_id}  {stats['bytes'] / 1024 / 1024:.0f}MB  "
+                f"変更 {stats['changed_files']}  +{stats['stored_bytes'] / 1024 / 1024:.1f}MB"
+            )
+        embed.description = "```\n" + "\n".join(lines) + "\n```"
+        forecast = self.disk_forecaster.forecast()
+        usage = f"バックアップ容量: {self.backup_engine.repo_size() / 1024 / 1024:.0f}MB / 空き容量: {forecast['free'] / 1024 ** 3:.1f}GB"
+        if forecast["days_left"] is not None:
+            usage += f"（約{forecast['days_left']:.0f}日で不足）"
+        embed.add_field(name="ディスク", value=usage, inline=False)
+        embed.set_footer(text=f"全 {len(snapshot_ids)} 件")
+        return embed
+
+    async def _restore_backup(self, snapshot_id: str = None, player: str = None) -> discord.Embed:
+        """
+        スナップショットからセーブデータを復元する
+        1. 現在のセーブデータをバックアップする（復元の取り消し用）
+        2. サーバー稼働中にステージングディレクトリへ復元・検証する
+        3. サーバーを停止してファイルを入れ替え、停止前に起動していた場合は起動し直す
+        """
+        snapshot_ids = await asyncio.to_thread(self.backup_engine.list_snapshots)
+        snapshot_id = snapshot_id or (snapshot_ids[-1] if snapshot_ids else None)
+        if snapshot_id not in snapshot_ids:
+            return discord.Embed(title="スナップショットが見つかりません", description=str(snapshot_id), color=0xff0000)
+        try:
+            manifest = await asyncio.to_thread(self.backup_engine.load, snapshot_id)
+            rels = self.backup_engine.select_files(manifest, player)
+        except (OSError, ValueError) as e:
+            return discord.Embed(title="復元に失敗しました", description=f"Error: {e}", color=0xff0000)
+
+        ok, pre_embed = await self._create_backup("pre-restore")
+        if not ok:
+            return pre_embed
+
+        async with self.backup_lock:
+            try:
+                restored = await asyncio.to_thread(self.backup_engine.stage_restore, snapshot_id, rels)
+            except Exception as e:
+                self.logger.error(f"Failed to stage restore: {e}")
+                return discord.Embed(title="復元に失敗しました", description=f"Error: {e}", color=0xff0000)
+
+            was_running = await check_server_status(self.server_exe, self._process_filter(self.primary_instance))
+            downtime_started = time.monotonic()
+            if was_running:
+                await self._send_announcement("アナウンス: セーブデータ復元のため、まもなくサーバーを停止します。")
+                await self._stop_server()
+                error_embed = await self._check_stopped()
+                if error_embed is not None:
+                    await asyncio.to_thread(self.backup_engine.discard_restore)
+                    return error_embed
+            try:
+                applied = await asyncio.to_thread(self.backup_engine.apply_restore, restored)
+            except Exception as e:
+                # apply_restore は失敗時に元のファイルへ戻している。停止したサーバーは起動し直す
+                self.logger.error(f"Failed to apply restore: {e}")
+                await asyncio.to_thread(self.backup_engine.discard_restore)
+                applied = None
+                embed = discord.Embed(
+                    title="復元に失敗しました",
+                    description=f"Error: {e}\n元のセーブデータに戻しました。直前のバックアップ（pre-restore）からも戻せます。",
+                    color=0xff0000
+                )
+
+        if applied is not None:
+            embed = discord.Embed(
+                title="セーブデータを復元しました",
+                description=(
+                    f"スナップショット: {snapshot_id}\n"
+                    f"対象: {'全体' if restored['full'] else ', '.join(rels)}\n"
+                    f"ファイル: {applied['swapped']}（削除 {applied['removed']}） / {restored['bytes'] / 1024 / 1024:.1f}MB\n"
+                    f"展開・検証: {restored['duration']:.1f}秒 / 入れ替え: {applied['duration']:.2f}秒"
+                ),
+                color=0x00ff00
+            )
+        if was_running:
+            started_at = time.monotonic()
+            ok, start_embed = await self._start_instance(self.primary_instance)
+            if not ok:
+                return start_embed
+            ready_embed = await self._wait_server_ready(started_at)
+            embed.add_field(name="停止時間", value=f"{time.monotonic() - downtime_started:.0f}秒", inline=False)
+            embed.add_field(name=ready_embed.title, value=ready_embed.description or "-", inline=False)
+        return embed
+
+    async def _maintain_backups(self):
+        """
+        世代管理で期限切れのバックアップを削除し、ディスク使用量を記録して空き容量不足を予測する
+        """
+        async with self.backup_lock:
+            try:
+                snapshots = await asyncio.to_thread(self.backup_engine.snapshot_times)
+                expired = select_expired(snapshots, rules=self.config.get("backup_retention"))
+                if expired:
+                    await asyncio.to_thread(self.backup_engine.prune, expired)
+                latest = await asyncio.to_thread(self.backup_engine.latest)
+                save_bytes = latest["stats"]["bytes"] if latest else 0
+                repo_bytes = await asyncio.to_thread(self.backup_engine.repo_size)
+                await asyncio.to_thread(self.disk_forecaster.record, save_bytes + repo_bytes)
+                forecast = await asyncio.to_thread(self.disk_forecaster.forecast)
+            except Exception as e:
+                self.logger.error(f"Backup maintenance failed: {e}")
+                return
+
+        alert_days = float(self.config.get("disk_alert_days", 3))
+        if forecast["days_left"] is None or forecast["days_left"] > alert_days:
+            return
+        # 同じ警告を繰り返さないよう、通知は1日1回まで
+        if self.last_disk_alert is not None and time.monotonic() - self.last_disk_alert < 24 * 3600:
+            return
+        self.last_disk_alert = time.monotonic()
+        self.logger.warning(f"Disk space forecast: {forecast}")
+        self._post(
+            embed=discord.Embed(
+                title="ディスクの空き容量が不足する見込みです",
+                description=(
+                    f"空き容量: {forecast['free'] / 1024 ** 3:.1f}GB\n"
+                    f"増加量: {forecast['rate'] / 1024 ** 3:.2f}GB/日\n"
+                    f"約{forecast['days_left']:.1f}日で空き容量がなくなります。バックアップの保存期間（backup_retention）を見直してください。"
+                ),
+                color=0xff0000
+            )
+        )
+
+    async def _world_stats(self) -> discord.Embed:
+        """
+        Level.sav とプレイヤーの .sav を解析し、ワールドの統計をEmbedにまとめる
+        """
+        try:
+            world_dir = await asyncio.to_thread(find_world_dir, os.path.join(self.server_path, SAVE_SUBDIR))
+            stats = await asyncio.to_thread(world_statistics, world_dir, self.config.get("savedata_workers"))
+        except Exception as e:
+            self.logger.error(f"Failed to decode save data: {e}")
+            return discord.Embed(title="セーブデータの解析に失敗しました", description=f"Error: {e}", color=0xff0000)
+
+        def top(counter: dict, limit: int = 10) -> str:
+            items = sorted(counter.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+            return "\n".join(f"{name}: {count:,}" for name, count in items) or "-"
+
+        embed = discord.Embed(
+            title="ワールドの統計",
+            description=(
+                f"プレイヤー: {len(stats['players'])}人 / パル: {stats['pal_count']:,}体 / "
+                f"拠点: {stats['base_count']} / ギルド: {len(stats['guilds'])}"
+            ),
+            color=0x3498db
+        )
+        embed.add_field(name="パル（種類別）", value=top(stats["pals"]), inline=True)
+        embed.add_field(name="アイテム（合計）", value=top(stats["items"]), inline=True)
+        guilds = "\n".join(f"{name or '-'}: {members}人 / 拠点 {bases}" for name, members, bases in stats["guilds"][:10])
+        embed.add_field(name="ギルド", value=guilds or "-", inline=False)
+        players = sorted(stats["players"], key=lambda p: p[1] or 0, reverse=True)[:10]
+        embed.add_field(
+            name="プレイヤー（レベル順）",
+            value="\n".join(f"{name or '-'}: Lv.{level}" for name, level in players) or "-",
+            inline=False
+        )
+        if stats["player_errors"]:
+            embed.set_footer(text=f"解析できなかったプレイヤーファイル: {stats['player_errors']}")
+        return embed
+
+    async def _verify_backups(self, full: bool = False) -> discord.Embed:
+        async with self.backup_lock:
+            try:
+                result = await asyncio.to_thread(self.backup_engine.verify, None, full)
+            except Exception as e:
+                self.logger.error(f"Backup verification failed: {e}")
+                return discord.Embed(title="バックアップの検証に失敗しました", description=f"Error: {e}", color=0xff0000)
+        description = (
+            f"スナップショット: {result['snapshots']} / チャンク: {result['chunks']}（今回検証 {result['checked']}）\n"
+            f"所要時間: {result['duration']:.1f}秒"
+        )
+        if not result["bad_chunks"]:
+            return discord.Embed(title="バックアップは正常です", description=description, color=0x00ff00)
+        embed = discord.Embed(title="破損したバックアップがあります", description=description, color=0xff0000)
+        embed.add_field(name="破損チャンク", value=str(len(result["bad_chunks"])), inline=False)
+        embed.add_field(name="影響するスナップショット", value="\n".join(result["damaged_snapshots"])[:1000], inline=False)
+        return embed
+
+    async def _scheduled_verify_backups(self):
+        embed = await self._verify_backups()
+        if embed.color.value != 0x00ff00:
+            self._post(embed=embed)
+
+    def _launch_args(self) -> list:
+        """設定 launch_profile で選択された起動プロファイルの起動オプション"""
+        try:
+            return get_profile(self.config)["args"]
+        except KeyError as e:
+            self.logger.error(f"{e}. Using default launch profile")
+            return get_profile(self.config, "default")["args"]
+
+    async def _run_benchmark(self, profile_names: list, soak_minutes: int) -> discord.Embed:
+        """
+        起動プロファイルを順に計測し、比較結果をEmbedにまとめる
+        計測後は選択中のプロファイルでサーバーを起動し直す
+        """
+        profiles = get_launch_profiles(self.config)
+        if profile_names:
+            profiles = [p for p in profiles if p["name"] in profile_names]
+        if not profiles:
+            return discord.Embed(title="計測するプロファイルがありません", color=0xff0000)
+
+        async def on_progress(name, message):
+            self._post(f"ベンチマーク: {name} {message}")
+
+        await self._stop_server()
+        error_embed = await self._check_stopped()
+        if error_embed is not None:
+            return error_embed
+        benchmark = LaunchBenchmark(
+            WindowsServerLauncher(
+                self.server_path, self.server_exe, self.server_cmd_exe, self.rest_api_plugin,
+                resource_manager=self.resource_manager, install_dir=self._process_filter(self.primary_instance)
+            ),
+            profiles,
+            rest_api_plugin=self.rest_api_plugin,
+            ports=self._readiness_ports(),
+            soak_seconds=soak_minutes * 60,
+            sample_interval=float(self.config.get("benchmark_sample_interval", 5)),
+            readiness_timeout=float(self.config.get("readiness_timeout", 300))
+        )
+        try:
+            results = await benchmark.run(on_progress)
+        finally:
+            # 計測の成否にかかわらず、通常の起動オプションでサーバーを戻す
+            started_at = time.monotonic()
+            await self._start_instance(self.primary_instance)
+            ready_embed = await self._wait_server_ready(started_at)
+            self._post(embed=ready_embed)
+
+        embed = discord.Embed(
+            title="起動プロファイルのベンチマーク結果",
+            description=f"```\n{format_report(results)}\n```",
+            color=0x3498db
+        )
+        embed.set_footer(text=f"計測時間: 各{soak_minutes}分 / cpu: 全体に対する% / rss: 最大値")
+        return embed
+
+    @staticmethod
+    def _format_placements(placements: list) -> str:
+        lines = []
+        for p in placements:
+            if "error" in p:
+                lines.append(f"{p.get('name', p['pid'])}: {p['error']}")
+                continue
+            line = f"{p['name']} (pid {p['pid']}): コア {resource_manager.format_cores(p['affinity'])} / 優先度 {p['priority']}"
+            if p.get("errors"):
+                line += f" / 適用失敗: {', '.join(p['errors'])}"
+            lines.append(line)
+        return "\n".join(lines)[:1024] or "対象のプロセスがありません"
+
+    def _readiness_ports(self) -> list:
+        """
+        準備完了の判定で待ち受けを確認するポート
+        設定 readiness_ports（[["udp", 8211], ...]）がなければ、ゲームポートと有効なプラグインのポートを使用する
+        """
+        ports = self.config.get("readiness_ports")
+        if ports is not None:
+            return [tuple(p) for p in ports]
+        ports = [("udp", int(self.config.get("game_port", DEFAULT_GAME_PORT)))]
+        if self.rest_api_plugin is not None:
+            ports.append(("tcp", int(self.rest_api_plugin.port)))
+        if self.rcon_plugin is not None:
+            ports.append(("tcp", int(self.rcon_plugin.port)))
+        return ports
+
+    async def _wait_server_ready(self, started_at: float, instance: ServerInstance = None) -> discord.Embed:
+        """
+        サーバーの準備完了（プロセス・ポート待ち受け・API応答）を待ち、起動時間を記録する
+        :param started_at: 起動コマンドを実行した時刻（time.monotonic）
+        :param instance: 対象のインスタンス（省略時は app.json のサーバー）
+        """
+        instance = instance or self.primary_instance
+        primary = instance is self.primary_instance
+        probe = ReadinessProbe(
+            instance.server_cmd_exe, self._readiness_ports() if primary else instance.readiness_ports(),
+            rest_api_plugin=instance.rest_api_plugin, rcon_plugin=instance.rcon_plugin,
+            timeout=float(self.config.get("readiness_timeout", 300)),
+            install_dir=self._process_filter(instance)
+        )
+        result = await probe.wait_ready(started_at)
+        embed = self._readiness_embed(result, instance)
+        # 起動直後に適用した後で作成された子プロセスにも適用する（準備完了の成否にかかわらず）
+        placements = await self._apply_server_placement(instance)
+        if placements is not None:
+            embed.add_field(name="CPU割り当て", value=self._format_placements(placements), inline=False)
+        if not primary:
+            # 起動時間の記録・クラッシュ監視は app.json のサーバーのみ
+            return embed
+        if self.watchdog is not None:
+            await self.watchdog.arm()
+
+        previous = await asyncio.to_thread(self.boot_history.recent, 10)
+        previous = [e["duration"] for e in previous if e.get("ready")]
+        try:
+            build_id = await asyncio.to_thread(read_local_build_id, self.server_path, self.app_id)
+            await asyncio.to_thread(self.boot_history.append, {
+                "ts": int(time.time()),
+                "ready": result["ready"],
+                "duration": round(result["duration"], 1),
+                "phases": {k: round(v, 1) for k, v in result["phases"].items()},
+                "failed_phase": result["failed_phase"],
+                "build_id": build_id,
+            })
+        except Exception as e:
+            self.logger.error(f"Failed to record boot history: {e}")
+
+        if not result["ready"]:
+            return embed
+        if previous:
+            embed.set_footer(text=f"前回: {previous[0]:.0f}秒 / 直近{len(previous)}回の平均: {sum(previous) / len(previous):.0f}秒")
+        return embed
+
+    def _readiness_embed(self, result: dict, instance: ServerInstance) -> discord.Embed:
+        label = self._instance_label(instance)
+        phase_names = {"process": "プロセス起動", "ports": "ポート待ち受け", "api": "API応答"}
+        if not result["ready"]:
+            if result.get("exited"):
+                description = f"{phase_names[result['failed_phase']]}の前にサーバープロセスが終了しました（{result['duration']:.0f}秒）。"
+            else:
+                description = (
+                    f"{phase_names[result['failed_phase']]}が{result['duration']:.0f}秒以内に完了しませんでした。"
+                    + (f"\nError: {result['error']}" if result["error"] else "")
+                )
+            return discord.Embed(
+                title=f"{label}サーバーの起動を確認できませんでした",
+                description=description,
+                color=0xff0000
+            )
+        embed = discord.Embed(
+            title=f"{label}サーバーの準備が完了しました",
+            description=f"起動時間: {result['duration']:.0f}秒",
+            color=0x00ff00
+        )
+        for phase, seconds in result["phases"].items():
+            embed.add_field(name=phase_names[phase], value=f"{seconds:.0f}秒", inline=True)
+        return embed
+
+    async def _watchdog_restart(self):
+        """クラッシュ後の自動再起動"""
+        async with self.primary_instance.lock:
+            # ロックを待つ間に別の操作（再起動・復元など）でサーバーが起動された場合は何もしない
+            if await check_server_status(self.server_exe, self._process_filter(self.primary_instance)):
+                self.logger.info("Server is already running, skipping watchdog restart")
+                await self.watchdog.arm()
+                return
+            started_at = time.monotonic()
+            _, start_embed = await self._start_instance(self.primary_instance)
+            self._post(embed=start_embed)
+            ready_embed = await self._wait_server_ready(started_at)
+            self._post(embed=ready_embed)
+
+    async def _on_server_crash(self, report: dict):
+        """クラッシュをチャンネルに通知（ログの末尾を添付）"""
+        if report["gave_up"]:
+            embed = discord.Embed(
+                title="サーバーのクラッシュが続いています",
+                description=(
+                    f"{report['window'] / 60:.0f}分以内に{report['crash_count']}回クラッシュしたため、自動再起動を停止しました。\n"
+                    f"原因を確認し、/start_server で起動してください。"
+                ),
+                color=0xff0000
+            )
+        else:
+            embed = discord.Embed(
+                title="サーバーがクラッシュしました",
+                description=f"{report['next_delay']:.0f}秒後に自動で再起動します。（{report['crash_count']}回目）",
+                color=0xff0000
+            )
+        exit_code = report["exit_code"] if report["exit_code"] is not None else "不明"
+        embed.add_field(name="終了コード", value=str(exit_code), inline=True)
+        embed.add_field(name="稼働時間", value=format_duration(report["uptime"]), inline=True)
+        if report["log_tail"]:
+            # フィールドの上限（1024文字）に収まるよう末尾を残す
+            embed.add_field(name="サーバーログ（末尾）", value=f"```\n{report['log_tail'][-1000:]}\n```", inline=False)
+        self._post(embed=embed)
+
+    async def _restart_server(self, wait_minutes: int, update: bool, instance: ServerInstance = None):
+        """
+        カウントダウンのアナウンス後にサーバーを再起動する
+        同じインスタンスの再起動がカウントダウン中の場合は何もしない
+        :param instance: 対象のインスタンス（省略時は app.json のサーバー）
+        """
+        instance = instance or self.primary_instance
+        if instance.restart_pending:
+            self.logger.warning(f"Restart already pending, skipping ({instance.name})")
+            return
+        instance.restart_pending = True
+        try:
+            await self._run_restart(wait_minutes, update, instance)
+        finally:
+            instance.restart_pending = False
+
+    async def _run_restart(self, wait_minutes: int, update: bool, instance: ServerInstance):
+        primary = instance is self.primary_instance
+        label = self._instance_label(instance)
+        self.logger.info(f"Task executed: restart_server ({instance.name})")
+
+        # アップデートの有無を先に確認し、段階的アップデートが有効なら稼働中にダウンロードを始める
+        check = None
+        staged_task = None
+        if update and primary:
+            check = await self.update_checker.check()
+            skip = check["update_available"] is False and self.config.get("skip_update_when_current", True)
+            if not skip and self.config.get("staged_update", False):
+                self.logger.info("Starting staged update download during countdown")
+                staged_task = asyncio.create_task(
+                    self.staged_updater.prepare(self._make_progress_reporter("アップデート事前ダウンロード進捗"))
+                )
 
-        channel = self.client.get_channel(self.channel_id)  # チャンネルIDからチャンネルを取得
         # メッセージを投稿する
         embed = discord.Embed(
-            title="サーバー再起動アナウンス",
+            title=f"{label}サーバー再起動アナウンス",
             description="これより、サーバー再起動を開始します。"
         )
-        if channel and self.send_flag:
-            await channel.send(embed=embed)
+        self._post(embed=embed)
 
         # 再起動処理の進行を報告
         if wait_minutes > 10:
             #10分以上の処理
             for remaining in range(wait_minutes, 0, -10):
-                if channel and self.send_flag:
-                    await channel.send(
-                        embed = discord.Embed(
-                            title="サーバー再起動アナウンス",
-                            description=f"あと{remaining}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。"
-                        )
+                self._post(
+                    embed=discord.Embed(
+                        title=f"{label}サーバー再起動アナウンス",
+                        description=f"あと{remaining}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。"
                     )
-                if self.rest_api_plugin is not None:
-                    await self._send_announcement(f"アナウンス: {remaining}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。")
+                )
+                if instance.rest_api_plugin is not None:
+                    await self._send_announcement(f"アナウンス: {remaining}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。", instance)
                 await asyncio.sleep(600)
 
             # 残り時間が10分未満の場合の通知
             if wait_minutes % 10 != 0:
                 remaining = wait_minutes % 10
-                if channel and self.send_flag:
-                    await channel.send(
-                        embed = discord.Embed(
-                            title="サーバー再起動アナウンス",
-                            description=f"あと{remaining}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。"
-                        )
+                self._post(
+                    embed=discord.Embed(
+                        title=f"{label}サーバー再起動アナウンス",
+                        description=f"あと{remaining}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。"
                     )
-                if self.rest_api_plugin is not None:
-                    await self._send_announcement(f"アナウンス: {remaining}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。")
+                )
+                if instance.rest_api_plugin is not None:
+                    await self._send_announcement(f"アナウンス: {remaining}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。", instance)
                 await asyncio.sleep(remaining * 60)
         else:
             # 10分以下の処理
-            if channel and self.send_flag:
-                await channel.send(
-                    embed = discord.Embed(
-                        title="サーバー再起動アナウンス",
-                        description=f"あと{wait_minutes}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。"
-                    )
+            self._post(
+                embed=discord.Embed(
+                    title=f"{label}サーバー再起動アナウンス",
+                    description=f"あと{wait_minutes}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。"
                 )
-            if self.rest_api_plugin is not None:
-                await self._send_announcement(f"アナウンス: {wait_minutes}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。")
+            )
+            if instance.rest_api_plugin is not None:
+                await self._send_announcement(f"アナウンス: {wait_minutes}分後にサーバーが再起動されます。攻略中や作業中の方はご注意ください。", instance)
             await asyncio.sleep(wait_minutes * 60)
 
-        # サーバー停止
-        stop_embed = await stop_server(self.server_cmd_exe, self.server_exe)
-        if channel and self.send_flag:
-            await channel.send(embed=stop_embed)
-
-        # サーバーアップデート（必要な場合）
-        if update:
-            if channel and self.send_flag:
-                await channel.send(
-                    embed = discord.Embed(
+        # 事前ダウンロードの完了を待つ（サーバー稼働中に待つことで停止時間を延ばさない）
+        prepared = None
+        if staged_task is not None:
+            if not staged_task.done():
+                self._post(
+                    embed=discord.Embed(
                         title="サーバーアップデート",
-                        description=f"サーバーのアップデートを開始します。"
+                        description="アップデートの事前ダウンロード完了を待っています。"
                     )
                 )
-            update_embed = await update_server(self.steamcmd_path, self.server_path, self.app_id)
-            if channel and self.send_flag:
-                await channel.send(embed = update_embed)
-
-        # サーバー再起動
-        start_embed = await start_server(self.server_path, self.server_exe)
-        if channel and self.send_flag:
-            await channel.send(embed = start_embed)
-        self.logger.info(f"Task executed completes: restart_server")
+            try:
+                prepared = await staged_task
+            except Exception as e:
+                self.logger.error(f"Staged update download failed, falling back to full update: {e}")
+
+        # 停止・アップデートの前にバックアップを作成する（稼働中に保存してから取得し、停止時間を延ばさない）
+        if primary:
+            _, backup_embed = await self._create_backup("pre-restart")
+            self._post(embed=backup_embed)
+
+        # 停止から起動までの間のみ、同じインスタンスへの他の操作（起動・停止・クラッシュ後の再起動など）を待たせる
+        async with instance.lock:
+            # サーバー停止
+            stop_embed = await self._stop_server(instance)
+            self._post(embed=stop_embed)
+            if update or prepared is not None:
+                # 実行中のサーバーのファイルは入れ替えない
+                error_embed = await self._check_stopped(instance)
+                if error_embed is not None:
+                    self._post(embed=error_embed)
+                    self.logger.error(f"Restart aborted: server is still running ({instance.name})")
+                    return
+
+            # サーバーアップデート（必要な場合）
+            if prepared is not None:
+                # 停止中は変更ファイルの入れ替えのみ行う
+                update_embed = await self._swap_staged_update(prepared)
+                self._post(embed=update_embed)
+            elif update and not primary:
+                # 追加のインスタンスは共有インストールからの配布で更新する
+                update_embed = await self._sync_instance(instance)
+                self._post(embed=update_embed)
+            elif update:
+                # 新しいビルドがなければ、ファイル全体の再検証を伴うアップデートを省略する
+                if check["update_available"] is False and self.config.get("skip_update_when_current", True):
+                    self._post(
+                        embed=discord.Embed(
+                            title="サーバーアップデート",
+                            description=f"サーバーは最新です（ビルド {check['local']}）。アップデートをスキップします。"
+                        )
+                    )
+                else:
+                    self._post(
+                        embed=discord.Embed(
+                            title="サーバーアップデート",
+                            description=f"サーバーのアップデートを開始します。"
+                        )
+                    )
+                    # 最新と分かっている場合（スキップ無効時）や、ローカル検証で問題がない場合は validate を省略する
+                    validate = check["update_available"] is not False and await self._needs_validate()
+                    update_embed = await self._update_server_with_progress(validate=validate)
+                    self._post(embed=update_embed)
+
+            # サーバー再起動（接続を受け付けられる状態になってから完了を通知する）
+            started_at = time.monotonic()
+            _, start_embed = await self._start_instance(instance)
+            self._post(embed=start_embed)
+            ready_embed = await self._wait_server_ready(started_at, instance)
+            self._post(embed=ready_embed)
+        self.logger.info(f"Task executed completes: restart_server ({instance.name})")
 
     @tasks.loop(minutes=1)  # 毎分チェック
     async def memory_check_task(self):
-        memory_usage = psutil.virtual_memory().percent
+        # サーバー状態の監視で取得した直近の値があれば使う
+        snapshot = self.process_snapshot
+        memory_usage = snapshot.memory_percent if snapshot is not None and snapshot.age() < 30 else psutil.virtual_memory().percent
         alert_level = None
 
         # メモリ使用率に応じてアラートレベルを設定
@@ -475,17 +1864,14 @@ class DiscordBot:
         # 状態が変わった場合のみメッセージを送信
         if alert_level != self.last_alert_level:
             self.last_alert_level = alert_level
-            channel = self.client.get_channel(self.channel_id)
-
             if self.is_first_run:
                 self.is_first_run = False
-                if channel and self.send_flag:
-                    embed = discord.Embed(
-                        title="メモリ使用量監視開始",
-                        description="メモリ使用量の監視を開始しました。\nサーバーの状態を監視しています。",
-                        color=0x00ff00
-                    )
-                    await channel.send(embed=embed)
+                embed = discord.Embed(
+                    title="メモリ使用量監視開始",
+                    description="メモリ使用量の監視を開始しました。\nサーバーの状態を監視しています。",
+                    color=0x00ff00
+                )
+                self._post(embed=embed, key="memory_alert")
                 return  # 初回実行時は何もしない
             
             if alert_level == "critical":
@@ -516,33 +1902,101 @@ class DiscordBot:
             else:
                 return  # その他のケースでは何もしない
 
-            if channel and self.send_flag:
-                await channel.send(embed=embed)
+            # 未送信の古い警告は最新の状態で置き換える
+            self._post(embed=embed, key="memory_alert")
 
     @tasks.loop(seconds=5)  # サーバー状態の監視
     async def server_status_check_task(self):
-        current_status = await check_server_status(self.server_exe)
+        # 全インスタンスの状態を1回のプロセス走査で確認する（メモリ監視などもこの結果を使う）
+        self.process_snapshot = await asyncio.to_thread(ProcessSnapshot, self.instances.values())
 
-        # サーバーの状態が変化した場合のみ通知
-        if current_status != self.last_server_status:
-            self.last_server_status = current_status
-            channel = self.client.get_channel(self.channel_id)
+        for instance in self.instances.values():
+            current_status = self.process_snapshot.is_running(instance)
 
+            # サーバーの状態が変化した場合のみ通知
+            if current_status == instance.last_status:
+                continue
+            instance.last_status = current_status
+            label = self._instance_label(instance)
             if current_status:
                 embed = discord.Embed(
-                    title="サーバー起動",
+                    title=f"{label}サーバー起動",
                     description="サーバーが正常に起動しています。",
                     color=0x00ff00
                 )
             else:
                 embed = discord.Embed(
-                    title="サーバー停止",
+                    title=f"{label}サーバー停止",
                     description="サーバーが停止しました。確認してください。",
                     color=0xff0000
                 )
 
-            if channel and self.send_flag:
-                await channel.send(embed=embed)
+            # 起動・停止が短時間に繰り返された場合は最新の状態のみ送る
+            self._post(embed=embed, key=f"server_status:{instance.name}")
+
+    async def _on_log_event(self, event: dict):
+        """
+        サーバーログのイベントをチャンネルに通知する（通知する種類は設定 log_notifications）
+        参加・退出は REST API によるプレイヤー追跡が無効な場合のみ通知する
+        """
+        kind = event["kind"]
+        if kind not in self.config.get("log_notifications", ["join", "leave", "chat"]):
+            return
+        # チャットはチャットブリッジが有効な場合、ブリッジのチャンネルへ転送する
+        if kind == "chat" and self.chat_bridge is not None:
+            return
+        if kind in ("join", "leave") and (self.player_tracker is not None or not self.config.get("player_notifications", True)):
+            return
+        player = event.get("player", "")
+        if kind == "join":
+            embed = discord.Embed(title="プレイヤー参加", description=f"{player} さんが参加しました。", color=0x00ff00)
+        elif kind == "leave":
+            embed = discord.Embed(title="プレイヤー退出", description=f"{player} さんが退出しました。", color=0x808080)
+        elif kind == "chat":
+            # プレイヤーの発言でメンションが飛ばないようにする
+            self._post(
+                f"[ゲーム内チャット] {player}: {event.get('message', '')}",
+                allowed_mentions=discord.AllowedMentions.none()
+            )
+            return
+        else:
+            embed = discord.Embed(
+                title="サーバーログ: クラッシュ" if kind == "crash" else "サーバーログ: エラー",
+                description=f"```\n{event['line'][:1000]}\n```",
+                color=0xff0000
+            )
+        self._post(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
+    async def _send_bridge_to_discord(self, text: str):
+        # 送信の失敗をブリッジ側で記録できるよう、送信完了を待つ
+        future = self._post(text, channel_id=self.chat_bridge_channel_id, allowed_mentions=discord.AllowedMentions.none())
+        if future is not None:
+            await future
+
+    async def _send_bridge_to_game(self, text: str):
+        await self.rest_api_plugin.async_send_command("announce", "POST", {"message": text})
+
+    async def _on_message(self, message: discord.Message):
+        """チャットブリッジのチャンネルへの投稿をゲームへ転送する"""
+        if self.chat_bridge is None or message.channel.id != self.chat_bridge_channel_id:
+            return
+        if message.author.bot or not message.clean_content:
+            return
+        self.chat_bridge.from_discord(message.author.display_name, message.clean_content)
+
+    async def _on_player_event(self, event: str, key: str, name: str, seconds: float):
+        """プレイヤーの参加/退出をチャンネルに通知"""
+        if not self.config.get("player_notifications", True):
+            return
+        if event == "join":
+            embed = discord.Embed(title="プレイヤー参加", description=f"{name} さんが参加しました。", color=0x00ff00)
+        else:
+            embed = discord.Embed(
+                title="プレイヤー退出",
+                description=f"{name} さんが退出しました。（プレイ時間: {format_duration(seconds)}）",
+                color=0x808080
+            )
+        self._post(embed=embed)
 
     def _import_plugins(self):
         """
@@ -603,6 +2057,14 @@ class DiscordBot:
         hour = task['hour']
         minute = task['minute']
         repeat = task['repeat']  # True: 毎回, False: 1回のみ
+        # instance を省略したタスクは既定のサーバーを再起動する
+        instance = self.instances.get(task.get("instance") or self.primary_instance.name)
+        if instance is None:
+            self.logger.error(f"タスクのインスタンスが見つかりません: {task}")
+            return
+        job_id = f"{task['name']}_{weekday}_{hour}_{minute}"
+        if instance is not self.primary_instance:
+            job_id = f"{instance.name}_{job_id}"
 
         # CronTrigger を作成
         trigger = CronTrigger(day_of_week=weekday, hour=hour, minute=minute)
@@ -614,27 +2076,30 @@ class DiscordBot:
         if repeat:
             # 繰り返しタスク
             self.scheduler.add_job(
-                lambda: asyncio.run_coroutine_threadsafe(self._restart_server(60, True), main_loop),
+                lambda: asyncio.run_coroutine_threadsafe(self._scheduled_restart(instance), main_loop),
                 trigger,
-                id=f"{task['name']}_{weekday}_{hour}_{minute}",
+                id=job_id,
                 replace_existing=True
             )
-            self.logger.info(f"繰り返しタスクをスケジュール: {weekday} {hour}:{minute}")
+            self.logger.info(f"繰り返しタスクをスケジュール: {instance.name} {weekday} {hour}:{minute}")
         else:
             # 1回のみタスク
             self.scheduler.add_job(
-                lambda: asyncio.run_coroutine_threadsafe(self._restart_server(60, True), main_loop),
+                lambda: asyncio.run_coroutine_threadsafe(self._scheduled_restart(instance), main_loop),
                 trigger,
-                id=f"{task['name']}_{weekday}_{hour}_{minute}",
+                id=job_id,
                 replace_existing=True,
                 next_run_time=trigger.get_next_fire_time(datetime.now())  # 次回実行時刻を設定
             )
-            self.logger.info(f"1回限りのタスクをスケジュール: {weekday} {hour}:{minute}")
+            self.logger.info(f"1回限りのタスクをスケジュール: {instance.name} {weekday} {hour}:{minute}")
 
     async def load_scheduled_tasks(self):
         """スケジュールタスクをロード"""
         try:
-            tasks = self.config.get('tasks', [])
+            tasks = list(self.config.get('tasks', []))
+            # インスタンスの定義に含まれる再起動タスク
+            for instance in self.instances.values():
+                tasks.extend({**task, "instance": instance.name} for task in instance.tasks)
             for task in tasks:
                 self.logger.info(f"タスクのスケジュールを実施... {task}")
                 await self.schedule_task(task)
@@ -647,8 +2112,6 @@ class DiscordBot:
         try:
             await self.tree.sync()  # コマンドを同期
             await self.client.wait_until_ready()
-            channel = self.client.get_channel(self.channel_id)  # チャンネルIDからチャンネルを取得
-
             # スケジューラを開始
             self.logger.info("Starting scheduler")
             self.scheduler.start()
@@ -656,14 +2119,49 @@ class DiscordBot:
             # スケジュールタスクをロード
             await self.load_scheduled_tasks()
 
+            # 定期バックアップを登録（0 で無効）
+            backup_interval = int(self.config.get("backup_interval_minutes", 60))
+            if backup_interval > 0:
+                main_loop = asyncio.get_running_loop()
+                self.scheduler.add_job(
+                    lambda: asyncio.run_coroutine_threadsafe(self._scheduled_backup(), main_loop),
+                    IntervalTrigger(minutes=backup_interval),
+                    id="scheduled_backup",
+                    replace_existing=True
+                )
+                self.logger.info(f"定期バックアップをスケジュール: {backup_interval}分ごと")
+
+            # 期限切れバックアップの削除と空き容量の予測を登録（0 で無効）
+            maintain_interval = int(self.config.get("backup_prune_interval_minutes", 60))
+            if maintain_interval > 0:
+                main_loop = asyncio.get_running_loop()
+                self.scheduler.add_job(
+                    lambda: asyncio.run_coroutine_threadsafe(self._maintain_backups(), main_loop),
+                    IntervalTrigger(minutes=maintain_interval),
+                    id="backup_maintenance",
+                    replace_existing=True
+                )
+                self.logger.info(f"バックアップの世代管理をスケジュール: {maintain_interval}分ごと")
+
+            # バックアップの定期検証を登録（前回以降に追加されたチャンクのみ検証する、0 で無効）
+            verify_interval = int(self.config.get("backup_verify_interval_hours", 24))
+            if verify_interval > 0:
+                main_loop = asyncio.get_running_loop()
+                self.scheduler.add_job(
+                    lambda: asyncio.run_coroutine_threadsafe(self._scheduled_verify_backups(), main_loop),
+                    IntervalTrigger(hours=verify_interval),
+                    id="scheduled_backup_verify",
+                    replace_existing=True
+                )
+                self.logger.info(f"バックアップの定期検証をスケジュール: {verify_interval}時間ごと")
+
             # メッセージを投稿する
             embed = discord.Embed(
                 title="Botが起動しました",
                 description="コマンドの準備が整いました。必要なコマンドを入力してください。(/helpでコマンド一覧を表示)",
                 color=0x00ff00
             )
-            if channel and self.send_flag:
-                await channel.send(embed=embed)
+            self._post(embed=embed)
 
             # メモリ使用量を監視
             self.logger.info("Starting memory check task")
@@ -672,6 +2170,37 @@ class DiscordBot:
             # サーバー状態を監視
             self.logger.info("Starting server status check task")
             self.server_status_check_task.start()
+
+            # CPU割り当てを適用（Botはバックグラウンド用のコア、起動中のサーバーはサーバー用のコア）
+            if self.resource_manager is not None:
+                self.logger.info("Applying resource placement")
+                await asyncio.to_thread(self.resource_manager.apply_bot)
+                await self._apply_server_placement()
+
+            # クラッシュ監視を開始（起動中のサーバーがあれば監視する）
+            if self.watchdog is not None:
+                self.logger.info("Starting server watchdog")
+                await self.watchdog.arm(missing_is_crash=False)
+
+            # メトリックの収集を開始
+            if self.metrics_collector is not None:
+                self.logger.info("Starting metrics collector")
+                self.metrics_collector.start()
+
+            # サーバーログの監視を開始
+            if self.log_tailer is not None:
+                self.logger.info("Starting log tailer")
+                self.log_tailer.start()
+
+            # チャットブリッジを開始
+            if self.chat_bridge is not None:
+                self.logger.info("Starting chat bridge")
+                self.chat_bridge.start()
+
+            # プレイヤーの追跡を開始
+            if self.player_tracker is not None:
+                self.logger.info("Starting player tracker")
+                self.player_tracker.start()
         except Exception as e:
             self.logger.error(f"Error during on_ready: {e}")
 
@@ -681,6 +2210,10 @@ class DiscordBot:
         async def on_ready():
             await self._on_ready()
 
+        @self.client.event
+        async def on_message(message):
+            await self._on_message(message)
+
         try:
             self.client.run(self.token)
         except Exception as e:
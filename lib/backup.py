@@ -0,0 +1,619 @@
+import os
+import json
+import mmap
+import shutil
+import time
+import zlib
+import hashlib
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from lib import resource_manager
+
+# zstandard がインストールされていれば zstd で圧縮し、なければ zlib を使用する
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# fastcdc（ネイティブ実装）がインストールされていれば内容に基づいて分割し、なければ固定長で分割する
+# （Python で1バイトずつハッシュを計算すると、大きなセーブデータではコピーより遅くなるため）
+try:
+    from fastcdc.fastcdc_cy import fastcdc_cy
+except ImportError:
+    fastcdc_cy = None
+
+# セーブデータの場所（インストールディレクトリからの相対パス）
+SAVE_SUBDIR = os.path.join("Pal", "Saved", "SaveGames")
+
+# チャンク分割のパラメーター（平均 64KB、固定長で分割する場合は平均の長さで区切る）
+MIN_CHUNK_SIZE = 16 * 1024
+AVG_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+
+CHUNK_DIR = "chunks"
+SNAPSHOT_DIR = "snapshots"
+# 検証済みチャンクの記録（1行1チャンクID、追記のみ）
+VERIFIED_FILE = "verified_chunks.txt"
+# 保存済みチャンクの索引（1行 "ID 形式 圧縮後サイズ"、追記のみ）
+# 削除・容量計算のたびに chunks 以下を走査しなくて済むようにする
+INDEX_FILE = "chunk_index.txt"
+CODEC_EXTENSIONS = {"zstd": ".zst", "zlib": ".zz"}
+
+logger = logging.getLogger("Backup")
+
+
+def chunk_boundaries(data, min_size: int = MIN_CHUNK_SIZE, avg_size: int = AVG_CHUNK_SIZE,
+                     max_size: int = MAX_CHUNK_SIZE) -> list:
+    """
+    チャンクの終了位置の一覧を求める
+    fastcdc がある場合は内容に基づいて分割する（データの途中に挿入・削除があっても、その前後以外のチャンク境界は変わらない）
+    ない場合は avg_size ごとの固定長で分割する
+    :param data: bytes、または read() を持つオブジェクト（mmap など、全体をコピーせずに読み込む）
+    """
+    length = len(data)
+    if fastcdc_cy is None:
+        return list(range(avg_size, length, avg_size)) + ([length] if length else [])
+    if hasattr(data, "seek"):
+        data.seek(0)
+    # 末尾が min_size より短い場合、fastcdc は最後のチャンクの長さを min_size として返すため、データの長さで切り詰める
+    return [min(c.offset + c.length, length) for c in fastcdc_cy(data, min_size, avg_size, max_size)]
+
+
+def chunk_id(data) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class BackupVerifyError(Exception):
+    """復元したデータやチャンクの内容がマニフェストと一致しない"""
+
+
+def _compress(data) -> tuple:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard がインストールされていません")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def chunk_path(repo_dir: str, cid: str, codec: str) -> str:
+    return os.path.join(repo_dir, CHUNK_DIR, cid[:2], cid + CODEC_EXTENSIONS[codec])
+
+
+def find_chunk(repo_dir: str, cid: str) -> tuple:
+    """保存済みのチャンクを探し、(codec, パス) を返す（見つからない場合は (None, None)）"""
+    for codec in CODEC_EXTENSIONS:
+        path = chunk_path(repo_dir, cid, codec)
+        if os.path.exists(path):
+            return codec, path
+    return None, None
+
+
+def read_chunk(repo_dir: str, cid: str) -> bytes:
+    codec, path = find_chunk(repo_dir, cid)
+    if path is None:
+        raise FileNotFoundError(f"チャンクが見つかりません: {cid}")
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return _decompress(codec, data)
+    except RuntimeError:
+        raise
+    except Exception as e:
+        # zlib.error / zstandard.ZstdError など、展開できないチャンクは破損として扱う
+        raise BackupVerifyError(f"チャンクを展開できません: {cid} ({e})") from e
+
+
+def _store_file(args) -> tuple:
+    """
+    プロセスプール用: ファイルをチャンクに分割し、未保存のチャンクのみ圧縮して保存する
+    :return: (rel, [[chunk_id, 長さ], ...], ファイル全体のダイジェスト, [[新規チャンクID, 形式, 圧縮後サイズ], ...])
+    """
+    rel, path, repo_dir = args
+    chunks = []
+    new_chunks = []
+    file_hash = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return rel, chunks, file_hash.hexdigest(), new_chunks
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            for cut in chunk_boundaries(mm):
+                data = mm[start:cut]
+                file_hash.update(data)
+                cid = chunk_id(data)
+                chunks.append([cid, cut - start])
+                start = cut
+                if find_chunk(repo_dir, cid)[1] is not None:
+                    continue
+                codec, compressed = _compress(data)
+                target = chunk_path(repo_dir, cid, codec)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # 他のワーカーと同じチャンクを同時に書いても壊れないよう、一時ファイルから rename する
+                tmp = f"{target}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as out:
+                    out.write(compressed)
+                os.replace(tmp, target)
+                new_chunks.append([cid, codec, len(compressed)])
+    return rel, chunks, file_hash.hexdigest(), new_chunks
+
+
+def _delete_files(paths: list) -> int:
+    """プロセスプール用: ファイルを削除する（既にないファイルは無視する）"""
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def _scan(root: str) -> dict:
+    """バックアップ対象のファイルを (サイズ, 更新時刻ns) で一覧化する"""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            files[os.path.relpath(path, root)] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+class BackupEngine:
+    """
+    セーブデータの重複排除バックアップ
+
+    - ファイルを内容に基づくチャンクに分割し、同じ内容のチャンクは一度だけ保存する
+    - 前回のスナップショットからサイズ・更新時刻が変わっていないファイルは読み込まずにチャンク一覧を引き継ぐ
+    - スナップショットごとにファイル構成とチャンク一覧を記録した小さなマニフェスト（JSON）を書き出す
+
+    保存先の構成:
+      <repo_dir>/chunks/<id先頭2文字>/<id>.zst
+      <repo_dir>/snapshots/<スナップショットID>.json
+    """
+
+    def __init__(self, source_dir: str, repo_dir: str, workers: int = None):
+        self.source_dir = source_dir
+        self.repo_dir = repo_dir
+        self.workers = workers
+
+    def snapshot(self, reason: str = "manual") -> dict:
+        """
+        スナップショットを作成し、マニフェストを返す
+        """
+        started = time.monotonic()
+        if not os.path.isdir(self.source_dir):
+            raise FileNotFoundError(f"セーブデータのディレクトリが見つかりません: {self.source_dir}")
+        os.makedirs(os.path.join(self.repo_dir, SNAPSHOT_DIR), exist_ok=True)
+
+        current = _scan(self.source_dir)
+        previous = self.latest()
+        previous_files = previous["files"] if previous else {}
+
+        files = {}
+        to_store = []
+        for rel, (size, mtime_ns) in current.items():
+            entry = previous_files.get(rel)
+            if entry and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+                files[rel] = entry
+            else:
+                to_store.append(rel)
+
+        new_chunks = {}
+        for rel, chunks, digest, stored in self._store_many(to_store):
+            size, mtime_ns = current[rel]
+            files[rel] = {"size": size, "mtime_ns": mtime_ns, "digest": digest, "chunks": chunks}
+            # 同じチャンクを複数のワーカーが同時に保存した場合は1つとして数える
+            for cid, codec, stored_size in stored:
+                new_chunks[cid] = (codec, stored_size)
+        self._append_index(new_chunks)
+        stored_bytes = sum(size for _, size in new_chunks.values())
+
+        now = datetime.now()
+        snapshot_id = f"{now.strftime('%Y%m%d-%H%M%S')}-{reason}"
+        suffix = 1
+        while os.path.exists(self._snapshot_path(snapshot_id)):
+            suffix += 1
+            snapshot_id = f"{now.strftime('%Y%m%d-%H%M%S')}-{reason}-{suffix}"
+        manifest = {
+            "id": snapshot_id,
+            "created": now.timestamp(),
+            "reason": reason,
+            "files": files,
+            "stats": {
+                "files": len(files),
+                "bytes": sum(e["size"] for e in files.values()),
+                "changed_files": len(to_store),
+                "new_chunks": len(new_chunks),
+                "stored_bytes": stored_bytes,
+                "duration": time.monotonic() - started,
+            },
+        }
+        path = self._snapshot_path(manifest["id"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Snapshot {manifest['id']} created: {manifest['stats']}")
+        return manifest
+
+    def _store_many(self, rels: list) -> list:
+        if not rels:
+            return []
+        jobs = [(rel, os.path.join(self.source_dir, rel), self.repo_dir) for rel in rels]
+        # 変更が1ファイルでもプロセスプールで実行する（分割・圧縮で Bot のプロセスの GIL を占有しない）
+        workers = min(self.workers or os.cpu_count() or 1, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers, initializer=resource_manager.init_background_worker,
+                                 initargs=(resource_manager.worker_settings(),)) as executor:
+            return list(executor.map(_store_file, jobs))
+
+    # ---- チャンクの索引 ----
+
+    def _index_path(self) -> str:
+        return os.path.join(self.repo_dir, INDEX_FILE)
+
+    def _append_index(self, chunks: dict):
+        if not chunks:
+            return
+        if not os.path.exists(self._index_path()):
+            # 索引がない場合は作り直す（今回保存したチャンクも走査で見つかる）
+            self.chunk_index()
+            return
+        with open(self._index_path(), "a", encoding="utf-8") as f:
+            f.writelines(f"{cid} {codec} {size}\n" for cid, (codec, size) in chunks.items())
+
+    def chunk_index(self) -> dict:
+        """
+        保存済みチャンクの一覧 {チャンクID: (形式, 圧縮後サイズ)} を返す
+        索引ファイルがない場合のみ chunks ディレクトリを走査して作成する
+        """
+        path = self._index_path()
+        if os.path.exists(path):
+            index = {}
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 3:
+                        index[parts[0]] = (parts[1], int(parts[2]))
+            return index
+        index = {}
+        extensions = {ext: codec for codec, ext in CODEC_EXTENSIONS.items()}
+        for dirpath, _, filenames in os.walk(os.path.join(self.repo_dir, CHUNK_DIR)):
+            for name in filenames:
+                cid, ext = os.path.splitext(name)
+                if ext in extensions:
+                    index[cid] = (extensions[ext], os.path.getsize(os.path.join(dirpath, name)))
+        self._write_index(index)
+        return index
+
+    def _write_index(self, index: dict):
+        os.makedirs(self.repo_dir, exist_ok=True)
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{cid} {codec} {size}\n" for cid, (codec, size) in index.items())
+        os.replace(tmp_path, self._index_path())
+
+    def repo_size(self) -> int:
+        """チャンクの合計サイズ（圧縮後）"""
+        return sum(size for _, size in self.chunk_index().values())
+
+    # ---- 削除 ----
+
+    def prune(self, snapshot_ids: list) -> dict:
+        """
+        スナップショットを削除し、どのスナップショットからも参照されなくなったチャンクを削除する
+        ファイルの削除はバックグラウンド用の割り当て（低いI/O優先度）を適用した別プロセスで行う
+        """
+        started = time.monotonic()
+        remove = set(snapshot_ids)
+        for snapshot_id in remove:
+            path = self._snapshot_path(snapshot_id)
+            if os.path.exists(path):
+                os.remove(path)
+
+        referenced = set()
+        for snapshot_id in self.list_snapshots():
+            for entry in self.load(snapshot_id)["files"].values():
+                referenced.update(cid for cid, _ in entry["chunks"])
+        index = self.chunk_index()
+        garbage = [cid for cid in index if cid not in referenced]
+        paths = [chunk_path(self.repo_dir, cid, index[cid][0]) for cid in garbage]
+        freed = sum(index[cid][1] for cid in garbage)
+
+        if paths:
+            with ProcessPoolExecutor(max_workers=1, initializer=resource_manager.init_background_worker,
+                                     initargs=(resource_manager.worker_settings(),)) as executor:
+                executor.submit(_delete_files, paths).result()
+            for cid in garbage:
+                del index[cid]
+            self._write_index(index)
+            self._forget_verified(set(garbage))
+
+        result = {
+            "snapshots": len(remove),
+            "chunks": len(garbage),
+            "freed_bytes": freed,
+            "duration": time.monotonic() - started,
+        }
+        logger.info(f"Pruned backups: {result}")
+        return result
+
+    def _forget_verified(self, chunk_ids: set):
+        verified = self._load_verified()
+        if not verified & chunk_ids:
+            return
+        path = os.path.join(self.repo_dir, VERIFIED_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(cid + "\n" for cid in verified - chunk_ids)
+        os.replace(path + ".tmp", path)
+
+    def _snapshot_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.repo_dir, SNAPSHOT_DIR, f"{snapshot_id}.json")
+
+    def list_snapshots(self) -> list:
+        """スナップショットIDの一覧（古い順）"""
+        directory = os.path.join(self.repo_dir, SNAPSHOT_DIR)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+
+    def snapshot_times(self) -> list:
+        """
+        [(スナップショットID, 作成時刻), ...]（古い順）
+        作成時刻はIDの日時部分から求め、マニフェストは読み込まない
+        """
+        times = []
+        for snapshot_id in self.list_snapshots():
+            try:
+                times.append((snapshot_id, datetime.strptime(snapshot_id[:15], "%Y%m%d-%H%M%S").timestamp()))
+            except ValueError:
+                logger.warning(f"Unexpected snapshot id: {snapshot_id}")
+        return times
+
+    def load(self, snapshot_id: str) -> dict:
+        with open(self._snapshot_path(snapshot_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def latest(self) -> dict:
+        snapshots = self.list_snapshots()
+        return self.load(snapshots[-1]) if snapshots else None
+
+    # ---- 復元 ----
+
+    def staging_dir(self) -> str:
+        """
+        復元データを準備するディレクトリ
+        入れ替えを rename だけで済ませるため、セーブデータと同じボリューム上に置く
+        """
+        return self.source_dir.rstrip("\\/") + ".restore"
+
+    def _displaced_dir(self) -> str:
+        """入れ替え中に元のファイルを退避するディレクトリ（失敗時はここから戻す）"""
+        return self.source_dir.rstrip("\\/") + ".previous"
+
+    def select_files(self, manifest: dict, player: str = None) -> list:
+        """
+        復元対象のファイル（相対パス）を選ぶ
+        :param player: 指定した場合、Players 以下の該当プレイヤーの .sav のみ（IDの前方一致、大文字小文字を区別しない）
+        """
+        if player is None:
+            return sorted(manifest["files"])
+        player = player.strip().lower()
+        matches = sorted(
+            rel for rel in manifest["files"]
+            if os.path.basename(os.path.dirname(rel)) == "Players"
+            and os.path.basename(rel).lower().startswith(player) and rel.lower().endswith(".sav")
+        )
+        if not matches:
+            raise FileNotFoundError(f"スナップショットにプレイヤーのセーブデータがありません: {player}")
+        if len(matches) > 1:
+            raise ValueError(f"プレイヤーIDに一致するファイルが複数あります: {', '.join(matches)}")
+        return matches
+
+    def stage_restore(self, snapshot_id: str, rels: list = None, workers: int = None) -> dict:
+        """
+        スナップショットのファイルをステージングディレクトリに復元する（サーバー稼働中に実行できる）
+        チャンクの展開・書き込みは複数スレッドで並列に行い、チャンクとファイル全体のダイジェストを検証する
+        :return: apply_restore に渡す復元情報
+        """
+        started = time.monotonic()
+        manifest = self.load(snapshot_id)
+        rels = sorted(manifest["files"]) if rels is None else list(rels)
+        staging = self.staging_dir()
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        # ファイルごとに出力先を確保し、全チャンクを (ファイル, オフセット) 付きの作業に分解する
+        outputs = {}
+        jobs = []
+        try:
+            for rel in rels:
+                entry = manifest["files"][rel]
+                target = os.path.join(staging, rel)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                f = open(target, "w+b")
+                mm = None
+                if entry["size"] > 0:
+                    f.truncate(entry["size"])
+                    mm = mmap.mmap(f.fileno(), entry["size"])
+                outputs[rel] = (f, mm)
+                offset = 0
+                for cid, length in entry["chunks"]:
+                    jobs.append((rel, cid, offset, length))
+                    offset += length
+
+            def restore_chunk(job):
+                rel, cid, offset, length = job
+                data = read_chunk(self.repo_dir, cid)
+                if len(data) != length or chunk_id(data) != cid:
+                    raise BackupVerifyError(f"チャンクが破損しています: {cid} ({rel})")
+                outputs[rel][1][offset:offset + length] = data
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # 例外があれば最初のものを送出する
+                for _ in executor.map(restore_chunk, jobs):
+                    pass
+
+            for rel in rels:
+                f, mm = outputs[rel]
+                digest = manifest["files"][rel].get("digest")
+                if digest is not None:
+                    actual = hashlib.blake2b(mm if mm is not None else b"", digest_size=20).hexdigest()
+                    if actual != digest:
+                        raise BackupVerifyError(f"復元したファイルのダイジェストが一致しません: {rel}")
+                if mm is not None:
+                    mm.flush()
+        except BaseException:
+            self._close_outputs(outputs)
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._close_outputs(outputs)
+
+        restored = {
+            "snapshot": snapshot_id,
+            "files": rels,
+            "full": rels == sorted(manifest["files"]),
+            "bytes": sum(manifest["files"][rel]["size"] for rel in rels),
+            "chunks": len(jobs),
+            "duration": time.monotonic() - started,
+        }
+        logger.info(f"Staged restore of {snapshot_id}: {len(rels)} files, {restored['bytes']} bytes")
+        return restored
+
+    @staticmethod
+    def _close_outputs(outputs: dict):
+        for f, mm in outputs.values():
+            if mm is not None and not mm.closed:
+                mm.close()
+            f.close()
+
+    def apply_restore(self, restored: dict) -> dict:
+        """
+        ステージングしたファイルをセーブデータのディレクトリへ入れ替える（サーバー停止中に実行する）
+        全体を復元する場合は、スナップショットに含まれないファイルを削除する
+        置き換え・削除するファイルは先に退避し、途中で失敗した場合は元の状態に戻してから例外を送出する
+        """
+        started = time.monotonic()
+        staging = self.staging_dir()
+        displaced_dir = self._displaced_dir()
+        shutil.rmtree(displaced_dir, ignore_errors=True)
+
+        keep = set(restored["files"])
+        removing = [rel for rel in _scan(self.source_dir) if rel not in keep] if restored["full"] else []
+        displaced = []   # 退避した元のファイル
+        installed = []   # ステージングから移動したファイル
+        try:
+            for rel in list(restored["files"]) + removing:
+                target = os.path.join(self.source_dir, rel)
+                if os.path.exists(target):
+                    aside = os.path.join(displaced_dir, rel)
+                    os.makedirs(os.path.dirname(aside), exist_ok=True)
+                    os.replace(target, aside)
+                    displaced.append(rel)
+            for rel in restored["files"]:
+                target = os.path.join(self.source_dir, rel)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(os.path.join(staging, rel), target)
+                installed.append(rel)
+        except Exception:
+            logger.error(f"Failed to apply restore of {restored['snapshot']}, rolling back")
+            self._rollback_apply(installed, displaced)
+            raise
+        removed = len(removing)
+        shutil.rmtree(displaced_dir, ignore_errors=True)
+        shutil.rmtree(staging, ignore_errors=True)
+        duration = time.monotonic() - started
+        logger.info(f"Applied restore of {restored['snapshot']}: {len(restored['files'])} files, removed {removed}")
+        return {"swapped": len(restored["files"]), "removed": removed, "duration": duration}
+
+    def _rollback_apply(self, installed: list, displaced: list):
+        """apply_restore の途中までの入れ替えを取り消す（移動したファイルを戻し、退避したファイルを元の場所へ戻す）"""
+        staging = self.staging_dir()
+        for rel in installed:
+            try:
+                os.replace(os.path.join(self.source_dir, rel), os.path.join(staging, rel))
+            except OSError as e:
+                logger.error(f"Failed to roll back restored file {rel}: {e}")
+        failed = False
+        for rel in displaced:
+            try:
+                os.replace(os.path.join(self._displaced_dir(), rel), os.path.join(self.source_dir, rel))
+            except OSError as e:
+                failed = True
+                logger.error(f"Failed to put back original file {rel}: {e}")
+        # 戻せなかったファイルがある場合は、退避先に残す
+        if not failed:
+            shutil.rmtree(self._displaced_dir(), ignore_errors=True)
+
+    def discard_restore(self):
+        shutil.rmtree(self.staging_dir(), ignore_errors=True)
+
+    # ---- 検証 ----
+
+    def _load_verified(self) -> set:
+        path = os.path.join(self.repo_dir, VERIFIED_FILE)
+        if not os.path.exists(path):
+            return set()
+        with open(path, "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def verify(self, workers: int = None, full: bool = False) -> dict:
+        """
+        全スナップショットが参照するチャンクを検証する
+        チャンクは内容から決まるIDで保存され書き換えられないため、前回までに検証済みのチャンクは省略する
+        :param full: True の場合、検証済みの記録を無視して全チャンクを検証する
+        """
+        started = time.monotonic()
+        verified = set() if full else self._load_verified()
+        referenced = {}
+        snapshots = self.list_snapshots()
+        for snapshot_id in snapshots:
+            for entry in self.load(snapshot_id)["files"].values():
+                for cid, _ in entry["chunks"]:
+                    referenced.setdefault(cid, []).append(snapshot_id)
+        pending = [cid for cid in referenced if cid not in verified]
+
+        def check(cid):
+            try:
+                return cid, chunk_id(read_chunk(self.repo_dir, cid)) == cid
+            except (OSError, RuntimeError, BackupVerifyError) as e:
+                logger.warning(f"Failed to read chunk {cid}: {e}")
+                return cid, False
+
+        ok_ids = []
+        bad_ids = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for cid, ok in executor.map(check, pending):
+                (ok_ids if ok else bad_ids).append(cid)
+
+        path = os.path.join(self.repo_dir, VERIFIED_FILE)
+        if full:
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(cid + "\n" for cid in ok_ids)
+        elif ok_ids:
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(cid + "\n" for cid in ok_ids)
+
+        damaged = sorted({s for cid in bad_ids for s in referenced[cid]})
+        result = {
+            "snapshots": len(snapshots),
+            "chunks": len(referenced),
+            "checked": len(pending),
+            "bad_chunks": bad_ids,
+            "damaged_snapshots": damaged,
+            "duration": time.monotonic() - started,
+        }
+        if bad_ids:
+            logger.error(f"Backup verification found {len(bad_ids)} bad chunks in {len(damaged)} snapshots")
+        else:
+            logger.info(f"Backup verification ok: checked {len(pending)} of {len(referenced)} chunks")
+        return result
@@ -0,0 +1,132 @@
+import time
+import asyncio
+import logging
+import psutil
+from lib.readiness import ReadinessProbe, find_process
+
+logger = logging.getLogger("Benchmark")
+
+
+def _summary(values: list) -> dict:
+    """最小・平均・最大と下位5%値（p5）を求める"""
+    if not values:
+        return {"count": 0, "min": None, "avg": None, "max": None, "p5": None}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "avg": sum(ordered) / len(ordered),
+        "max": ordered[-1],
+        "p5": ordered[int(len(ordered) * 0.05)],
+    }
+
+
+class LaunchBenchmark:
+    """
+    起動プロファイルごとにサーバーを起動し、負荷状況を計測して比較する
+
+    各プロファイルについて
+    1. launcher でサーバーを起動し、ReadinessProbe で準備完了を待つ
+    2. soak_seconds 秒間、sample_interval 秒ごとに REST API のサーバーFPSと、
+       プロセスの CPU 使用率・メモリ使用量（RSS）を記録する
+    3. launcher でサーバーを停止する
+    """
+
+    def __init__(self, launcher, profiles: list, rest_api_plugin=None, ports: list = None,
+                 soak_seconds: float = 300.0, sample_interval: float = 5.0, readiness_timeout: float = 300.0,
+                 clock=time.monotonic):
+        self.launcher = launcher
+        self.profiles = profiles
+        self.rest_api_plugin = rest_api_plugin
+        self.ports = ports or []
+        self.soak_seconds = soak_seconds
+        self.sample_interval = sample_interval
+        self.readiness_timeout = readiness_timeout
+        self.clock = clock
+
+    async def run(self, on_progress=None) -> list:
+        """
+        全プロファイルを順に計測する
+        :param on_progress: async def on_progress(profile_name: str, message: str)
+        :return: プロファイルごとの計測結果
+        """
+        results = []
+        for profile in self.profiles:
+            if on_progress is not None:
+                await on_progress(profile["name"], "起動中")
+            try:
+                result = await self.run_profile(profile)
+            except Exception as e:
+                logger.error(f"Benchmark failed for profile {profile['name']}: {e}")
+                result = {"profile": profile["name"], "args": profile["args"], "ready": False, "error": str(e)}
+            finally:
+                await self.launcher.stop()
+            results.append(result)
+            if on_progress is not None:
+                await on_progress(profile["name"], "完了" if result.get("ready") else "失敗")
+        return results
+
+    async def run_profile(self, profile: dict) -> dict:
+        started_at = self.clock()
+        await self.launcher.launch(profile["args"])
+        probe = ReadinessProbe(
+            self.launcher.process_name, self.ports, rest_api_plugin=self.rest_api_plugin,
+            timeout=self.readiness_timeout, install_dir=self.launcher.install_dir
+        )
+        ready = await probe.wait_ready(started_at)
+        result = {"profile": profile["name"], "args": profile["args"], "ready": ready["ready"], "boot": ready["duration"]}
+        if not ready["ready"]:
+            result["error"] = f"準備完了を確認できませんでした（{ready['failed_phase']}）"
+            return result
+
+        samples = await self._soak()
+        result.update({
+            "fps": _summary(samples["fps"]),
+            "cpu": _summary(samples["cpu"]),
+            "rss_mb": _summary(samples["rss_mb"]),
+        })
+        logger.info(f"Benchmark result: {result}")
+        return result
+
+    async def _soak(self) -> dict:
+        process = await asyncio.to_thread(find_process, self.launcher.process_name, self.launcher.install_dir)
+        if process is None:
+            raise RuntimeError("サーバープロセスが見つかりません")
+        # 初回の cpu_percent は基準値の取得のみ（0.0 が返る）
+        process.cpu_percent(None)
+        samples = {"fps": [], "cpu": [], "rss_mb": []}
+        deadline = self.clock() + self.soak_seconds
+
+        while self.clock() < deadline:
+            await asyncio.sleep(self.sample_interval)
+            try:
+                # CPU 使用率は1コアを100%とした値になるため、論理コア数で割って全体比にする
+                samples["cpu"].append(process.cpu_percent(None) / (psutil.cpu_count() or 1))
+                samples["rss_mb"].append(process.memory_info().rss / 1024 / 1024)
+            except psutil.NoSuchProcess:
+                raise RuntimeError("計測中にサーバープロセスが終了しました")
+            if self.rest_api_plugin is not None:
+                try:
+                    metrics = await self.rest_api_plugin.async_send_command("metrics", "GET")
+                    if "serverfps" in metrics:
+                        samples["fps"].append(float(metrics["serverfps"]))
+                except (ConnectionError, TypeError, ValueError) as e:
+                    logger.warning(f"Failed to sample server FPS: {e}")
+        return samples
+
+
+def format_report(results: list) -> str:
+    """計測結果を比較用の表（等幅テキスト）に整形する"""
+    def fmt(value, digits=1):
+        return "-" if value is None else f"{value:.{digits}f}"
+
+    lines = [f"{'profile':<16} {'boot':>6} {'fps avg':>8} {'fps p5':>7} {'cpu avg':>8} {'cpu max':>8} {'rss MB':>8}"]
+    for r in results:
+        if not r.get("ready"):
+            lines.append(f"{r['profile'][:16]:<16} 失敗: {r.get('error', '')}")
+            continue
+        lines.append(
+            f"{r['profile'][:16]:<16} {fmt(r['boot'], 0):>6} {fmt(r['fps']['avg']):>8} {fmt(r['fps']['p5']):>7} "
+            f"{fmt(r['cpu']['avg']):>8} {fmt(r['cpu']['max']):>8} {fmt(r['rss_mb']['max'], 0):>8}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from collections import deque
+from lib.rate_limit import TokenBucket
+
+logger = logging.getLogger("ChatBridge")
+
+
+class ChatLane:
+    """
+    一方向の転送経路
+    短い時間（window 秒）に届いたメッセージを1回の送信にまとめ、送信はトークンバケットで制限する
+    未送信のメッセージが max_pending 件を超えた場合は古いものから捨て、次の送信で省略した件数を知らせる
+    """
+
+    def __init__(self, name: str, send, bucket: TokenBucket, window: float = 1.5,
+                 max_length: int = 1900, max_pending: int = 50, separator: str = "\n"):
+        """
+        :param send: async def send(text: str)
+        """
+        self.name = name
+        self.send = send
+        self.bucket = bucket
+        self.window = window
+        self.max_length = max_length
+        self.max_pending = max_pending
+        self.separator = separator
+
+        self.pending = deque()
+        self.dropped = 0
+        self.total_dropped = 0
+        self.sent_messages = 0
+        self.sent_batches = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def put(self, line: str):
+        if len(self.pending) >= self.max_pending:
+            self.pending.popleft()
+            self.dropped += 1
+            self.total_dropped += 1
+        self.pending.append(line[:self.max_length])
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # 続けて届くメッセージをまとめるため、最初のメッセージから少し待つ
+            await asyncio.sleep(self.window)
+            while self.pending:
+                # トークンを待つ間に届いたメッセージも同じ送信にまとめられる
+                delay = self.bucket.wait_time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                self.bucket.take()
+                text, count = self._take_batch()
+                try:
+                    await self.send(text)
+                    self.sent_messages += count
+                    self.sent_batches += 1
+                except Exception as e:
+                    logger.error(f"Chat bridge ({self.name}) failed to send: {e}")
+
+    def _take_batch(self) -> tuple:
+        """送信1回分のメッセージを取り出して連結する"""
+        lines = []
+        if self.dropped:
+            lines.append(f"（混雑のため {self.dropped} 件のメッセージを省略しました）")
+            self.dropped = 0
+        length = sum(len(line) for line in lines)
+        count = 0
+        while self.pending:
+            line = self.pending[0]
+            added = len(line) + (len(self.separator) if lines else 0)
+            if lines and length + added > self.max_length:
+                break
+            lines.append(self.pending.popleft())
+            length += added
+            count += 1
+        return self.separator.join(lines), count
+
+
+class ChatBridge:
+    """
+    Discord とゲーム内チャットの双方向の転送
+    - ゲーム → Discord: LogTailer の chat イベントを Discord のチャンネルへ送る
+    - Discord → ゲーム: チャンネルの投稿を REST API の announce で送る
+    """
+
+    def __init__(self, send_to_discord, send_to_game=None, config: dict = None):
+        """
+        :param send_to_discord: async def send(text: str)
+        :param send_to_game: async def send(text: str)（None の場合は Discord → ゲームの転送を行わない）
+        """
+        config = config or {}
+        window = float(config.get("chat_bridge_window", 1.5))
+        # Discord のチャンネルへの送信は 5回/5秒 程度が上限のため、余裕を持たせる
+        self.to_discord = ChatLane(
+            "game->discord", send_to_discord,
+            TokenBucket(float(config.get("chat_bridge_discord_rate", 0.8)), float(config.get("chat_bridge_discord_burst", 4))),
+            window=window, max_length=1900, max_pending=int(config.get("chat_bridge_discord_max_pending", 100))
+        )
+        # アナウンスはゲームスレッドで処理されるため、さらに控えめにする
+        self.to_game = None
+        if send_to_game is not None:
+            self.to_game = ChatLane(
+                "discord->game", send_to_game,
+                TokenBucket(float(config.get("chat_bridge_game_rate", 0.5)), float(config.get("chat_bridge_game_burst", 3))),
+                window=window, max_length=int(config.get("chat_bridge_game_max_length", 200)),
+                max_pending=int(config.get("chat_bridge_game_max_pending", 20)), separator=" / "
+            )
+
+    def start(self):
+        self.to_discord.start()
+        if self.to_game is not None:
+            self.to_game.start()
+
+    def stop(self):
+        self.to_discord.stop()
+        if self.to_game is not None:
+            self.to_game.stop()
+
+    def from_game(self, event: dict):
+        """LogTailer の購読者として登録する（kinds=["chat"]）"""
+        message = event.get("message", "").strip()
+        if message:
+            self.to_discord.put(f"{event.get('player', '?')}: {message}")
+
+    def from_discord(self, author: str, text: str):
+        if self.to_game is None:
+            return
+        text = " ".join(text.split())
+        if text:
+            self.to_game.put(f"[Discord] {author}: {text}")
+
+    def stats(self) -> dict:
+        lanes = [self.to_discord] + ([self.to_game] if self.to_game is not None else [])
+        return {
+            lane.name: {
+                "pending": len(lane.pending),
+                "dropped": lane.total_dropped,
+                "sent_messages": lane.sent_messages,
+                "sent_batches": lane.sent_batches,
+            }
+            for lane in lanes
+        }
@@ -0,0 +1,185 @@
+import time
+import logging
+import threading
+import psutil
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 同じエンドポイントを使う全クライアントでブレーカーを共有する
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+
+class CircuitOpenError(ConnectionError):
+    """サーバー停止中と判断されているため、接続を試みずに失敗したことを示す例外"""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"{name} は停止中のため接続をスキップしました（{retry_in:.0f}秒後に再試行）")
+
+
+class ProcessCheck:
+    """
+    サーバープロセスの生存確認（psutil）
+    process_iterは軽くないため、結果を一定時間キャッシュする
+    """
+
+    def __init__(self, process_name: str, interval: float = 5.0, clock=time.monotonic):
+        self.process_name = process_name
+        self.interval = interval
+        self.clock = clock
+        self._checked_at = None
+        self._running = True
+        self._lock = threading.Lock()
+
+    def __call__(self) -> bool:
+        with self._lock:
+            now = self.clock()
+            if self._checked_at is None or now - self._checked_at >= self.interval:
+                self._running = is_process_running(self.process_name)
+                self._checked_at = now
+            return self._running
+
+
+def is_process_running(process_name: str) -> bool:
+    """指定した名前のプロセスが起動しているか"""
+    for proc in psutil.process_iter(attrs=["name"]):
+        if proc.info.get("name") == process_name:
+            return True
+    return False
+
+
+class CircuitBreaker:
+    """
+    エンドポイントごとのサーキットブレーカー
+    - closed: 通常通り接続する
+    - open: 接続せずに即座に失敗する（次の試行時刻まで）
+    - half_open: 1回だけ試行を許可し、成功すればclosed、失敗すればopenに戻る
+    失敗が続くたびに次の試行までの間隔を指数的に延ばす
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 1, base_delay: float = 5.0,
+                 max_delay: float = 300.0, probe_timeout: float = 60.0, process_check=None, clock=time.monotonic):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.probe_timeout = probe_timeout
+        self.process_check = process_check
+        self.clock = clock
+
+        self.state = CLOSED
+        self.failures = 0
+        self.delay = base_delay
+        self.next_attempt = 0.0
+        self.probe_started = 0.0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        呼び出し前に実行し、接続を試みてよいか判定する
+        許可されない場合は CircuitOpenError を送出する
+        """
+        with self._lock:
+            now = self.clock()
+
+            # プロセスが存在しないことが分かっていれば、接続を試みるまでもない
+            if self.process_check is not None and not self.process_check():
+                if self.state == CLOSED:
+                    self._trip(now, "server process not running")
+                self.skipped += 1
+                raise CircuitOpenError(self.name, max(self.next_attempt - now, 0.0))
+
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and now >= self.next_attempt:
+                # 試行時刻に達したので1回だけ接続を許可する
+                self.state = HALF_OPEN
+                self.probe_started = now
+                self.logger.info(f"[{self.name}] half-open: probing")
+                return
+            if self.state == HALF_OPEN and now - self.probe_started >= self.probe_timeout:
+                # 試行結果が報告されないまま時間が経った場合は、次の試行を許可する
+                self.probe_started = now
+                return
+            self.skipped += 1
+            raise CircuitOpenError(self.name, max(self.next_attempt - now, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                self.logger.info(f"[{self.name}] closed: server is reachable again (skipped {self.skipped} calls)")
+            self.state = CLOSED
+            self.failures = 0
+            self.delay = self.base_delay
+            self.skipped = 0
+
+    def reset(self):
+        """
+        閉じた状態に戻し、試行間隔を初期値に戻す
+        サーバーの起動を別の方法で確認できた場合など、直前の失敗による待ち時間を使う必要がない場合に呼ぶ
+        """
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.delay = self.base_delay
+
+    def record_failure(self, reason: str = ""):
+        with self._lock:
+            now = self.clock()
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # 試行に失敗したので間隔を倍にして再度open
+                self.delay = min(self.delay * 2, self.max_delay)
+                self._trip(now, reason)
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._trip(now, reason)
+
+    def _trip(self, now: float, reason: str):
+        self.state = OPEN
+        self.next_attempt = now + self.delay
+        self.logger.warning(f"[{self.name}] open: {reason} (next probe in {self.delay:.0f}s)")
+
+    def get_status(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "failures": self.failures,
+                "retry_in": max(self.next_attempt - self.clock(), 0.0) if self.state == OPEN else 0.0,
+                "skipped": self.skipped,
+            }
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """
+    名前（host:port等）に対応するブレーカーを取得する（なければ作成）
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **kwargs)
+            _breakers[name] = breaker
+        return breaker
+
+
+def get_all_breakers() -> dict:
+    with _breakers_lock:
+        return dict(_breakers)
+
+
+def local_process_check(host: str, process_name: str):
+    """
+    接続先がローカルの場合のみプロセス確認を有効にする
+    リモートホストではローカルのプロセス有無は判断材料にならない
+    """
+    if host in LOCAL_HOSTS and process_name:
+        return ProcessCheck(process_name)
+    return None
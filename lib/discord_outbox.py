@@ -0,0 +1,193 @@
+import time
+import asyncio
+import logging
+from collections import deque
+import discord
+from lib.rate_limit import TokenBucket
+
+logger = logging.getLogger("DiscordOutbox")
+
+# 1メッセージに含められる Embed の数と、Embed の合計文字数の上限
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+def _options_key(options: dict) -> dict:
+    """
+    送信オプションの比較用の値
+    AllowedMentions などは呼び出しごとに別のオブジェクトになるため、内容（to_dict）で比較する
+    """
+    return {k: v.to_dict() if hasattr(v, "to_dict") else v for k, v in options.items()}
+
+
+class _Outgoing:
+    __slots__ = ("content", "embeds", "key", "options", "options_key", "enqueued", "future")
+
+    def __init__(self, content, embeds, key, options, future):
+        self.content = content
+        self.embeds = embeds
+        self.key = key
+        self.options = options
+        self.options_key = _options_key(options)
+        self.enqueued = time.monotonic()
+        self.future = future
+
+
+class OutboundQueue:
+    """
+    1つの送信先（チャンネル・インタラクションのフォローアップ）への送信キュー
+
+    - 送信はキューに積むだけで、呼び出し側は送信完了を待たない（結果が必要な場合は返り値の Future を待つ）
+    - 続けて積まれた Embed のみのメッセージは、1つのメッセージ（最大10個の Embed）にまとめて送る
+    - key を指定したメッセージは、同じ key の未送信のメッセージを置き換える（状態通知の古いものは送らない）
+    - 送信間隔はトークンバケットで制限し、それでも 429 が返った場合は retry_after だけ待って送り直す
+    """
+
+    def __init__(self, name: str, resolve_target, bucket: TokenBucket = None, max_retries: int = 3):
+        """
+        :param resolve_target: 送信時に送信先（channel.send / followup.send を持つオブジェクト）を返す関数
+        """
+        self.name = name
+        self.resolve_target = resolve_target
+        # Discord のチャンネルごとの上限（5回/5秒程度）を超えないよう、既定は 1回/秒・連続5回まで
+        self.bucket = bucket or TokenBucket(1.0, 5)
+        self.max_retries = max_retries
+
+        self.pending = deque()
+        self.sent_messages = 0
+        self.sent_items = 0
+        self.merged = 0
+        self.collapsed = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.latencies = deque(maxlen=200)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def post(self, content: str = None, embed: discord.Embed = None, embeds: list = None, key: str = None,
+             **options) -> asyncio.Future:
+        """
+        メッセージを送信キューに積む
+        :param options: send() にそのまま渡す引数（allowed_mentions・ephemeral など）
+        :return: 送信したメッセージ（置き換えられた場合は None）を結果とする Future
+        """
+        future = asyncio.get_running_loop().create_future()
+        embeds = list(embeds or []) + ([embed] if embed is not None else [])
+        if key is not None:
+            for item in list(self.pending):
+                if item.key == key:
+                    self.pending.remove(item)
+                    self.collapsed += 1
+                    if not item.future.done():
+                        item.future.set_result(None)
+        self.pending.append(_Outgoing(content, embeds, key, options, future))
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            if not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self.bucket.wait_time()
+            if delay > 0:
+                # 待つ間に積まれたメッセージも次の送信にまとめられる
+                await asyncio.sleep(delay)
+                continue
+            self.bucket.take()
+            batch = self._take_batch()
+            await self._send(batch)
+
+    def _take_batch(self) -> list:
+        first = self.pending.popleft()
+        batch = [first]
+        if first.content is not None or not first.embeds:
+            return batch
+        count = len(first.embeds)
+        chars = sum(len(e) for e in first.embeds)
+        while self.pending:
+            item = self.pending[0]
+            if item.content is not None or not item.embeds or item.options_key != first.options_key:
+                break
+            item_chars = sum(len(e) for e in item.embeds)
+            if count + len(item.embeds) > MAX_EMBEDS or chars + item_chars > MAX_EMBED_CHARS:
+                break
+            batch.append(self.pending.popleft())
+            count += len(item.embeds)
+            chars += item_chars
+        return batch
+
+    async def _send(self, batch: list):
+        first = batch[0]
+        embeds = [e for item in batch for e in item.embeds]
+        kwargs = dict(first.options)
+        if first.content is not None:
+            kwargs["content"] = first.content
+        if embeds:
+            kwargs["embeds"] = embeds
+
+        message = None
+        error = None
+        for attempt in range(self.max_retries + 1):
+            target = self.resolve_target()
+            if target is None:
+                error = RuntimeError(f"送信先が見つかりません: {self.name}")
+                break
+            try:
+                message = await target.send(**kwargs)
+                error = None
+                break
+            except discord.HTTPException as e:
+                error = e
+                if e.status != 429 or attempt == self.max_retries:
+                    break
+                self.rate_limited += 1
+                retry_after = float(getattr(e, "retry_after", None) or 1.0)
+                logger.warning(f"Rate limited on {self.name}, retrying after {retry_after:.1f}s")
+                await asyncio.sleep(retry_after)
+            except Exception as e:
+                # 通信エラー（aiohttp・OSError など）でも送信ループは止めず、待っている呼び出し元に失敗を返す
+                error = e
+                break
+
+        now = time.monotonic()
+        if error is not None:
+            self.failed += len(batch)
+            logger.error(f"Failed to send message to {self.name}: {error}")
+        else:
+            self.sent_messages += 1
+            self.sent_items += len(batch)
+            self.merged += len(batch) - 1
+        for item in batch:
+            self.latencies.append(now - item.enqueued)
+            if item.future.done():
+                continue
+            if error is not None:
+                item.future.set_exception(error)
+                # 結果を待たない呼び出し元で「未取得の例外」の警告が出ないようにする
+                item.future.exception()
+            else:
+                item.future.set_result(message)
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "depth": len(self.pending),
+            "sent_messages": self.sent_messages,
+            "sent_items": self.sent_items,
+            "merged": self.merged,
+            "collapsed": self.collapsed,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+            "latency_avg": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+            "latency_max": latencies[-1] if latencies else None,
+        }
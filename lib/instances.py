@@ -0,0 +1,150 @@
+import os
+import time
+import asyncio
+import logging
+import psutil
+from lib.readiness import DEFAULT_GAME_PORT
+
+logger = logging.getLogger("Instances")
+
+
+class ServerInstance:
+    """
+    1つのゲームサーバー（インストール先・ポート・REST/RCON の接続先・定期タスク）の定義
+    同じインスタンスへの操作（起動・停止・再起動）は lock で直列化し、別のインスタンスへの操作は並行して実行する
+    """
+
+    def __init__(self, name: str, server_path: str, server_exe: str, server_cmd_exe: str, app_id=None,
+                 game_port: int = DEFAULT_GAME_PORT, launch_args: list = None, rest_api: dict = None,
+                 rcon: dict = None, tasks: list = None):
+        """
+        :param launch_args: 起動オプション（None の場合は起動プロファイルの設定に従う）
+        :param rest_api: REST API の接続設定（{"host", "port", "admin_password"}、None の場合は使用しない）
+        :param rcon: RCON の接続設定（{"host", "port", "password"}、None の場合は使用しない）
+        :param tasks: このインスタンスの再起動タスク（設定 tasks と同じ形式）
+        """
+        self.name = name
+        self.server_path = server_path
+        self.server_exe = server_exe
+        self.server_cmd_exe = server_cmd_exe
+        self.app_id = app_id
+        self.game_port = int(game_port)
+        self.launch_args = launch_args
+        self.rest_api = rest_api
+        self.rcon = rcon
+        self.tasks = list(tasks or [])
+
+        # Bot で作成する接続（プラグインが有効な場合のみ）
+        self.rest_api_plugin = None
+        self.rcon_plugin = None
+
+        self.lock = asyncio.Lock()
+        # 再起動のカウントダウン中か（カウントダウン中は lock を取らないため、重複した再起動をこれで防ぐ）
+        self.restart_pending = False
+        self.last_status = None
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: "ServerInstance") -> "ServerInstance":
+        """
+        設定 instances の1要素から作成する（省略した項目は defaults の値を使う）
+        """
+        if not data.get("name") or not data.get("install_dir"):
+            raise ValueError(f"インスタンスには name と install_dir が必要です: {data}")
+        return cls(
+            data["name"],
+            data["install_dir"],
+            data.get("server_exe", defaults.server_exe),
+            data.get("server_cmd_exe", defaults.server_cmd_exe),
+            app_id=data.get("app_id", defaults.app_id),
+            game_port=data.get("game_port", DEFAULT_GAME_PORT),
+            launch_args=data.get("launch_args"),
+            rest_api=data.get("rest_api"),
+            rcon=data.get("rcon"),
+            tasks=data.get("tasks"),
+        )
+
+    @property
+    def process_names(self) -> set:
+        return {self.server_exe, self.server_cmd_exe}
+
+    def readiness_ports(self) -> list:
+        ports = [("udp", self.game_port)]
+        if self.rest_api_plugin is not None:
+            ports.append(("tcp", int(self.rest_api_plugin.port)))
+        if self.rcon_plugin is not None:
+            ports.append(("tcp", int(self.rcon_plugin.port)))
+        return ports
+
+
+def load_instances(primary: ServerInstance, config: dict) -> dict:
+    """
+    管理するインスタンスの一覧を作成する
+    primary（app.json のサーバー）を先頭に、設定 instances（[{"name", "install_dir", ...}]）を追加する
+    :return: {インスタンス名: ServerInstance}（設定の順）
+    """
+    instances = {primary.name: primary}
+    for data in config.get("instances", []):
+        try:
+            instance = ServerInstance.from_dict(data, primary)
+        except ValueError as e:
+            logger.error(str(e))
+            continue
+        if instance.name in instances:
+            logger.error(f"インスタンス名が重複しています: {instance.name}")
+            continue
+        if os.path.normcase(os.path.abspath(instance.server_path)) in (
+            os.path.normcase(os.path.abspath(i.server_path)) for i in instances.values()
+        ):
+            logger.error(f"インストール先が重複しています: {instance.name} ({instance.server_path})")
+            continue
+        instances[instance.name] = instance
+    return instances
+
+
+class ProcessSnapshot:
+    """
+    1回のプロセス走査の結果（監視の1周期の間、全インスタンスで共有する）
+    インスタンスごとに psutil.process_iter を呼ぶ代わりに、1回の走査で対象のプロセスと実行ファイルのパス・メモリ使用量を集める
+    """
+
+    def __init__(self, instances, clock=time.monotonic):
+        instances = list(instances)
+        self.taken = clock()
+        self.memory_percent = psutil.virtual_memory().percent
+        names = set()
+        for instance in instances:
+            names |= instance.process_names
+        # (名前, 実行ファイルのパス（取得できない場合は None）, RSS)
+        self.processes = []
+        for p in psutil.process_iter(attrs=["name"]):
+            if p.info["name"] not in names:
+                continue
+            try:
+                with p.oneshot():
+                    rss = p.memory_info().rss
+                    try:
+                        exe = os.path.normcase(os.path.abspath(p.exe()))
+                    except psutil.AccessDenied:
+                        exe = None
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            self.processes.append((p.info["name"], exe, rss))
+        # 実行ファイルのパスで区別できない場合は、名前だけで判定する（インスタンスが1つの場合など）
+        self._by_name_only = len(instances) <= 1
+
+    def age(self, clock=time.monotonic) -> float:
+        return clock() - self.taken
+
+    def _matches(self, instance: ServerInstance) -> list:
+        root = os.path.normcase(os.path.abspath(instance.server_path)) + os.sep
+        return [
+            (name, exe, rss) for name, exe, rss in self.processes
+            if name in instance.process_names and (self._by_name_only or (exe is not None and exe.startswith(root)))
+        ]
+
+    def is_running(self, instance: ServerInstance) -> bool:
+        return any(name == instance.server_exe for name, _, _ in self._matches(instance))
+
+    def rss(self, instance: ServerInstance) -> int:
+        """インスタンスのプロセスの RSS の合計（バイト）"""
+        return sum(rss for _, _, rss in self._matches(instance))
@@ -0,0 +1,182 @@
+import os
+import json
+import mmap
+import time
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from lib.staged_update import scan_tree
+
+# xxhash がインストールされていれば高速なハッシュを使用し、なければ blake2b を使用する
+try:
+    import xxhash
+    DEFAULT_ALGORITHM = "xxh3_128"
+except ImportError:
+    xxhash = None
+    DEFAULT_ALGORITHM = "blake2b"
+
+# mmap で一度にハッシュへ渡す大きさ
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+logger = logging.getLogger("Integrity")
+
+
+def _new_hasher(algorithm: str):
+    if algorithm == "xxh3_128":
+        if xxhash is None:
+            raise RuntimeError("xxhash がインストールされていません")
+        return xxhash.xxh3_128()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=20)
+    raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+
+def hash_file(path: str, algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """
+    ファイルのダイジェストを計算する（メモリマップで読み込み、コピーを発生させない）
+    """
+    hasher = _new_hasher(algorithm)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return hasher.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                for offset in range(0, size, HASH_BLOCK_SIZE):
+                    hasher.update(view[offset:offset + HASH_BLOCK_SIZE])
+            finally:
+                view.release()
+    return hasher.hexdigest()
+
+
+def _hash_entry(args):
+    """プロセスプール用（rel, path, algorithm）→ (rel, digest or None)"""
+    rel, path, algorithm = args
+    try:
+        return rel, hash_file(path, algorithm)
+    except OSError:
+        return rel, None
+
+
+def _hash_many(root: str, rels: list, algorithm: str, workers: int = None) -> dict:
+    """複数ファイルのハッシュをプロセスプールで並列に計算する"""
+    if not rels:
+        return {}
+    jobs = [(rel, os.path.join(root, rel), algorithm) for rel in rels]
+    if len(jobs) == 1:
+        return dict([_hash_entry(jobs[0])])
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(executor.map(_hash_entry, jobs, chunksize=8))
+
+
+def build_manifest(root: str, algorithm: str = DEFAULT_ALGORITHM, workers: int = None, previous: dict = None) -> dict:
+    """
+    インストールディレクトリのマニフェスト（パス・サイズ・更新時刻・ダイジェスト）を作成する
+    previous を渡すと、サイズと更新時刻が変わっていないファイルはダイジェストを引き継ぐ
+    """
+    started = time.monotonic()
+    files = scan_tree(root)
+    reuse = {}
+    if previous and previous.get("algorithm") == algorithm:
+        for rel, (size, mtime_ns, digest) in previous.get("files", {}).items():
+            if files.get(rel) == (size, mtime_ns):
+                reuse[rel] = digest
+
+    digests = _hash_many(root, [rel for rel in files if rel not in reuse], algorithm, workers)
+    digests.update(reuse)
+    manifest = {
+        "algorithm": algorithm,
+        "root": os.path.abspath(root),
+        "created": time.time(),
+        "files": {
+            rel: [size, mtime_ns, digests[rel]] for rel, (size, mtime_ns) in files.items() if digests.get(rel)
+        },
+    }
+    logger.info(f"Built manifest for {len(manifest['files'])} files in {time.monotonic() - started:.1f}s "
+                f"({len(reuse)} reused)")
+    return manifest
+
+
+def verify(root: str, manifest: dict, full: bool = False, workers: int = None) -> dict:
+    """
+    マニフェストと照合し、欠損・破損ファイルを報告する
+    full=False の場合、サイズと更新時刻が一致するファイルは読み込まずに正常とみなす
+    """
+    started = time.monotonic()
+    algorithm = manifest["algorithm"]
+    current = scan_tree(root)
+    missing, corrupt, to_hash = [], [], []
+    skipped = 0
+
+    for rel, (size, mtime_ns, _) in manifest["files"].items():
+        stat = current.get(rel)
+        if stat is None:
+            missing.append(rel)
+        elif stat[0] != size:
+            corrupt.append(rel)
+        elif stat[1] == mtime_ns and not full:
+            skipped += 1
+        else:
+            to_hash.append(rel)
+
+    digests = _hash_many(root, to_hash, algorithm, workers)
+    for rel in to_hash:
+        if digests.get(rel) != manifest["files"][rel][2]:
+            corrupt.append(rel)
+
+    extra = [rel for rel in current if rel not in manifest["files"]]
+    report = {
+        "ok": not missing and not corrupt,
+        "missing": missing,
+        "corrupt": corrupt,
+        "extra": extra,
+        "hashed": len(to_hash),
+        "skipped": skipped,
+        "duration": time.monotonic() - started,
+    }
+    logger.info(f"Verify: ok={report['ok']} missing={len(missing)} corrupt={len(corrupt)} "
+                f"hashed={len(to_hash)} skipped={skipped} in {report['duration']:.1f}s")
+    return report
+
+
+def save_manifest(manifest: dict, path: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(path: str) -> dict:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class IntegrityVerifier:
+    """サーバーのインストールディレクトリとマニフェストファイルを結び付けて扱う"""
+
+    def __init__(self, install_dir: str, manifest_path: str, workers: int = None):
+        self.install_dir = install_dir
+        self.manifest_path = manifest_path
+        self.workers = workers
+
+    def has_manifest(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def rebuild(self) -> dict:
+        """マニフェストを作り直す（アップデート完了後に実行する）"""
+        manifest = build_manifest(self.install_dir, workers=self.workers, previous=load_manifest(self.manifest_path))
+        save_manifest(manifest, self.manifest_path)
+        return manifest
+
+    def verify(self, full: bool = False) -> dict:
+        """
+        マニフェストと照合する
+        マニフェストがない場合は None を返す（判定不能）
+        """
+        manifest = load_manifest(self.manifest_path)
+        if manifest is None:
+            return None
+        return verify(self.install_dir, manifest, full=full, workers=self.workers)
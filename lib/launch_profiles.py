@@ -0,0 +1,111 @@
+import os
+import asyncio
+import logging
+import subprocess
+from lib.server_control import start_server, stop_server, DEFAULT_LAUNCH_ARGS
+
+DEFAULT_PROFILE_NAME = "default"
+
+logger = logging.getLogger("LaunchProfiles")
+
+
+def get_launch_profiles(config: dict) -> list:
+    """
+    設定 launch_profiles から起動プロファイルの一覧を取得する
+    例: [{"name": "default", "args": ["-NoAsyncLoadingThread", "-UseMultithreadForDS"]},
+         {"name": "workers8", "args": ["-UseMultithreadForDS", "-NumberOfWorkerThreadsServer=8"]}]
+    default プロファイルが定義されていなければ、従来の起動オプションで補う
+    """
+    profiles = [
+        {"name": str(p["name"]), "args": [str(a) for a in p.get("args", [])]}
+        for p in config.get("launch_profiles", []) if p.get("name")
+    ]
+    if not any(p["name"] == DEFAULT_PROFILE_NAME for p in profiles):
+        profiles.insert(0, {"name": DEFAULT_PROFILE_NAME, "args": list(DEFAULT_LAUNCH_ARGS)})
+    return profiles
+
+
+def get_profile(config: dict, name: str = None) -> dict:
+    """
+    名前を指定して起動プロファイルを取得する（省略時は設定 launch_profile、未設定なら default）
+    """
+    name = name or config.get("launch_profile") or DEFAULT_PROFILE_NAME
+    for profile in get_launch_profiles(config):
+        if profile["name"] == name:
+            return profile
+    raise KeyError(f"起動プロファイルが見つかりません: {name}")
+
+
+class ServerLauncher:
+    """
+    ベンチマークなどからサーバーの起動・停止を行うためのインターフェース
+    """
+    # 起動後に監視するプロセス名
+    process_name = None
+    # プロセスを探すインストール先（同じ名前のサーバーが複数ある場合のみ指定する）
+    install_dir = None
+
+    async def launch(self, args: list):
+        raise NotImplementedError
+
+    async def stop(self):
+        raise NotImplementedError
+
+
+class WindowsServerLauncher(ServerLauncher):
+    """start コマンドで PalServer.exe を起動し、停止は server_control.stop_server で行う"""
+
+    def __init__(self, server_path: str, server_exe: str, server_cmd_exe: str, rest_api_plugin=None,
+                 resource_manager=None, install_dir: str = None):
+        """
+        :param resource_manager: 起動直後にサーバー用のCPU割り当てを適用する ResourceManager（None の場合は適用しない）
+        :param install_dir: 停止・割り当ての対象をこの配下の実行ファイルのプロセスに限る（複数インスタンスの区別）
+        """
+        self.server_path = server_path
+        self.server_exe = server_exe
+        self.process_name = server_cmd_exe
+        self.rest_api_plugin = rest_api_plugin
+        self.resource_manager = resource_manager
+        self.install_dir = install_dir
+
+    async def launch(self, args: list):
+        ok, embed = await start_server(self.server_path, self.server_exe, args)
+        if not ok:
+            raise RuntimeError(embed.description or embed.title)
+        if self.resource_manager is not None:
+            # Bot から起動したサーバーは Bot の割り当てを引き継ぐため、計測の前に適用する
+            await asyncio.to_thread(
+                self.resource_manager.apply_server, {self.server_exe, self.process_name}, self.install_dir
+            )
+
+    async def stop(self):
+        await stop_server(
+            self.process_name, self.server_exe, self.rest_api_plugin, shutdown_wait=1, install_dir=self.install_dir
+        )
+
+
+class SubprocessLauncher(ServerLauncher):
+    """
+    任意のコマンドを子プロセスとして起動する
+    Windows 以外の環境で、ダミーのサーバーを使ってベンチマークを動かす場合に使用する
+    """
+
+    def __init__(self, command: list, stop_timeout: float = 30.0):
+        self.command = list(command)
+        self.process_name = os.path.basename(self.command[0])
+        self.stop_timeout = stop_timeout
+        self.process = None
+
+    async def launch(self, args: list):
+        self.process = subprocess.Popen(self.command + list(args))
+
+    async def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.to_thread(self.process.wait, self.stop_timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            await asyncio.to_thread(self.process.wait)
+
@@ -0,0 +1,196 @@
+import os
+import re
+import glob
+import time
+import asyncio
+import inspect
+import logging
+
+logger = logging.getLogger("LogTailer")
+
+# 1回に読み込む大きさ
+READ_BLOCK_SIZE = 1024 * 1024
+
+# (種類, 事前判定用の文字列, 正規表現)
+# 正規表現は行に事前判定用の文字列が含まれる場合のみ評価する（先に一致したものを採用する）
+DEFAULT_PATTERNS = [
+    ("crash", "Fatal error", r"(?P<message>Fatal error!.*)"),
+    ("crash", "Critical error", r"(?P<message>=== Critical error: ===.*)"),
+    ("crash", "Unhandled Exception", r"(?P<message>Unhandled Exception.*)"),
+    ("join", "joined the server", r"\[LOG\]\s*(?P<player>.+?) joined the server\.?(?:\s*\(User id: (?P<user_id>[^)]*)\))?"),
+    ("join", "Join succeeded", r"Join succeeded: (?P<player>.+?)\s*$"),
+    ("leave", "left the server", r"\[LOG\]\s*(?P<player>.+?) left the server\.?(?:\s*\(User id: (?P<user_id>[^)]*)\))?"),
+    ("chat", "[CHAT]", r"\[CHAT\]\s*<(?P<player>[^>]*)>\s?(?P<message>.*)"),
+    ("error", "Error: ", r"(?P<category>Log\w+): Error: (?P<message>.*)"),
+]
+
+
+def compile_patterns(extra: list = None) -> list:
+    """
+    パターンをコンパイルする
+    :param extra: 設定 log_patterns（[{"kind": ..., "needle": ..., "pattern": ...}]）、既定のパターンより優先する
+    """
+    patterns = [(p["kind"], p.get("needle", ""), p["pattern"]) for p in (extra or [])] + DEFAULT_PATTERNS
+    return [(kind, needle, re.compile(pattern)) for kind, needle, pattern in patterns]
+
+
+def parse_line(line: str, patterns: list) -> dict:
+    """1行をイベントに変換する（該当しない行は None）"""
+    for kind, needle, regex in patterns:
+        if needle and needle not in line:
+            continue
+        match = regex.search(line)
+        if match:
+            event = {k: v for k, v in match.groupdict().items() if v is not None}
+            event["kind"] = kind
+            event["line"] = line
+            return event
+    return None
+
+
+class LogTailer:
+    """
+    サーバーのログディレクトリで最も新しいログファイルを追いかけ、追記された行をイベントに変換する
+
+    - 読み込み位置はファイルの inode と offset で管理し、毎回追記された部分だけを読む
+    - 別のファイルへの切り替え（ローテーション）は inode の変化で、切り詰めはサイズの縮小で検知する
+    - サーバーがログファイルを rename できるよう、ファイルは読み込みの間だけ開く
+    """
+
+    def __init__(self, log_dir: str, patterns: list = None, interval: float = 1.0,
+                 block_size: int = READ_BLOCK_SIZE, from_start: bool = False):
+        """
+        :param patterns: compile_patterns() の結果（省略時は既定のパターン）
+        :param from_start: True の場合、最初に見つけたファイルを先頭から読む（False の場合は末尾から）
+        """
+        self.log_dir = log_dir
+        self.patterns = patterns if patterns is not None else compile_patterns()
+        self.interval = interval
+        self.block_size = block_size
+        self.from_start = from_start
+
+        self.path = None
+        self.inode = None
+        self.offset = 0
+        self._partial = b""
+        self._dir_mtime = None
+        self._subscribers = []
+        self._task = None
+
+    def subscribe(self, callback, kinds=None):
+        """
+        イベントの通知先を登録する
+        :param callback: def/async def callback(event: dict)
+        :param kinds: 通知するイベントの種類（省略時は全て）
+        """
+        self._subscribers.append((callback, set(kinds) if kinds else None))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        logger.info(f"Log tailer started: {self.log_dir} (interval: {self.interval}s)")
+        while True:
+            try:
+                events = await asyncio.to_thread(self.poll)
+            except Exception as e:
+                logger.error(f"Failed to read server log: {e}")
+                events = []
+            for event in events:
+                await self._dispatch(event)
+            await asyncio.sleep(self.interval)
+
+    async def _dispatch(self, event: dict):
+        for callback, kinds in self._subscribers:
+            if kinds is not None and event["kind"] not in kinds:
+                continue
+            try:
+                result = callback(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Log event subscriber failed: {e}")
+
+    # ---- 読み込み ----
+
+    def poll(self) -> list:
+        """追記された行を読み、イベントの一覧を返す"""
+        events = []
+        self._check_rotation(events)
+        if self.path is None:
+            return events
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.path = None
+            return events
+        if st.st_size < self.offset:
+            logger.info(f"Log file truncated: {self.path}")
+            self.offset = 0
+            self._partial = b""
+        if st.st_size > self.offset:
+            self._read(self.path, events)
+        return events
+
+    def _check_rotation(self, events: list):
+        # ディレクトリの更新時刻が変わった場合のみ一覧を取り直す
+        try:
+            dir_mtime = os.stat(self.log_dir).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if self.path is not None and dir_mtime == self._dir_mtime and os.path.exists(self.path):
+            return
+        self._dir_mtime = dir_mtime
+
+        files = glob.glob(os.path.join(self.log_dir, "*.log"))
+        if not files:
+            return
+        latest = max(files, key=os.path.getmtime)
+        inode = os.stat(latest).st_ino
+        if self.path is not None and latest == self.path and inode == self.inode:
+            return
+
+        first = self.path is None and self.inode is None
+        if not first:
+            # 切り替え前のファイルの残り（rename 後の新しい名前を inode で探す）を読み切る
+            for path in files:
+                if path != latest and os.stat(path).st_ino == self.inode:
+                    self._read(path, events)
+                    break
+            if self._partial:
+                self._emit(self._partial, events)
+            logger.info(f"Following new log file: {latest}")
+        self.path = latest
+        self.inode = inode
+        self._partial = b""
+        self.offset = 0 if (self.from_start or not first) else os.path.getsize(latest)
+
+    def _read(self, path: str, events: list):
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            while True:
+                data = f.read(self.block_size)
+                if not data:
+                    break
+                self.offset += len(data)
+                data = self._partial + data
+                lines = data.split(b"\n")
+                # 改行で終わっていない最後の行は次回に持ち越す
+                self._partial = lines.pop()
+                for line in lines:
+                    self._emit(line, events)
+
+    def _emit(self, raw: bytes, events: list):
+        line = raw.decode("utf-8", errors="replace").strip("\r\ufeff")
+        if not line:
+            return
+        event = parse_line(line, self.patterns)
+        if event is not None:
+            event["time"] = time.time()
+            events.append(event)
@@ -0,0 +1,205 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+
+# REST API /metrics のキーと保存先カラムの対応
+METRIC_FIELDS = {
+    "serverfps": "fps",
+    "serverframetime": "frametime",
+    "currentplayernum": "players",
+    "uptime": "uptime",
+    "basecampnum": "basecamps",
+}
+COLUMNS = list(METRIC_FIELDS.values())
+
+# ダウンサンプリングの段階: (テーブル名, 集約単位秒, 保持期間秒)
+TIERS = [
+    ("samples_1m", 60, 14 * 86400),
+    ("samples_1h", 3600, 400 * 86400),
+]
+RAW_RETENTION = 2 * 86400
+
+
+class MetricsStore:
+    """
+    サーバーメトリックの時系列ストア（SQLite / WALモード）
+    生データは短期間だけ保持し、1分・1時間単位の min/avg/max に段階的に集約する
+    """
+
+    def __init__(self, db_path: str, sample_interval: float = 30.0, raw_retention: int = RAW_RETENTION, tiers=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.db_path = db_path
+        self.sample_interval = sample_interval
+        self.raw_retention = raw_retention
+        self.tiers = tiers or TIERS
+        self._lock = threading.Lock()
+        self._last_rollup = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        raw_columns = ", ".join(f"{c} REAL" for c in COLUMNS)
+        agg_columns = ", ".join(f"{c}_min REAL, {c}_avg REAL, {c}_max REAL" for c in COLUMNS)
+        with self.conn:
+            # 時刻を主キーにした WITHOUT ROWID テーブルで、行ごとのオーバーヘッドを抑える
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS samples_raw (ts INTEGER PRIMARY KEY, {raw_columns}) WITHOUT ROWID")
+            for table, _, _ in self.tiers:
+                self.conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (ts INTEGER PRIMARY KEY, count INTEGER, {agg_columns}) WITHOUT ROWID"
+                )
+
+    def add_sample(self, metrics: dict, ts: int = None):
+        """
+        REST API /metrics のレスポンスを1サンプルとして保存
+        """
+        ts = int(ts if ts is not None else time.time())
+        values = [metrics.get(key) for key in METRIC_FIELDS]
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self._lock, self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO samples_raw (ts, {', '.join(COLUMNS)}) VALUES (?, {placeholders})",
+                [ts] + values
+            )
+        self._maybe_rollup(ts)
+
+    def _maybe_rollup(self, now: int):
+        """集約単位ごとに、完了したバケットを上位テーブルへ集約し、保持期間を過ぎた行を削除する"""
+        source = "samples_raw"
+        source_is_raw = True
+        for table, step, retention in self.tiers:
+            bucket = now - now % step
+            if self._last_rollup.get(table) != bucket:
+                self._rollup(source, source_is_raw, table, step, bucket)
+                self._last_rollup[table] = bucket
+            source = table
+            source_is_raw = False
+
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM samples_raw WHERE ts < ?", (now - self.raw_retention,))
+            for table, _, retention in self.tiers:
+                self.conn.execute(f"DELETE FROM {table} WHERE ts < ?", (now - retention,))
+
+    def _rollup(self, source: str, source_is_raw: bool, table: str, step: int, until: int):
+        """source の until より前のデータを step 秒単位で table に集約する（未集約分のみ）"""
+        if source_is_raw:
+            count_expr = "COUNT(*)"
+            agg = ", ".join(f"MIN({c}), AVG({c}), MAX({c})" for c in COLUMNS)
+        else:
+            count_expr = "SUM(count)"
+            agg = ", ".join(
+                f"MIN({c}_min), SUM({c}_avg * count) / SUM(count), MAX({c}_max)" for c in COLUMNS
+            )
+        agg_columns = ", ".join(f"{c}_min, {c}_avg, {c}_max" for c in COLUMNS)
+        with self._lock, self.conn:
+            row = self.conn.execute(f"SELECT MAX(ts) FROM {table}").fetchone()
+            start = row[0] + step if row and row[0] is not None else 0
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {table} (ts, count, {agg_columns}) "
+                f"SELECT ts - ts % {step} AS bucket, {count_expr}, {agg} FROM {source} "
+                f"WHERE ts >= ? AND ts < ? GROUP BY bucket",
+                (start, until)
+            )
+
+    def _pick_table(self, start: int, end: int, max_points: int):
+        """期間と最大点数から、必要十分な解像度のテーブルを選ぶ"""
+        span = max(end - start, 1)
+        now = time.time()
+        if span / self.sample_interval <= max_points and start >= now - self.raw_retention:
+            return "samples_raw", 1
+        for table, step, retention in self.tiers:
+            if span / step <= max_points and start >= now - retention:
+                return table, step
+        table, step, _ = self.tiers[-1]
+        return table, step
+
+    def query_range(self, start: int, end: int, max_points: int = 500) -> list:
+        """
+        期間内のデータ点を返す
+        生データの場合は各値、集約テーブルの場合は min/avg/max を返す
+        """
+        table, _ = self._pick_table(start, end, max_points)
+        with self._lock:
+            cursor = self.conn.execute(f"SELECT * FROM {table} WHERE ts >= ? AND ts < ? ORDER BY ts", (start, end))
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def aggregate(self, column: str, start: int, end: int) -> dict:
+        """期間内の min/avg/max とサンプル数を返す"""
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown metric: {column}")
+        table, _ = self._pick_table(start, end, max_points=2000)
+        with self._lock:
+            if table == "samples_raw":
+                row = self.conn.execute(
+                    f"SELECT MIN({column}), AVG({column}), MAX({column}), COUNT({column}) FROM samples_raw WHERE ts >= ? AND ts < ?",
+                    (start, end)
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT MIN({column}_min), SUM({column}_avg * count) / SUM(count), MAX({column}_max), SUM(count) "
+                    f"FROM {table} WHERE ts >= ? AND ts < ?",
+                    (start, end)
+                ).fetchone()
+        return {"min": row[0], "avg": row[1], "max": row[2], "count": row[3] or 0}
+
+    def find_below(self, column: str, threshold: float, start: int, end: int, limit: int = 10) -> list:
+        """
+        値が閾値を下回った時間帯を、悪い順に返す（例: FPSが落ち込んだ時間帯）
+        """
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown metric: {column}")
+        table, _ = self._pick_table(start, end, max_points=2000)
+        value = column if table == "samples_raw" else f"{column}_min"
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT ts, {value} FROM {table} WHERE ts >= ? AND ts < ? AND {value} < ? ORDER BY {value} LIMIT ?",
+                (start, end, threshold, limit)
+            ).fetchall()
+        return [{"ts": ts, column: v} for ts, v in rows]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class MetricsCollector:
+    """
+    REST API /metrics を一定間隔で取得して MetricsStore に保存するバックグラウンドタスク
+    """
+
+    def __init__(self, rest_api_plugin, store: MetricsStore, interval: float = 30.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.rest_api_plugin = rest_api_plugin
+        self.store = store
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        self.logger.info(f"Metrics collector started (interval: {self.interval}s)")
+        while True:
+            try:
+                metrics = await self.rest_api_plugin.async_get_cached("metrics")
+                if isinstance(metrics, dict) and "serverfps" in metrics:
+                    # SQLiteへの書き込みはイベントループの外で行う
+                    await asyncio.to_thread(self.store.add_sample, metrics)
+            except ConnectionError as e:
+                self.logger.debug(f"Metrics collection skipped: {e}")
+            except Exception as e:
+                self.logger.error(f"Metrics collection failed: {e}")
+            await asyncio.sleep(self.interval)
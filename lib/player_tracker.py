@@ -0,0 +1,265 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+
+
+def player_key(player: dict) -> str:
+    """プレイヤーを一意に識別するキー（userId > playerId > 名前の順で使用）"""
+    return player.get("userId") or player.get("playerId") or player.get("name") or ""
+
+
+class PlayerStore:
+    """
+    プレイヤーのセッションと累計プレイ時間を保存する（SQLite / WALモード）
+    書き込みはキューに溜め、flush() で1トランザクションにまとめて反映する
+    """
+
+    def __init__(self, db_path: str):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._pending_joins = []
+        self._pending_leaves = []
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS players ("
+                "player_key TEXT PRIMARY KEY, name TEXT, total_seconds REAL NOT NULL DEFAULT 0, "
+                "sessions INTEGER NOT NULL DEFAULT 0, last_seen REAL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id INTEGER PRIMARY KEY, player_key TEXT NOT NULL, start REAL NOT NULL, end REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_players_total ON players(total_seconds DESC)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_open ON sessions(player_key) WHERE end IS NULL")
+
+    def queue_join(self, key: str, name: str, start: float):
+        self._pending_joins.append((key, name, start))
+
+    def queue_leave(self, key: str, start: float, end: float):
+        self._pending_leaves.append((key, start, end))
+
+    def flush(self):
+        """溜まった書き込みを1トランザクションで反映する"""
+        joins, self._pending_joins = self._pending_joins, []
+        leaves, self._pending_leaves = self._pending_leaves, []
+        if not joins and not leaves:
+            return
+        with self._lock, self.conn:
+            if joins:
+                self.conn.executemany(
+                    "INSERT INTO players (player_key, name, sessions, last_seen) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT(player_key) DO UPDATE SET name = excluded.name, sessions = sessions + 1, "
+                    "last_seen = excluded.last_seen",
+                    joins
+                )
+                self.conn.executemany(
+                    "INSERT INTO sessions (player_key, start) VALUES (?, ?)",
+                    [(key, start) for key, _, start in joins]
+                )
+            if leaves:
+                self.conn.executemany(
+                    "UPDATE players SET total_seconds = total_seconds + ?, last_seen = ? WHERE player_key = ?",
+                    [(end - start, end, key) for key, start, end in leaves]
+                )
+                self.conn.executemany(
+                    "UPDATE sessions SET end = ? WHERE player_key = ? AND end IS NULL",
+                    [(end, key) for key, _, end in leaves]
+                )
+
+    def close_stale_sessions(self):
+        """
+        前回終了時に閉じられなかったセッションを、最終確認時刻で閉じる
+        """
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT s.player_key, s.start, p.last_seen FROM sessions s "
+                "JOIN players p ON p.player_key = s.player_key WHERE s.end IS NULL"
+            ).fetchall()
+            for key, start, last_seen in rows:
+                end = max(start, last_seen or start)
+                self.conn.execute(
+                    "UPDATE players SET total_seconds = total_seconds + ? WHERE player_key = ?", (end - start, key)
+                )
+                self.conn.execute("UPDATE sessions SET end = ? WHERE player_key = ? AND end IS NULL", (end, key))
+        return len(rows)
+
+    def touch(self, keys, now: float):
+        """オンライン中プレイヤーの最終確認時刻を更新（異常終了時の補正用）"""
+        with self._lock, self.conn:
+            self.conn.executemany("UPDATE players SET last_seen = ? WHERE player_key = ?", [(now, k) for k in keys])
+
+    def leaderboard(self, limit: int = 10, online: dict = None, now: float = None) -> list:
+        """
+        累計プレイ時間の上位を返す
+        online を渡すと、進行中のセッション時間も加算して順位付けする
+        """
+        now = now if now is not None else time.time()
+        online = online or {}
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT player_key, name, total_seconds, sessions FROM players ORDER BY total_seconds DESC LIMIT ?",
+                (limit + len(online),)
+            ).fetchall()
+        board = {}
+        for key, name, total, sessions in rows:
+            board[key] = {"key": key, "name": name, "seconds": total, "sessions": sessions}
+        for key, (name, start) in online.items():
+            entry = board.get(key)
+            if entry is None:
+                # 上位に入っていないオンライン中プレイヤーは累計値を個別に取得する
+                with self._lock:
+                    row = self.conn.execute(
+                        "SELECT total_seconds, sessions FROM players WHERE player_key = ?", (key,)
+                    ).fetchone()
+                total, sessions = row if row else (0.0, 1)
+                entry = board[key] = {"key": key, "name": name, "seconds": total, "sessions": sessions}
+            entry["seconds"] += now - start
+        return sorted(board.values(), key=lambda e: e["seconds"], reverse=True)[:limit]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class PlayerTracker:
+    """
+    REST API /players を定期的に取得し、前回との差分から参加/退出イベントを生成する
+    差分はプレイヤーキーの集合演算で求めるため、1回のポーリングはプレイヤー数に比例する
+    """
+
+    def __init__(self, rest_api_plugin, store: PlayerStore, interval: float = 15.0,
+                 offline_after_failures: int = 3, process_check=None):
+        """
+        :param offline_after_failures: 接続の失敗がこの回数続いた場合に、全員を退出扱いにする
+        :param process_check: サーバープロセスの生存確認（() -> bool）。終了が確認できた場合は失敗の回数を待たずに退出扱いにする
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.rest_api_plugin = rest_api_plugin
+        self.store = store
+        self.interval = interval
+        self.offline_after_failures = max(1, offline_after_failures)
+        self.process_check = process_check
+        self.failures = 0
+        self.online = {}        # key -> (name, start)
+        self.listeners = []     # async def listener(event: str, key: str, name: str, seconds: float)
+        self.touch_interval = 60.0
+        self._last_touch = 0.0
+        self._task = None
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def update(self, players: list, now: float = None):
+        """
+        最新のプレイヤー一覧を反映し、(参加, 退出) のリストを返す
+        参加: [(key, name)]、退出: [(key, name, セッション秒数)]
+        """
+        now = now if now is not None else time.time()
+        current = {}
+        for player in players:
+            key = player_key(player)
+            if key:
+                current[key] = player.get("name", key)
+
+        previous_keys = self.online.keys()
+        current_keys = current.keys()
+        joined = [(key, current[key]) for key in current_keys - previous_keys]
+        left = []
+        for key in previous_keys - current_keys:
+            name, start = self.online[key]
+            left.append((key, name, now - start))
+            self.store.queue_leave(key, start, now)
+
+        for key in [k for k, _, _ in left]:
+            del self.online[key]
+        for key, name in joined:
+            self.online[key] = (name, now)
+            self.store.queue_join(key, name, now)
+        return joined, left
+
+    def mark_all_offline(self, now: float = None):
+        """サーバー停止時など、オンライン中の全プレイヤーを退出扱いにする"""
+        return self.update([], now)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        closed = await asyncio.to_thread(self.store.close_stale_sessions)
+        if closed:
+            self.logger.info(f"Closed {closed} stale sessions")
+        self.logger.info(f"Player tracker started (interval: {self.interval}s)")
+        while True:
+            try:
+                response = await self.rest_api_plugin.async_get_cached("players")
+                players = response.get("players", []) if isinstance(response, dict) else []
+                joined, left = self.update(players)
+                self.failures = 0
+            except ConnectionError as e:
+                # 1回のタイムアウトや接続断では退出扱いにしない（セッションが分割されるため）
+                # サーバーの終了が確認できた場合か、失敗が続いた場合のみ全員退出扱いにする
+                self.failures += 1
+                if await self._server_gone() or self.failures >= self.offline_after_failures:
+                    joined, left = self.mark_all_offline()
+                else:
+                    self.logger.warning(f"Player polling failed ({self.failures}/{self.offline_after_failures}): {e}")
+                    joined, left = [], []
+            except Exception as e:
+                self.logger.error(f"Player tracking failed: {e}")
+                joined, left = [], []
+
+            try:
+                keys = list(self.online.keys())
+                now = time.time()
+                await asyncio.to_thread(self._persist, keys, now)
+            except Exception as e:
+                self.logger.error(f"Failed to persist player sessions: {e}")
+
+            for key, name in joined:
+                await self._notify("join", key, name, 0.0)
+            for key, name, seconds in left:
+                await self._notify("leave", key, name, seconds)
+            await asyncio.sleep(self.interval)
+
+    async def _server_gone(self) -> bool:
+        if self.process_check is None:
+            return False
+        return not await asyncio.to_thread(self.process_check)
+
+    def _persist(self, keys, now: float):
+        self.store.flush()
+        # 最終確認時刻の更新は間引いて書き込み回数を抑える
+        if keys and now - self._last_touch >= self.touch_interval:
+            self.store.touch(keys, now)
+            self._last_touch = now
+
+    async def _notify(self, event: str, key: str, name: str, seconds: float):
+        for listener in self.listeners:
+            try:
+                await listener(event, key, name, seconds)
+            except Exception as e:
+                self.logger.error(f"Player event listener failed: {e}")
+
+
+def format_duration(seconds: float) -> str:
+    """秒数を「x時間y分」形式に変換"""
+    minutes = int(seconds // 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}時間{minutes}分"
+    return f"{minutes}分"
@@ -0,0 +1,34 @@
+import time
+
+
+class TokenBucket:
+    """
+    トークンバケットによる送信レートの制限
+    capacity 回まで連続で送信でき、その後は rate 回/秒のペースで回復する
+    """
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """次のトークンが使えるようになるまでの秒数（すぐ使える場合は 0）"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> bool:
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import psutil
+from lib.server_control import exe_in_dir
+
+# パルワールドの既定ゲームポート（UDP）
+DEFAULT_GAME_PORT = 8211
+
+logger = logging.getLogger("Readiness")
+
+
+class ProcessExitedError(RuntimeError):
+    """準備完了を待つ間にサーバープロセスが終了した"""
+
+
+def find_process(name: str, install_dir: str = None):
+    """指定した名前のプロセスを1つ返す（見つからない場合は None、install_dir を指定した場合はその配下のもののみ）"""
+    for p in psutil.process_iter(attrs=["name"]):
+        if p.info["name"] == name and (install_dir is None or exe_in_dir(p, install_dir)):
+            return p
+    return None
+
+
+def _listening_ports(proc) -> set:
+    """
+    プロセスが待ち受けているポートを (プロトコル, ポート番号) の集合で返す
+    TCP は LISTEN 状態のもの、UDP はバインド済みのものを対象とする
+    """
+    connections = proc.net_connections(kind="inet") if hasattr(proc, "net_connections") else proc.connections(kind="inet")
+    ports = set()
+    for conn in connections:
+        if not conn.laddr:
+            continue
+        if conn.status == psutil.CONN_LISTEN:
+            ports.add(("tcp", conn.laddr.port))
+        elif conn.status == psutil.CONN_NONE:
+            ports.add(("udp", conn.laddr.port))
+    return ports
+
+
+class ReadinessProbe:
+    """
+    サーバー起動後、プレイヤーが接続できる状態になるまでを段階的に確認する
+    1. process: サーバープロセスの出現
+    2. ports: 指定ポートの待ち受け開始
+    3. api: REST API の info 取得、または RCON 認証の成功
+    いずれかの段階が deadline 秒以内に完了しなければ失敗とする（途中でプロセスが終了した場合は即座に失敗とする）
+    """
+
+    def __init__(self, server_cmd_exe: str, ports: list = None, rest_api_plugin=None, rcon_plugin=None,
+                 timeout: float = 300.0, interval: float = 2.0, clock=time.monotonic, install_dir: str = None):
+        """
+        :param install_dir: 指定した場合、この配下の実行ファイルのプロセスのみを確認する（複数インスタンス時）
+        """
+        self.server_cmd_exe = server_cmd_exe
+        self.install_dir = install_dir
+        self.ports = {(proto, int(port)) for proto, port in (ports or [])}
+        self.rest_api_plugin = rest_api_plugin
+        self.rcon_plugin = rcon_plugin
+        self.timeout = timeout
+        self.interval = interval
+        self.clock = clock
+
+    async def wait_ready(self, started_at: float = None) -> dict:
+        """
+        準備完了まで待機する
+        :param started_at: 起動コマンドを実行した時刻（clock の値）。省略時は呼び出し時刻
+        :return: {"ready", "duration", "phases": {段階: 起動からの経過秒}, "failed_phase", "error", "exited"}
+        """
+        started_at = started_at if started_at is not None else self.clock()
+        deadline = started_at + self.timeout
+        phases = {}
+        result = {"ready": False, "duration": None, "phases": phases, "failed_phase": None, "error": None,
+                  "exited": False}
+
+        steps = [("process", self._check_process), ("ports", self._check_ports)]
+        if self.rest_api_plugin is not None or self.rcon_plugin is not None:
+            steps.append(("api", self._check_api))
+
+        self._process = None
+        for phase, check in steps:
+            while True:
+                try:
+                    if await check():
+                        break
+                except ProcessExitedError as e:
+                    # 終了したプロセスを待ち続けても準備完了にはならない
+                    result.update(failed_phase=phase, error=str(e), exited=True, duration=self.clock() - started_at)
+                    logger.warning(f"Server process exited before ready: phase={phase}")
+                    return result
+                except Exception as e:
+                    result["error"] = str(e)
+                if self.clock() >= deadline:
+                    result["failed_phase"] = phase
+                    result["duration"] = self.clock() - started_at
+                    logger.warning(f"Server did not become ready: phase={phase}, error={result['error']}")
+                    return result
+                await asyncio.sleep(self.interval)
+            phases[phase] = self.clock() - started_at
+            result["error"] = None
+
+        result["ready"] = True
+        result["duration"] = self.clock() - started_at
+        logger.info(f"Server ready in {result['duration']:.1f}s: {phases}")
+        return result
+
+    async def _check_process(self) -> bool:
+        self._process = await asyncio.to_thread(find_process, self.server_cmd_exe, self.install_dir)
+        return self._process is not None
+
+    async def _check_ports(self) -> bool:
+        if not self.ports:
+            return True
+        try:
+            listening = await asyncio.to_thread(_listening_ports, self._process)
+        except psutil.NoSuchProcess:
+            raise ProcessExitedError("サーバープロセスが終了しました")
+        return self.ports <= listening
+
+    async def _check_api(self) -> bool:
+        if not await asyncio.to_thread(self._process.is_running):
+            raise ProcessExitedError("サーバープロセスが終了しました")
+        # プロセスとポートは確認済みのため、起動中の接続失敗で延びたサーキットブレーカーの待ち時間は使わない
+        # （待ち時間の分だけ API 応答の検出が遅れ、起動時間の記録がずれる）
+        plugin = self.rest_api_plugin if self.rest_api_plugin is not None else self.rcon_plugin
+        plugin.breaker.reset()
+        if self.rest_api_plugin is not None:
+            await self.rest_api_plugin.async_send_command("info", "GET")
+        else:
+            await asyncio.to_thread(self._rcon_auth)
+        return True
+
+    def _rcon_auth(self):
+        # 前回の接続は再起動で切れているため、張り直して認証を確認する
+        self.rcon_plugin.close()
+        self.rcon_plugin.connect()
+
+
+class BootHistory:
+    """
+    起動ごとの所要時間を JSON Lines 形式で記録する
+    """
+
+    def __init__(self, path: str, max_entries: int = 500):
+        self.path = path
+        self.max_entries = max_entries
+
+    def append(self, entry: dict):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._truncate()
+
+    def recent(self, limit: int = 10) -> list:
+        """新しい順に最大 limit 件を返す"""
+        return list(reversed(self._load()[-limit:]))
+
+    def _load(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
+
+    def _truncate(self):
+        entries = self._load()
+        if len(entries) <= self.max_entries:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries[-self.max_entries:]:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,250 @@
+import os
+import logging
+import psutil
+
+logger = logging.getLogger("ResourceManager")
+
+# 優先度の名前と psutil の値の対応（Windows は優先度クラス、それ以外は nice 値）
+if psutil.WINDOWS:
+    PRIORITIES = {
+        "idle": psutil.IDLE_PRIORITY_CLASS,
+        "below_normal": psutil.BELOW_NORMAL_PRIORITY_CLASS,
+        "normal": psutil.NORMAL_PRIORITY_CLASS,
+        "above_normal": psutil.ABOVE_NORMAL_PRIORITY_CLASS,
+        "high": psutil.HIGH_PRIORITY_CLASS,
+    }
+    IO_PRIORITIES = {
+        "very_low": psutil.IOPRIO_VERYLOW,
+        "low": psutil.IOPRIO_LOW,
+        "normal": psutil.IOPRIO_NORMAL,
+        "high": psutil.IOPRIO_HIGH,
+    }
+else:
+    PRIORITIES = {"idle": 19, "below_normal": 10, "normal": 0, "above_normal": -5, "high": -10}
+    IO_PRIORITIES = {
+        "very_low": (psutil.IOPRIO_CLASS_IDLE, 0) if hasattr(psutil, "IOPRIO_CLASS_IDLE") else None,
+        "low": (psutil.IOPRIO_CLASS_BE, 7) if hasattr(psutil, "IOPRIO_CLASS_BE") else None,
+        "normal": (psutil.IOPRIO_CLASS_BE, 4) if hasattr(psutil, "IOPRIO_CLASS_BE") else None,
+        "high": (psutil.IOPRIO_CLASS_BE, 0) if hasattr(psutil, "IOPRIO_CLASS_BE") else None,
+    }
+
+DEFAULT_POLICY = {
+    "server_cores": "auto",
+    "background_cores": "auto",
+    "server_priority": "above_normal",
+    "background_priority": "below_normal",
+    "server_io": "normal",
+    "background_io": "low",
+}
+
+# 自動割り当てで、バックグラウンド処理用に確保する論理コアの割合
+BACKGROUND_CORE_RATIO = 0.25
+
+
+def split_cores(cpu_count: int) -> tuple:
+    """
+    論理コアをサーバー用とバックグラウンド処理用に重ならないよう分割する
+    コア数が4未満の場合は分割しない（どちらも None = 制限なし）
+    """
+    if cpu_count < 4:
+        return None, None
+    background = max(1, int(cpu_count * BACKGROUND_CORE_RATIO))
+    cores = list(range(cpu_count))
+    return cores[:-background], cores[-background:]
+
+
+class ResourcePolicy:
+    """
+    サーバーとバックグラウンド処理（アップデート・バックアップ）のCPU割り当て・優先度の方針
+    設定 resource_policy の例:
+    {"server_cores": "auto", "background_cores": [12, 13, 14, 15],
+     "server_priority": "high", "background_priority": "idle", "server_io": "normal", "background_io": "very_low"}
+    """
+
+    def __init__(self, settings: dict = None, cpu_count: int = None):
+        self.settings = dict(settings or {})
+        settings = {**DEFAULT_POLICY, **self.settings}
+        cpu_count = cpu_count or psutil.cpu_count() or 1
+        auto_server, auto_background = split_cores(cpu_count)
+        self.server_cores = self._cores(settings["server_cores"], auto_server, cpu_count)
+        self.background_cores = self._cores(settings["background_cores"], auto_background, cpu_count)
+        if self.server_cores and self.background_cores and set(self.server_cores) & set(self.background_cores):
+            logger.warning("Server and background cores overlap")
+        self.server_priority = settings["server_priority"]
+        self.background_priority = settings["background_priority"]
+        self.server_io = settings["server_io"]
+        self.background_io = settings["background_io"]
+
+    @staticmethod
+    def _cores(value, auto, cpu_count: int):
+        if value == "auto":
+            return auto
+        if not value:
+            return None
+        cores = sorted({int(c) for c in value if 0 <= int(c) < cpu_count})
+        return cores or None
+
+
+def _apply(process, cores, priority: str, io: str) -> list:
+    """プロセスに割り当てを適用し、適用できなかった項目のエラーを返す"""
+    errors = []
+    if cores and hasattr(process, "cpu_affinity"):
+        try:
+            process.cpu_affinity(cores)
+        except (psutil.Error, OSError, ValueError) as e:
+            errors.append(f"affinity: {e}")
+    if priority:
+        try:
+            process.nice(PRIORITIES[priority])
+        except (psutil.Error, OSError, KeyError) as e:
+            errors.append(f"priority: {e}")
+    io_value = IO_PRIORITIES.get(io) if io else None
+    if io_value is not None and hasattr(process, "ionice"):
+        try:
+            if isinstance(io_value, tuple):
+                process.ionice(*io_value)
+            else:
+                process.ionice(io_value)
+        except (psutil.Error, OSError, ValueError) as e:
+            errors.append(f"io: {e}")
+    return errors
+
+
+def describe_process(process) -> dict:
+    """プロセスの実際の割り当て（アフィニティ・優先度・I/O優先度）を取得する"""
+    info = {"pid": process.pid}
+    try:
+        info["name"] = process.name()
+        info["affinity"] = process.cpu_affinity() if hasattr(process, "cpu_affinity") else None
+        info["priority"] = _priority_name(process.nice())
+        info["io"] = str(process.ionice()) if hasattr(process, "ionice") else None
+    except (psutil.Error, OSError) as e:
+        info["error"] = str(e)
+    return info
+
+
+def _priority_name(value) -> str:
+    for name, v in PRIORITIES.items():
+        if v == value:
+            return name
+    return str(value)
+
+
+def format_cores(cores) -> str:
+    """[0, 1, 2, 3, 8] → "0-3,8" """
+    if not cores:
+        return "全て"
+    ranges = []
+    start = prev = cores[0]
+    for c in cores[1:] + [None]:
+        if c is not None and c == prev + 1:
+            prev = c
+            continue
+        ranges.append(f"{start}-{prev}" if start != prev else str(start))
+        if c is not None:
+            start = prev = c
+    return ",".join(ranges)
+
+
+class ResourceManager:
+    """ResourcePolicy に従ってプロセスに CPU 割り当て・優先度を適用する"""
+
+    def __init__(self, policy: ResourcePolicy):
+        self.policy = policy
+
+    def server_processes(self, names, install_dir: str = None) -> list:
+        """
+        サーバーのプロセスツリー（指定した名前のプロセスとその子プロセス）
+        install_dir を指定した場合は、その配下の実行ファイルのプロセスのみを対象とする（複数インスタンスの区別）
+        """
+        # server_control は steamcmd_runner 経由でこのモジュールを読み込むため、ここで読み込む
+        from lib.server_control import exe_in_dir
+        found = {}
+        for p in psutil.process_iter(attrs=["name"]):
+            if p.info["name"] in names and (install_dir is None or exe_in_dir(p, install_dir)):
+                found[p.pid] = p
+                try:
+                    for child in p.children(recursive=True):
+                        found[child.pid] = child
+                except psutil.NoSuchProcess:
+                    continue
+        return list(found.values())
+
+    def apply_server(self, names, install_dir: str = None) -> list:
+        """
+        サーバーのプロセスツリーに割り当てを適用し、実際の割り当てを返す
+        """
+        placements = []
+        for process in self.server_processes(names, install_dir):
+            errors = _apply(process, self.policy.server_cores, self.policy.server_priority, self.policy.server_io)
+            placement = describe_process(process)
+            if errors:
+                placement["errors"] = errors
+                logger.warning(f"Failed to apply server placement to pid {process.pid}: {errors}")
+            placements.append(placement)
+        logger.info(f"Server placement: {placements}")
+        return placements
+
+    def apply_background(self, pid: int) -> dict:
+        """バックグラウンド処理（steamcmd・バックアップなど）のプロセスに低優先度の割り当てを適用する"""
+        try:
+            process = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            return {"pid": pid, "error": "process not found"}
+        errors = _apply(process, self.policy.background_cores, self.policy.background_priority, self.policy.background_io)
+        placement = describe_process(process)
+        if errors:
+            placement["errors"] = errors
+            logger.warning(f"Failed to apply background placement to pid {pid}: {errors}")
+        return placement
+
+    def apply_bot(self) -> dict:
+        """
+        Bot 自身のプロセスをバックグラウンド用のコアに寄せる（優先度は変えない）
+        Bot から起動する子プロセス（ハッシュ計算のワーカーなど）にも引き継がれる
+        """
+        process = psutil.Process(os.getpid())
+        errors = _apply(process, self.policy.background_cores, None, None)
+        placement = describe_process(process)
+        if errors:
+            placement["errors"] = errors
+        return placement
+
+
+# プロセス全体で共有する設定（未設定の場合、バックグラウンド処理の割り当ては行わない）
+_manager = None
+
+
+def configure(settings: dict = None) -> ResourceManager:
+    """リソース管理を有効にする"""
+    global _manager
+    _manager = ResourceManager(ResourcePolicy(settings))
+    return _manager
+
+
+def get_manager() -> ResourceManager:
+    return _manager
+
+
+def place_background(pid: int):
+    """
+    バックグラウンド処理の子プロセスを起動した直後に呼び出す
+    リソース管理が無効な場合は何もしない
+    """
+    if _manager is None:
+        return None
+    return _manager.apply_background(pid)
+
+
+def worker_settings() -> dict:
+    """プロセスプールのワーカーに渡す設定（リソース管理が無効な場合は None）"""
+    return _manager.policy.settings if _manager is not None else None
+
+
+def init_background_worker(settings: dict = None):
+    """
+    ProcessPoolExecutor の initializer 用
+    ワーカープロセスにバックグラウンド用の割り当てを適用する（initargs には worker_settings() を渡す）
+    """
+    if settings is not None:
+        configure(settings).apply_background(os.getpid())
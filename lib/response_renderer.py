@@ -0,0 +1,193 @@
+import io
+import gzip
+import json
+import unicodedata
+import discord
+
+# 1ページ（1メッセージ）に表示する行数と文字数の上限
+ROWS_PER_PAGE = 15
+PAGE_CHARS = 1900
+# ページ数がこれを超える場合は、ページ送りではなくファイルを添付する
+MAX_PAGES = 20
+# 添付ファイルがこの大きさを超える場合は gzip で圧縮する
+GZIP_THRESHOLD = 256 * 1024
+# 表の1セルの最大幅（半角換算）
+MAX_CELL_WIDTH = 24
+
+# プレイヤー一覧の表に表示する列（キー, 見出し）
+PLAYER_COLUMNS = [
+    ("name", "名前"),
+    ("level", "Lv"),
+    ("ping", "Ping"),
+    ("building_count", "建築"),
+    ("accountName", "アカウント"),
+    ("userId", "ユーザーID"),
+]
+
+
+def display_width(text: str) -> int:
+    """等幅フォントでの表示幅（全角文字は2）"""
+    return sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+
+
+def fit(text: str, width: int) -> str:
+    """表示幅 width に切り詰め、空白で埋める"""
+    if display_width(text) > width:
+        result = ""
+        for c in text:
+            if display_width(result + c) > width - 1:
+                break
+            result += c
+        text = result + "…"
+    return text + " " * (width - display_width(text))
+
+
+def format_value(value) -> str:
+    if isinstance(value, float):
+        return f"{value:g}"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return str(value)
+
+
+class ResponseRenderer:
+    """
+    REST API のレスポンスを Discord で表示する形式に変換する
+
+    - プレイヤー一覧などの辞書のリストは表、設定などの辞書はキーと値の一覧、それ以外は整形済みテキストで表示する
+    - ページは表示する時にだけ作成する（表示しないページの文字列は作らない）
+    - ページ数が max_pages を超える場合は、全体を1つのファイル（大きい場合は gzip）として添付する
+    """
+
+    def __init__(self, data, title: str, rows_per_page: int = ROWS_PER_PAGE, max_pages: int = MAX_PAGES,
+                 gzip_threshold: int = GZIP_THRESHOLD):
+        self.title = title
+        self.rows_per_page = max(1, rows_per_page)
+        self.max_pages = max_pages
+        self.gzip_threshold = gzip_threshold
+        self.columns = None
+        self.kind, self.rows = self._classify(data)
+
+    def _classify(self, data) -> tuple:
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                return "text", data.splitlines() or [""]
+        # {"players": [...]} のように、リスト1つだけを包んだ辞書は中身のリストを表示する
+        if isinstance(data, dict) and len(data) == 1:
+            inner = next(iter(data.values()))
+            if isinstance(inner, list) and all(isinstance(row, dict) for row in inner):
+                data = inner
+        if isinstance(data, list) and data and all(isinstance(row, dict) for row in data):
+            keys = list(dict.fromkeys(k for row in data[:50] for k in row))
+            known = [(k, label) for k, label in PLAYER_COLUMNS if k in keys]
+            self.columns = known or [(k, k) for k in keys[:6]]
+            return "table", data
+        # 空のリスト・辞書（{} では grid の列幅を計算できない）
+        if isinstance(data, (list, dict)) and not data:
+            return "text", ["（データがありません）"]
+        if isinstance(data, dict):
+            return "grid", list(data.items())
+        return "text", json.dumps(data, ensure_ascii=False, indent=2).splitlines()
+
+    # ---- ページ ----
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self.rows) // self.rows_per_page))
+
+    @property
+    def needs_attachment(self) -> bool:
+        return self.page_count > self.max_pages
+
+    def render_page(self, page: int) -> str:
+        """page 番目（0始まり）のページのメッセージ本文"""
+        page = max(0, min(page, self.page_count - 1))
+        rows = self.rows[page * self.rows_per_page:(page + 1) * self.rows_per_page]
+        body = "\n".join(self._render_rows(rows, MAX_CELL_WIDTH))
+        header = f"**{self.title}**"
+        if self.page_count > 1:
+            header += f"（{page + 1}/{self.page_count}ページ、全{len(self.rows)}件）"
+        # 1行が長い場合でもメッセージの上限を超えないよう切り詰める
+        limit = PAGE_CHARS - len(header)
+        if len(body) > limit:
+            body = body[:limit - 1] + "…"
+        return f"{header}\n```\n{body}\n```"
+
+    def _render_rows(self, rows: list, cell_width: int) -> list:
+        if self.kind == "table":
+            cells = [[format_value(row.get(k, "")) for k, _ in self.columns] for row in rows]
+            widths = [
+                min(cell_width, max([display_width(label)] + [display_width(c[i]) for c in cells]))
+                for i, (_, label) in enumerate(self.columns)
+            ]
+            lines = [" ".join(fit(label, w) for (_, label), w in zip(self.columns, widths)).rstrip()]
+            lines.append(" ".join("-" * w for w in widths))
+            lines.extend(" ".join(fit(c, w) for c, w in zip(row, widths)).rstrip() for row in cells)
+            return lines
+        if self.kind == "grid":
+            width = min(cell_width * 2, max(display_width(str(k)) for k, _ in rows))
+            return [f"{fit(str(k), width)} : {format_value(v)}" for k, v in rows]
+        return rows
+
+    # ---- 添付ファイル ----
+
+    def render_attachment(self) -> discord.File:
+        """全体を1つのファイルにする（セルの幅は切り詰めない）"""
+        text = "\n".join(self._render_rows(self.rows, 1 << 16)) + "\n"
+        data = text.encode("utf-8")
+        filename = "response.txt"
+        if len(data) > self.gzip_threshold:
+            data = gzip.compress(data)
+            filename += ".gz"
+        return discord.File(io.BytesIO(data), filename=filename)
+
+
+class PaginatorView(discord.ui.View):
+    """ページ送りのボタン（押されたページだけを作成して表示する）"""
+
+    def __init__(self, renderer: ResponseRenderer, user_id: int, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.renderer = renderer
+        self.user_id = user_id
+        self.page = 0
+        self.message = None
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.renderer.page_count - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # コマンドを実行したユーザーのみ操作できる
+        return interaction.user.id == self.user_id
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        self.page = max(0, min(page, self.renderer.page_count - 1))
+        self._update_buttons()
+        await interaction.response.edit_message(content=self.renderer.render_page(self.page), view=self)
+
+    @discord.ui.button(label="≪", style=discord.ButtonStyle.secondary)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, 0)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.primary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    @discord.ui.button(label="≫", style=discord.ButtonStyle.secondary)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.renderer.page_count - 1)
+
+    async def on_timeout(self):
+        # 操作できなくなったボタンを外す
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
@@ -0,0 +1,198 @@
+import time
+import asyncio
+import logging
+import threading
+
+# 読み取り専用エンドポイントごとのキャッシュ有効期間（秒）
+DEFAULT_TTLS = {
+    "info": 60.0,
+    "players": 5.0,
+    "settings": 300.0,
+    "metrics": 5.0,
+}
+
+# TTL切れ後も古い値を返しつつ裏で再取得を行う猶予時間（TTLに対する倍率）
+DEFAULT_STALE_FACTOR = 2.0
+
+
+class CacheEntry:
+    """キャッシュされたレスポンス"""
+    __slots__ = ("value", "fetched_at")
+
+    def __init__(self, value, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+class RestResponseCache:
+    """
+    読み取り専用REST APIのレスポンスキャッシュ
+    - エンドポイントごとのTTL
+    - 同一リクエストの同時実行を1回にまとめる（シングルフライト）
+    - TTL切れ直後は古い値を返しつつバックグラウンドで再取得（stale-while-revalidate）
+    - ヒット/ミス数の集計
+    """
+
+    def __init__(self, ttls: dict = None, stale_factor: float = DEFAULT_STALE_FACTOR, clock=time.monotonic):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.stale_factor = stale_factor
+        self.clock = clock
+
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._async_inflight = {}   # key -> asyncio.Future
+        self._sync_inflight = {}    # key -> threading.Event
+        self._stats = {}
+
+    def is_cacheable(self, endpoint: str) -> bool:
+        return endpoint in self.ttls
+
+    def _key(self, endpoint: str, params: dict = None):
+        if not params:
+            return endpoint
+        return (endpoint, tuple(sorted(params.items())))
+
+    def _count(self, endpoint: str, name: str):
+        stats = self._stats.setdefault(endpoint, {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "errors": 0})
+        stats[name] += 1
+
+    def _lookup(self, endpoint: str, key):
+        """
+        キャッシュを参照し (値, 状態) を返す
+        状態: "fresh" / "stale" / None（未取得または期限切れ）
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        ttl = self.ttls[endpoint]
+        age = self.clock() - entry.fetched_at
+        if age < ttl:
+            return entry.value, "fresh"
+        if age < ttl * self.stale_factor:
+            return entry.value, "stale"
+        return None, None
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = CacheEntry(value, self.clock())
+
+    # ---- 非同期（Discord Bot用） ----
+
+    async def aget(self, endpoint: str, fetch, params: dict = None):
+        """
+        キャッシュ経由で値を取得する
+        :param fetch: 引数なしで呼び出すとコルーチンを返す関数（実際のHTTP呼び出し）
+        """
+        key = self._key(endpoint, params)
+        with self._lock:
+            value, state = self._lookup(endpoint, key)
+            if state == "fresh":
+                self._count(endpoint, "hits")
+                return value
+            if state == "stale":
+                self._count(endpoint, "stale_hits")
+                if key not in self._async_inflight:
+                    self._async_inflight[key] = self._start_async_fetch(endpoint, key, fetch)
+                return value
+            future = self._async_inflight.get(key)
+            if future is not None:
+                self._count(endpoint, "coalesced")
+            else:
+                self._count(endpoint, "misses")
+                future = self._start_async_fetch(endpoint, key, fetch)
+                self._async_inflight[key] = future
+        # 呼び出し元のキャンセルで共有中の取得処理が中断されないようにする
+        return await asyncio.shield(future)
+
+    def _start_async_fetch(self, endpoint: str, key, fetch):
+        task = asyncio.ensure_future(fetch())
+
+        def _done(t):
+            with self._lock:
+                self._async_inflight.pop(key, None)
+            if t.cancelled():
+                return
+            if t.exception() is not None:
+                with self._lock:
+                    self._count(endpoint, "errors")
+                self.logger.debug(f"Cache refresh failed for {endpoint}: {t.exception()}")
+                return
+            self._store(key, t.result())
+
+        task.add_done_callback(_done)
+        return task
+
+    # ---- 同期（GUI・スレッド用） ----
+
+    def get(self, endpoint: str, fetch, params: dict = None):
+        """
+        キャッシュ経由で値を取得する（同期版）
+        :param fetch: 引数なしで呼び出すと値を返す関数（実際のHTTP呼び出し）
+        """
+        key = self._key(endpoint, params)
+        with self._lock:
+            value, state = self._lookup(endpoint, key)
+            if state == "fresh":
+                self._count(endpoint, "hits")
+                return value
+            if state == "stale":
+                self._count(endpoint, "stale_hits")
+                if key not in self._sync_inflight:
+                    self._sync_inflight[key] = threading.Event()
+                    threading.Thread(target=self._sync_fetch, args=(endpoint, key, fetch), daemon=True).start()
+                return value
+            event = self._sync_inflight.get(key)
+            if event is None:
+                self._count(endpoint, "misses")
+                self._sync_inflight[key] = threading.Event()
+                leader = True
+            else:
+                self._count(endpoint, "coalesced")
+                leader = False
+
+        if leader:
+            return self._sync_fetch(endpoint, key, fetch, raise_error=True)
+
+        # 先行リクエストの完了を待ち、その結果を共有する
+        event.wait()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            raise ConnectionError(f"{endpoint} の取得に失敗しました")
+        return entry.value
+
+    def _sync_fetch(self, endpoint: str, key, fetch, raise_error: bool = False):
+        try:
+            value = fetch()
+            self._store(key, value)
+            return value
+        except Exception as e:
+            with self._lock:
+                self._count(endpoint, "errors")
+            self.logger.debug(f"Cache refresh failed for {endpoint}: {e}")
+            if raise_error:
+                raise
+        finally:
+            with self._lock:
+                event = self._sync_inflight.pop(key, None)
+            if event is not None:
+                event.set()
+
+    # ---- 管理 ----
+
+    def invalidate(self, endpoint: str = None):
+        """キャッシュを破棄する（endpoint未指定時はすべて）"""
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k == endpoint or (isinstance(k, tuple) and k[0] == endpoint)]:
+                    del self._entries[key]
+
+    def get_stats(self) -> dict:
+        """エンドポイントごとのヒット/ミス数を返す"""
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import shutil
+import logging
+
+logger = logging.getLogger("Retention")
+
+# 世代管理の既定値
+# 直近 keep_all_hours 時間は全て、keep_hourly_days 日までは1時間に1つ、
+# keep_daily_days 日までは1日に1つ、それより古いものは1週間に1つ（keep_weekly_weeks 週まで、0 は無期限）残す
+DEFAULT_RETENTION = {
+    "keep_all_hours": 6,
+    "keep_hourly_days": 2,
+    "keep_daily_days": 30,
+    "keep_weekly_weeks": 0,
+}
+
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+
+def select_expired(snapshots: list, now: float = None, rules: dict = None) -> list:
+    """
+    GFS 方式の世代管理で削除するスナップショットを選ぶ
+    :param snapshots: [(スナップショットID, 作成時刻), ...]
+    :return: 削除するスナップショットIDの一覧
+    """
+    now = time.time() if now is None else now
+    rules = {**DEFAULT_RETENTION, **(rules or {})}
+    keep_all = rules["keep_all_hours"] * HOUR
+    hourly = rules["keep_hourly_days"] * DAY
+    daily = rules["keep_daily_days"] * DAY
+    weekly = rules["keep_weekly_weeks"] * WEEK
+
+    ordered = sorted(snapshots, key=lambda s: s[1], reverse=True)
+    seen_buckets = set()
+    expired = []
+    for index, (snapshot_id, created) in enumerate(ordered):
+        age = now - created
+        # 最新のスナップショットは常に残す
+        if index == 0 or age < keep_all:
+            continue
+        # 各区間では、時間枠ごとに最も新しいものを残す（時間枠は現地時刻ではなく UNIX 時刻で区切る）
+        if age < hourly:
+            bucket = ("hour", int(created // HOUR))
+        elif age < daily:
+            bucket = ("day", int(created // DAY))
+        elif weekly <= 0 or age < weekly:
+            bucket = ("week", int(created // WEEK))
+        else:
+            expired.append(snapshot_id)
+            continue
+        if bucket in seen_buckets:
+            expired.append(snapshot_id)
+        else:
+            seen_buckets.add(bucket)
+    return expired
+
+
+class DiskForecaster:
+    """
+    セーブデータとバックアップの使用量の推移から、ディスクの空き容量がなくなる時期を予測する
+    記録は JSON Lines 形式で保存する（1行 = {"ts", "used", "free"}）
+    """
+
+    def __init__(self, path: str, volume_path: str, window_days: float = 7.0, max_entries: int = 2000):
+        self.path = path
+        self.volume_path = volume_path
+        self.window_days = window_days
+        self.max_entries = max_entries
+
+    def record(self, used_bytes: int, now: float = None) -> dict:
+        """
+        使用量（セーブデータ + バックアップ）とボリュームの空き容量を記録する
+        """
+        entry = {
+            "ts": time.time() if now is None else now,
+            "used": int(used_bytes),
+            "free": shutil.disk_usage(self.volume_path).free,
+        }
+        entries = self._load()
+        entries.append(entry)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if len(entries) > self.max_entries:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for e in entries[-self.max_entries:]:
+                    f.write(json.dumps(e) + "\n")
+            os.replace(tmp_path, self.path)
+        else:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def forecast(self, now: float = None) -> dict:
+        """
+        直近 window_days 日の使用量の増加率（最小二乗法による傾き）から、空き容量がなくなるまでの時間を求める
+        :return: {"rate": 1日あたりの増加バイト数, "free": 空き容量, "days_left": 残り日数（増加していない場合は None）}
+        """
+        now = time.time() if now is None else now
+        entries = [e for e in self._load() if now - e["ts"] <= self.window_days * DAY]
+        free = shutil.disk_usage(self.volume_path).free
+        result = {"rate": None, "free": free, "days_left": None, "samples": len(entries)}
+        if len(entries) < 2 or entries[-1]["ts"] - entries[0]["ts"] < HOUR:
+            return result
+
+        mean_t = sum(e["ts"] for e in entries) / len(entries)
+        mean_u = sum(e["used"] for e in entries) / len(entries)
+        var = sum((e["ts"] - mean_t) ** 2 for e in entries)
+        cov = sum((e["ts"] - mean_t) * (e["used"] - mean_u) for e in entries)
+        rate = cov / var * DAY if var else 0.0
+        result["rate"] = rate
+        if rate > 0:
+            result["days_left"] = free / rate
+        return result
+
+    def _load(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
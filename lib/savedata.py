@@ -0,0 +1,783 @@
+import os
+import glob
+import zlib
+import struct
+import logging
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from lib import resource_manager
+
+# pyooz（Oodle の展開）がインストールされていれば、Oodle で圧縮されたセーブデータも読む
+try:
+    import ooz
+except ImportError:
+    ooz = None
+
+logger = logging.getLogger("SaveData")
+
+# 1回に読み込む圧縮データの大きさ
+READ_BLOCK_SIZE = 256 * 1024
+
+# .sav のヘッダー（展開後サイズ, 圧縮サイズ, マジック, 形式）
+SAVE_MAGIC_ZLIB = b"PlZ"
+SAVE_MAGIC_OODLE = b"PlM"
+SAVE_TYPE_LAYERS = {0x31: 1, 0x32: 2}
+
+ROW_START = 0
+ROW_END = 1
+VALUE = 2
+
+# 要素の大きさが書かれていない場所（配列・マップの要素）で読み飛ばすための、固定長の構造体の大きさ
+FIXED_STRUCT_SIZES = {
+    "Guid": 16,
+    "DateTime": 8,
+    "Timespan": 8,
+    "Vector": 24,
+    "Vector2D": 16,
+    "Rotator": 24,
+    "Quat": 32,
+    "LinearColor": 16,
+    "Color": 4,
+    "IntPoint": 8,
+}
+
+# マップのキー・値が構造体の場合の型（ファイルに書かれていないため、パスごとに指定する）
+# 指定がない場合、キーは Guid、値はプロパティの並びとして読む
+MAP_TYPE_HINTS = {
+    ".worldSaveData.CharacterSaveParameterMap.Key": "StructProperty",
+    ".worldSaveData.CharacterContainerSaveData.Key": "StructProperty",
+    ".worldSaveData.ItemContainerSaveData.Key": "StructProperty",
+    ".worldSaveData.FoliageGridSaveDataMap.Key": "StructProperty",
+    ".worldSaveData.MapObjectSpawnerInStageSaveData.Key": "StructProperty",
+}
+
+CHARACTER_RAW = ".worldSaveData.CharacterSaveParameterMap.Value.RawData"
+GROUP_RAW = ".worldSaveData.GroupSaveDataMap.Value.RawData"
+GROUP_TYPE = ".worldSaveData.GroupSaveDataMap.Value.GroupType"
+ITEM_SLOT_RAW = ".worldSaveData.ItemContainerSaveData.Value.Slots.Slots.RawData"
+
+
+class SaveFormatError(Exception):
+    """.sav の形式が想定と異なる、またはデータが途中で終わっている"""
+
+
+class _Reader:
+    """
+    リトルエンディアンの基本型を読み出す
+    サブクラスは _need(n) で buf[pos:pos+n] が読める状態にする
+    """
+    buf = b""
+    pos = 0
+
+    def _need(self, n: int):
+        raise NotImplementedError
+
+    def read(self, n: int) -> bytes:
+        if self.pos + n > len(self.buf):
+            self._need(n)
+        pos = self.pos
+        self.pos = pos + n
+        return bytes(self.buf[pos:pos + n])
+
+    def _unpack(self, fmt: struct.Struct):
+        # 呼び出し回数が非常に多いため、バッファに足りている場合は _need を呼ばない
+        if self.pos + fmt.size > len(self.buf):
+            self._need(fmt.size)
+        pos = self.pos
+        self.pos = pos + fmt.size
+        return fmt.unpack_from(self.buf, pos)[0]
+
+    def u8(self) -> int:
+        return self._unpack(_U8)
+
+    def u16(self) -> int:
+        return self._unpack(_U16)
+
+    def i16(self) -> int:
+        return self._unpack(_I16)
+
+    def i32(self) -> int:
+        return self._unpack(_I32)
+
+    def u32(self) -> int:
+        return self._unpack(_U32)
+
+    def i64(self) -> int:
+        return self._unpack(_I64)
+
+    def u64(self) -> int:
+        return self._unpack(_U64)
+
+    def f32(self) -> float:
+        return self._unpack(_F32)
+
+    def f64(self) -> float:
+        return self._unpack(_F64)
+
+    def property_tag(self) -> tuple:
+        """
+        プロパティの先頭（名前, 型, サイズ）をまとめて読む。名前が None の場合は (None, None, 0)
+        プロパティの数だけ呼ばれるため、fstring・i64 を個別に呼ばずに1回で読む
+        """
+        name = self.fstring()
+        if name == "None":
+            return None, None, 0
+        type_name = self.fstring()
+        if self.pos + 8 > len(self.buf):
+            self._need(8)
+        pos = self.pos
+        self.pos = pos + 8
+        return name, type_name, _I64.unpack_from(self.buf, pos)[0]
+
+    def guid(self) -> str:
+        data = self.read(16)
+        # UE の FGuid は 32bit 整数4つ（それぞれリトルエンディアン）
+        a, b, c, d = struct.unpack("<4I", data)
+        h = f"{a:08x}{b:08x}{c:08x}{d:08x}"
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+    def fstring(self) -> str:
+        size = self._unpack(_I32)
+        if size == 0:
+            return ""
+        n = size if size > 0 else -size * 2
+        if self.pos + n > len(self.buf):
+            self._need(n)
+        pos = self.pos
+        self.pos = pos + n
+        # 末尾の終端文字を除いて、バッファから直接デコードする
+        if size > 0:
+            return self.buf[pos:pos + n - 1].decode("utf-8", errors="replace")
+        return self.buf[pos:pos + n - 2].decode("utf-16-le", errors="replace")
+
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_I16 = struct.Struct("<h")
+_I32 = struct.Struct("<i")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_U64 = struct.Struct("<Q")
+_F32 = struct.Struct("<f")
+_F64 = struct.Struct("<d")
+
+
+class _BytesReader(_Reader):
+    """メモリ上のバイト列（RawData など）を読む"""
+
+    def __init__(self, data: bytes):
+        self.buf = data
+        self.pos = 0
+
+    def _need(self, n: int):
+        if self.pos + n > len(self.buf):
+            raise SaveFormatError("データが途中で終わっています")
+
+    def skip(self, n: int):
+        self._need(n)
+        self.pos += n
+
+    def at_end(self) -> bool:
+        return self.pos >= len(self.buf)
+
+
+class _InflateReader(_Reader):
+    """
+    zlib（1段または2段）を少しずつ展開しながら読む
+    保持するのは未読の展開済みデータのみで、ファイル全体を展開してメモリに置くことはしない
+    """
+
+    def __init__(self, f, layers: int, block_size: int = READ_BLOCK_SIZE):
+        self.f = f
+        self.block_size = block_size
+        self.decoders = [zlib.decompressobj() for _ in range(layers)]
+        self.buf = bytearray()
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.f.read(self.block_size)
+        if not data:
+            self.eof = True
+            for decoder in self.decoders:
+                data = decoder.decompress(data) + decoder.flush()
+        else:
+            for decoder in self.decoders:
+                data = decoder.decompress(data)
+        self.buf += data
+        return True
+
+    def _need(self, n: int):
+        if self.pos + n <= len(self.buf):
+            return
+        # 読み終えた部分を捨ててから補充する
+        del self.buf[:self.pos]
+        self.pos = 0
+        while len(self.buf) < n:
+            if not self._fill():
+                raise SaveFormatError("データが途中で終わっています")
+
+    def skip(self, n: int):
+        available = len(self.buf) - self.pos
+        if n <= available:
+            self.pos += n
+            return
+        n -= available
+        self.buf = bytearray()
+        self.pos = 0
+        while n > 0:
+            if not self._fill():
+                raise SaveFormatError("データが途中で終わっています")
+            if len(self.buf) > n:
+                del self.buf[:n]
+                return
+            n -= len(self.buf)
+            self.buf = bytearray()
+
+
+def open_save(f) -> _Reader:
+    """
+    .sav ファイルのヘッダーを読み、GVAS 本体を展開しながら読むリーダーを返す
+    """
+    header = f.read(12)
+    if len(header) < 12:
+        raise SaveFormatError("ヘッダーが短すぎます")
+    magic, save_type = header[8:11], header[11]
+    if magic == b"CNK":
+        header = f.read(12)
+        magic, save_type = header[8:11], header[11]
+    if magic == SAVE_MAGIC_OODLE:
+        return _open_oodle(f, header)
+    if magic != SAVE_MAGIC_ZLIB or save_type not in SAVE_TYPE_LAYERS:
+        raise SaveFormatError(f"未対応のセーブデータ形式です: {magic!r} {save_type:#x}")
+    return _InflateReader(f, SAVE_TYPE_LAYERS[save_type])
+
+
+def _open_oodle(f, header: bytes) -> _Reader:
+    """
+    Oodle で圧縮された GVAS 本体を展開する
+    Oodle は少しずつ展開できないため、zlib と異なり展開後のデータ全体をメモリに置く
+    """
+    if ooz is None:
+        raise SaveFormatError("Oodle で圧縮されたセーブデータを読むには pyooz をインストールしてください")
+    uncompressed_size, compressed_size = struct.unpack("<II", header[:8])
+    data = f.read(compressed_size)
+    if len(data) < compressed_size:
+        raise SaveFormatError("データが途中で終わっています")
+    try:
+        body = ooz.decompress(data, uncompressed_size)
+    except Exception as e:
+        raise SaveFormatError(f"Oodle の展開に失敗しました: {e}")
+    if len(body) != uncompressed_size:
+        raise SaveFormatError(f"展開後のサイズが一致しません: {len(body)} != {uncompressed_size}")
+    return _BytesReader(body)
+
+
+def read_gvas_header(reader: _Reader) -> dict:
+    if reader.read(4) != b"GVAS":
+        raise SaveFormatError("GVAS のヘッダーが見つかりません")
+    save_game_version = reader.i32()
+    reader.i32()  # package_file_version_ue4
+    if save_game_version >= 3:
+        reader.i32()  # package_file_version_ue5
+    engine = f"{reader.u16()}.{reader.u16()}.{reader.u16()}-{reader.u32()}"
+    reader.fstring()  # branch
+    reader.i32()  # custom_version_format
+    reader.skip(reader.i32() * 20)  # custom_versions (Guid + int32)
+    return {"save_game_version": save_game_version, "engine": engine, "class": reader.fstring()}
+
+
+class _Walker:
+    """
+    GVAS のプロパティを先頭から順にたどり、要求されたパスの値だけをイベントとして返す
+
+    - 要求されたパスにつながらないプロパティは、サイズ情報を使って中身を読まずに読み飛ばす
+    - 値はパス（".worldSaveData.CharacterSaveParameterMap.Value.RawData.SaveParameter.Level" など）単位で返し、
+      ツリー構造のオブジェクトは作らない
+    - 行として扱うパス（マップ・配列）では、要素ごとに ROW_START / ROW_END を返す
+    """
+
+    def __init__(self, leaves, rows=()):
+        self.leaves = set(leaves)
+        self.rows = set(rows)
+        # RawData の解釈に必要な兄弟プロパティ（要求されていなくても読む）
+        self.internal = set()
+        if any(p.startswith(GROUP_RAW) for p in self.leaves):
+            self.internal.add(GROUP_TYPE)
+        self.wanted = set()
+        for path in self.leaves | self.rows | self.internal:
+            parts = path.split(".")
+            for i in range(2, len(parts) + 1):
+                self.wanted.add(".".join(parts[:i]))
+        self.values = {}
+        self.raw_decoders = {
+            CHARACTER_RAW: self._character_raw,
+            GROUP_RAW: self._group_raw,
+            ITEM_SLOT_RAW: self._item_slot_raw,
+        }
+
+    def properties(self, r, path: str):
+        while True:
+            name, type_name, size = r.property_tag()
+            if name is None:
+                return
+            child = f"{path}.{name}"
+            if child not in self.wanted:
+                self._skip_property(r, type_name, size)
+                continue
+            yield from self._property(r, type_name, size, child)
+
+    def properties_until_end(self, r: _BytesReader, path: str):
+        """RawData 内のプロパティの並び（末尾の None で終わらない場合もある）"""
+        while not r.at_end():
+            name, type_name, size = r.property_tag()
+            if name is None:
+                return
+            child = f"{path}.{name}"
+            if child not in self.wanted:
+                self._skip_property(r, type_name, size)
+                continue
+            yield from self._property(r, type_name, size, child)
+
+    @staticmethod
+    def _optional_guid(r):
+        if r.u8():
+            r.skip(16)
+
+    def _skip_property(self, r, type_name: str, size: int):
+        if type_name == "StructProperty":
+            r.fstring()
+            r.skip(16)
+            self._optional_guid(r)
+        elif type_name in ("ArrayProperty", "SetProperty", "ByteProperty", "EnumProperty"):
+            r.fstring()
+            self._optional_guid(r)
+        elif type_name == "MapProperty":
+            r.fstring()
+            r.fstring()
+            self._optional_guid(r)
+        elif type_name == "BoolProperty":
+            r.u8()
+            self._optional_guid(r)
+        else:
+            self._optional_guid(r)
+        r.skip(size)
+
+    def _emit(self, path: str, value):
+        if path in self.internal:
+            self.values[path] = value
+        if path in self.leaves:
+            yield VALUE, path, value
+
+    def _property(self, r, type_name: str, size: int, path: str):
+        if type_name == "StructProperty":
+            struct_type = r.fstring()
+            r.skip(16)
+            self._optional_guid(r)
+            yield from self._struct(r, struct_type, path)
+        elif type_name == "ArrayProperty":
+            inner = r.fstring()
+            self._optional_guid(r)
+            yield from self._array(r, inner, size, path)
+        elif type_name == "MapProperty":
+            key_type = r.fstring()
+            value_type = r.fstring()
+            self._optional_guid(r)
+            yield from self._map(r, key_type, value_type, path)
+        elif type_name == "BoolProperty":
+            value = r.u8() != 0
+            self._optional_guid(r)
+            yield from self._emit(path, value)
+        elif type_name == "ByteProperty":
+            enum_type = r.fstring()
+            self._optional_guid(r)
+            value = r.u8() if enum_type == "None" else r.fstring()
+            yield from self._emit(path, value)
+        elif type_name == "EnumProperty":
+            r.fstring()
+            self._optional_guid(r)
+            yield from self._emit(path, r.fstring())
+        elif type_name in _SCALAR_READERS:
+            self._optional_guid(r)
+            yield from self._emit(path, _SCALAR_READERS[type_name](r))
+        else:
+            # SetProperty・TextProperty などは値を取り出さずに読み飛ばす
+            self._optional_guid(r)
+            r.skip(size)
+
+    def _struct(self, r, struct_type: str, path: str):
+        if struct_type == "Guid":
+            yield from self._emit(path, r.guid())
+        elif struct_type in ("DateTime", "Timespan"):
+            yield from self._emit(path, r.i64())
+        elif struct_type in FIXED_STRUCT_SIZES:
+            r.skip(FIXED_STRUCT_SIZES[struct_type])
+        else:
+            yield from self.properties(r, path)
+
+    def _array(self, r, inner: str, size: int, path: str):
+        count = r.i32()
+        if inner == "StructProperty":
+            inner_name = r.fstring()
+            r.fstring()  # StructProperty
+            r.i64()  # 全要素のサイズ
+            struct_type = r.fstring()
+            r.skip(17)  # Guid + optional guid
+            element_path = f"{path}.{inner_name}"
+            is_row = path in self.rows
+            for _ in range(count):
+                if is_row:
+                    yield ROW_START, path, None
+                yield from self._struct(r, struct_type, element_path)
+                if is_row:
+                    yield ROW_END, path, None
+        elif inner == "ByteProperty":
+            decoder = self.raw_decoders.get(path)
+            if decoder is None or size - 4 != count:
+                r.skip(size - 4)
+                return
+            yield from decoder(_BytesReader(r.read(count)), path)
+        else:
+            read = _ELEMENT_READERS.get(inner)
+            if read is None:
+                r.skip(size - 4)
+                return
+            for _ in range(count):
+                yield from self._emit(path, read(r))
+
+    def _map(self, r, key_type: str, value_type: str, path: str):
+        r.i32()  # 削除されたキーの数（常に0）
+        count = r.i32()
+        key_path = path + ".Key"
+        value_path = path + ".Value"
+        key_struct = MAP_TYPE_HINTS.get(key_path, "Guid")
+        value_struct = MAP_TYPE_HINTS.get(value_path, "StructProperty")
+        is_row = path in self.rows
+        for _ in range(count):
+            if is_row:
+                yield ROW_START, path, None
+            yield from self._element(r, key_type, key_struct, key_path)
+            yield from self._element(r, value_type, value_struct, value_path)
+            if is_row:
+                yield ROW_END, path, None
+
+    def _element(self, r, type_name: str, struct_type: str, path: str):
+        if type_name == "StructProperty":
+            yield from self._struct(r, struct_type, path)
+            return
+        read = _ELEMENT_READERS.get(type_name)
+        if read is None:
+            raise SaveFormatError(f"マップの要素の型に対応していません: {type_name} ({path})")
+        yield from self._emit(path, read(r))
+
+    # ---- Palworld 独自の RawData ----
+
+    def _character_raw(self, r: _BytesReader, path: str):
+        yield from self.properties_until_end(r, path)
+        if r.pos + 20 <= len(r.buf):
+            r.skip(4)
+            yield from self._emit(path + ".group_id", r.guid())
+
+    def _group_raw(self, r: _BytesReader, path: str):
+        group_type = self.values.get(GROUP_TYPE, "")
+        yield from self._emit(path + ".group_type", group_type)
+        r.guid()  # group_id
+        yield from self._emit(path + ".group_name", r.fstring())
+        r.skip(r.i32() * 32)  # individual_character_handle_ids（Guid 2つ）
+        if group_type not in ("EPalGroupType::Guild", "EPalGroupType::IndependentGuild", "EPalGroupType::Organization"):
+            return
+        r.u8()  # org_type
+        base_count = r.i32()
+        r.skip(base_count * 16)
+        yield from self._emit(path + ".base_count", base_count)
+        if group_type not in ("EPalGroupType::Guild", "EPalGroupType::IndependentGuild"):
+            return
+        yield from self._emit(path + ".base_camp_level", r.i32())
+        r.skip(r.i32() * 16)  # map_object_instance_ids_base_camp_points
+        yield from self._emit(path + ".guild_name", r.fstring())
+        if group_type != "EPalGroupType::Guild":
+            return
+        r.guid()  # admin_player_uid
+        yield from self._emit(path + ".player_count", r.i32())
+
+    def _item_slot_raw(self, r: _BytesReader, path: str):
+        r.i32()  # slot_index
+        count = r.i32()
+        yield from self._emit(path + ".static_id", r.fstring())
+        yield from self._emit(path + ".count", count)
+
+
+_SCALAR_READERS = {
+    "IntProperty": _Reader.i32,
+    "Int64Property": _Reader.i64,
+    "UInt16Property": _Reader.u16,
+    "Int16Property": _Reader.i16,
+    "UInt32Property": _Reader.u32,
+    "UInt64Property": _Reader.u64,
+    "FloatProperty": _Reader.f32,
+    "DoubleProperty": _Reader.f64,
+    "StrProperty": _Reader.fstring,
+    "NameProperty": _Reader.fstring,
+    "ObjectProperty": _Reader.fstring,
+}
+
+_ELEMENT_READERS = dict(_SCALAR_READERS, **{
+    "BoolProperty": lambda r: r.u8() != 0,
+    "ByteProperty": _Reader.u8,
+    "EnumProperty": _Reader.fstring,
+})
+
+
+class Column:
+    """
+    1列分の値を型付き配列で保持する（文字列は重複を除いた一覧への添字で保持する）
+    値がない行は None として扱う
+    """
+    TYPECODES = {"int": "q", "float": "d", "bool": "b", "str": "i"}
+
+    def __init__(self, kind: str):
+        if kind not in self.TYPECODES:
+            raise ValueError(f"未対応の列の型です: {kind}")
+        self.kind = kind
+        self.values = array(self.TYPECODES[kind])
+        self.present = bytearray()
+        self.strings = []
+        self._string_ids = {}
+
+    def append(self, value):
+        if value is None:
+            self.values.append(0)
+            self.present.append(0)
+            return
+        if self.kind == "str":
+            value = str(value)
+            index = self._string_ids.get(value)
+            if index is None:
+                index = self._string_ids[value] = len(self.strings)
+                self.strings.append(value)
+            self.values.append(index)
+        elif self.kind == "float":
+            self.values.append(float(value))
+        else:
+            self.values.append(int(value))
+        self.present.append(1)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index: int):
+        if not self.present[index]:
+            return None
+        value = self.values[index]
+        if self.kind == "str":
+            return self.strings[value]
+        if self.kind == "bool":
+            return bool(value)
+        return value
+
+    def __iter__(self):
+        for index in range(len(self.values)):
+            yield self[index]
+
+
+class Table:
+    """
+    extract() の結果（列ごとの型付き配列）
+    spec: {"row": 行とするパス, "columns": {列名: (行からの相対パス, 型)}}
+    """
+
+    def __init__(self, spec: dict):
+        self.row = spec["row"]
+        self.columns = {name: Column(kind) for name, (_, kind) in spec["columns"].items()}
+        self.paths = {
+            (f"{self.row}.{rel}" if self.row else rel): name
+            for name, (rel, _) in spec["columns"].items()
+        }
+        # 行の途中の値（全行で使い回す）
+        self._current = {}
+        self._active = False
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name: str) -> Column:
+        return self.columns[name]
+
+    def _start(self):
+        self._current.clear()
+        self._active = True
+
+    def _set(self, name: str, value):
+        if self._active:
+            self._current[name] = value
+
+    def _end(self):
+        for name, column in self.columns.items():
+            column.append(self._current.get(name))
+        self._active = False
+
+
+def extract(path: str, specs: dict) -> dict:
+    """
+    .sav ファイルから、指定したパスの値だけを取り出して表にする
+    :param specs: {表の名前: Table の spec}（row を "" にするとファイル全体を1行とする）
+    :return: {表の名前: Table}
+    """
+    tables = {name: Table(spec) for name, spec in specs.items()}
+    by_row = {}
+    by_path = {}
+    for table in tables.values():
+        by_row.setdefault(table.row, []).append(table)
+        for value_path, column_name in table.paths.items():
+            by_path.setdefault(value_path, []).append((table, column_name))
+    walker = _Walker(by_path, [row for row in by_row if row])
+
+    with open(path, "rb") as f:
+        reader = open_save(f)
+        read_gvas_header(reader)
+        for table in by_row.get("", []):
+            table._start()
+        for kind, event_path, value in walker.properties(reader, ""):
+            if kind == VALUE:
+                for table, column_name in by_path[event_path]:
+                    table._set(column_name, value)
+            elif kind == ROW_START:
+                for table in by_row[event_path]:
+                    table._start()
+            else:
+                for table in by_row[event_path]:
+                    table._end()
+        for table in by_row.get("", []):
+            table._end()
+    return tables
+
+
+# ---- ワールドの統計 ----
+
+LEVEL_SPECS = {
+    "characters": {
+        "row": ".worldSaveData.CharacterSaveParameterMap",
+        "columns": {
+            "is_player": ("Value.RawData.SaveParameter.IsPlayer", "bool"),
+            "character_id": ("Value.RawData.SaveParameter.CharacterID", "str"),
+            "nickname": ("Value.RawData.SaveParameter.NickName", "str"),
+            "level": ("Value.RawData.SaveParameter.Level", "int"),
+        },
+    },
+    "bases": {
+        "row": ".worldSaveData.BaseCampSaveData",
+        "columns": {"id": ("Key", "str")},
+    },
+    "groups": {
+        "row": ".worldSaveData.GroupSaveDataMap",
+        "columns": {
+            "group_type": ("Value.RawData.group_type", "str"),
+            "guild_name": ("Value.RawData.guild_name", "str"),
+            "player_count": ("Value.RawData.player_count", "int"),
+            "base_count": ("Value.RawData.base_count", "int"),
+        },
+    },
+    "item_slots": {
+        "row": ".worldSaveData.ItemContainerSaveData.Value.Slots",
+        "columns": {
+            "static_id": ("Slots.RawData.static_id", "str"),
+            "count": ("Slots.RawData.count", "int"),
+        },
+    },
+}
+
+PLAYER_SPECS = {
+    "player": {
+        "row": "",
+        "columns": {
+            "player_uid": (".SaveData.PlayerUId", "str"),
+            "technology_point": (".SaveData.TechnologyPoint", "int"),
+            "boss_technology_point": (".SaveData.bossTechnologyPoint", "int"),
+        },
+    },
+}
+
+
+def find_world_dir(save_root: str) -> str:
+    """SaveGames 以下で、Level.sav が最も新しく更新されたワールドのディレクトリ"""
+    levels = glob.glob(os.path.join(save_root, "*", "*", "Level.sav"))
+    if not levels:
+        raise FileNotFoundError(f"Level.sav が見つかりません: {save_root}")
+    return os.path.dirname(max(levels, key=os.path.getmtime))
+
+
+def _level_statistics(path: str) -> dict:
+    """プロセスプール用: Level.sav の統計（表ではなく集計結果のみを返す）"""
+    tables = extract(path, LEVEL_SPECS)
+    characters = tables["characters"]
+    pals = Counter()
+    players = []
+    for is_player, character_id, nickname, level in zip(
+        characters["is_player"], characters["character_id"], characters["nickname"], characters["level"]
+    ):
+        if is_player:
+            players.append((nickname or "", level))
+        elif character_id:
+            pals[character_id] += 1
+
+    groups = tables["groups"]
+    guilds = sorted(
+        (
+            (name or "", count or 0, bases or 0)
+            for group_type, name, count, bases in zip(
+                groups["group_type"], groups["guild_name"], groups["player_count"], groups["base_count"]
+            )
+            if group_type == "EPalGroupType::Guild"
+        ),
+        key=lambda g: g[1], reverse=True
+    )
+
+    items = Counter()
+    slots = tables["item_slots"]
+    for static_id, count in zip(slots["static_id"], slots["count"]):
+        if static_id and static_id != "None" and count:
+            items[static_id] += count
+
+    return {
+        "pal_count": sum(pals.values()),
+        "pals": dict(pals),
+        "players": players,
+        "base_count": len(tables["bases"]),
+        "guilds": guilds,
+        "items": dict(items),
+    }
+
+
+def _player_statistics(path: str) -> dict:
+    """プロセスプール用: プレイヤーの .sav の統計"""
+    player = extract(path, PLAYER_SPECS)["player"]
+    return {
+        "player_uid": player["player_uid"][0],
+        "technology_point": player["technology_point"][0],
+        "boss_technology_point": player["boss_technology_point"][0],
+    }
+
+
+def world_statistics(world_dir: str, workers: int = None) -> dict:
+    """
+    ワールドの統計を求める
+    Level.sav と各プレイヤーの .sav を、バックグラウンド用の割り当てを適用したプロセスプールで並列に解析する
+    """
+    player_paths = sorted(glob.glob(os.path.join(world_dir, "Players", "*.sav")))
+    with ProcessPoolExecutor(max_workers=workers, initializer=resource_manager.init_background_worker,
+                             initargs=(resource_manager.worker_settings(),)) as executor:
+        level_future = executor.submit(_level_statistics, os.path.join(world_dir, "Level.sav"))
+        player_futures = {path: executor.submit(_player_statistics, path) for path in player_paths}
+        stats = level_future.result()
+        stats["player_files"] = []
+        stats["player_errors"] = 0
+        for path, future in player_futures.items():
+            try:
+                stats["player_files"].append(future.result())
+            except (SaveFormatError, OSError) as e:
+                logger.warning(f"Failed to decode {path}: {e}")
+                stats["player_errors"] += 1
+    return stats
@@ -1,88 +1,224 @@
 import os
+import time
+import logging
 import subprocess
 import asyncio
 import psutil
 import discord
+from lib.steamcmd_runner import build_update_command, run_steamcmd_async
 
-async def update_server(steamcmd_path: str, install_dir: str, app_id: str) -> discord.Embed:
+logger = logging.getLogger("ServerControl")
+
+# アップデート成功時のEmbedタイトル（成否の判定には update_server の戻り値の ok を使用する）
+UPDATE_SUCCESS_TITLE = "アップデート完了"
+
+# 停止処理を開始した時刻（(プロセス名, インストール先) -> time.monotonic）
+# クラッシュ監視で、意図的な停止とクラッシュを区別するために使用する
+# 同じ実行ファイル名のインスタンスが複数ある場合は、インストール先で区別する（単一インスタンスでは None）
+_intentional_stops = {}
+
+def _stop_key(name: str, install_dir: str = None) -> tuple:
+    return name, os.path.normcase(os.path.abspath(install_dir)) if install_dir else None
+
+def mark_intentional_stop(*names, install_dir: str = None):
+    now = time.monotonic()
+    for name in names:
+        _intentional_stops[_stop_key(name, install_dir)] = now
+
+def last_intentional_stop(name: str, install_dir: str = None) -> float:
+    return _intentional_stops.get(_stop_key(name, install_dir))
+
+async def update_server(steamcmd_path: str, install_dir: str, app_id: str, progress_callback=None, validate: bool = True) -> tuple:
     """
-    サーバーを起動する関数
+    サーバーをアップデートする関数
+    steamcmd の出力は逐次解析し、進捗イベントを progress_callback（async関数）に渡す
+    validate=False の場合はファイル全体の再検証を省略する
+    戻り値は (ok, embed)。成否は ok で判定し、embed は通知用に使う
     """
     try:
         # 必要な設定値を取得
         if not steamcmd_path or not os.path.exists(os.path.join(steamcmd_path, "steamcmd.exe")):
-            return discord.Embed(
+            return False, discord.Embed(
                 title=f"エラー",
                 description=f"コマンドが失敗しました: steamcmdのパスが見つかりません。設定を確認してください。",
                 color=0xff0000
             )
 
-        steamcmd_exe = os.path.join(steamcmd_path, "steamcmd.exe")
-        cmd = f"{steamcmd_exe} +force_install_dir {install_dir} +login anonymous +app_update {app_id} validate +quit"
-        # 非同期に外部コマンドを実行
-        process = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
+        cmd = build_update_command(steamcmd_path, install_dir, app_id, validate)
 
-        if process.returncode == 0:
-            return discord.Embed(
-                title="アップデート完了",
-                description="コマンドが成功しました。",
+        async def on_event(event):
+            if progress_callback is not None and event["type"] in ("progress", "success", "error"):
+                await progress_callback(event)
+
+        # 非同期に外部コマンドを実行（出力はリングバッファにのみ保持）
+        result = await run_steamcmd_async(cmd, on_event)
+
+        if result.returncode == 0:
+            return True, discord.Embed(
+                title=UPDATE_SUCCESS_TITLE,
+                description=f"コマンドが成功しました。（{result.duration:.0f}秒）",
                 color=0x00ff00
             )
-        else:
-            return discord.Embed(
-                title="エラー",
-                description=f"コマンドが失敗しました。\nステータスコード: {process.returncode}",
-                color=0xff0000
-            )
-
-    except Exception as e:
-        if e.returncode == 7:
-            return discord.Embed(
+        elif result.returncode == 7:
+            return False, discord.Embed(
                 title=f"警告",
-                description=f"Error: SteamCMD でエラーが発生しました。ステータスコード 7",
+                description=f"Error: SteamCMD でエラーが発生しました。ステータスコード 7\n```\n{result.tail_text(10)}\n```",
                 color=0xff0000
             )
         else:
-            return discord.Embed(
-                title=f"エラー",
-                description=f"コマンドが失敗しました: ステータスコード {e.returncode}",
+            return False, discord.Embed(
+                title="エラー",
+                description=f"コマンドが失敗しました。\nステータスコード: {result.returncode}\n```\n{result.tail_text(10)}\n```",
                 color=0xff0000
             )
 
-async def start_server(server_path: str, server_exe: str) -> discord.Embed:
+    except Exception as e:
+        return False, discord.Embed(
+            title=f"エラー",
+            description=f"コマンドが失敗しました: {str(e)}",
+            color=0xff0000
+        )
+
+# 起動プロファイルが設定されていない場合の起動オプション
+DEFAULT_LAUNCH_ARGS = ['-NoAsyncLoadingThread', '-UseMultithreadForDS']
+
+async def start_server(server_path: str, server_exe: str, launch_args: list = None) -> tuple:
     """
     サーバーを起動する関数
+    launch_args を省略した場合は DEFAULT_LAUNCH_ARGS で起動する
+    戻り値は (ok, embed)。成否は ok で判定し、embed は通知用に使う
     """
     try:
         # server_pathとserver_exeを結合してサーバーを起動
         server_file = os.path.join(server_path, server_exe)
-        subprocess.run(["start", server_file, '-NoAsyncLoadingThread', '-UseMultithreadForDS'], shell=True)
-        return discord.Embed(
+        args = DEFAULT_LAUNCH_ARGS if launch_args is None else launch_args
+        subprocess.run(["start", server_file, *args], shell=True)
+        return True, discord.Embed(
             title=f"{server_exe}を起動しました",
             color=0x00ff00
         )
     except Exception as e:
-        return discord.Embed(
+        return False, discord.Embed(
             title=f"{server_exe}を起動できませんでした",
             description=f"Error: {str(e)}",
             color=0xff0000
         )
 
-async def stop_server(server_cmd_exe: str, server_exe: str) -> discord.Embed:
+def exe_in_dir(proc, install_dir: str) -> bool:
+    """
+    プロセスの実行ファイルが install_dir 以下にあるか
+    同じ実行ファイル名のサーバーを複数起動している場合に、インスタンスを区別するために使用する
+    """
+    try:
+        exe = proc.exe()
+    except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+        return False
+    if not exe:
+        return False
+    root = os.path.normcase(os.path.abspath(install_dir))
+    return os.path.normcase(os.path.abspath(exe)).startswith(root + os.sep)
+
+def _find_processes(names, install_dir: str = None) -> list:
+    """指定した名前のプロセスを列挙する（install_dir を指定した場合はその配下の実行ファイルのみ）"""
+    processes = []
+    for p in psutil.process_iter(attrs=["name"]):
+        if p.info["name"] in names and (install_dir is None or exe_in_dir(p, install_dir)):
+            processes.append(p)
+    return processes
+
+async def graceful_stop(server_cmd_exe: str, server_exe: str, rest_api_plugin=None,
+                        shutdown_wait: int = 10, exit_timeout: float = 60.0, kill_timeout: float = 15.0,
+                        install_dir: str = None) -> dict:
+    """
+    サーバーを安全に停止する
+    1. REST API でワールドを保存（save）
+    2. REST API で停止を要求（shutdown、shutdown_wait 秒のカウントダウン付き）
+    3. プロセスの終了を待つ（shutdown_wait + exit_timeout 秒まで）
+    4. 終了しない場合、または REST API が使えない場合のみ強制終了する
+    install_dir を指定した場合は、その配下の実行ファイルのプロセスのみを停止する（複数インスタンス時）
+    :return: {"already_stopped", "forced", "remaining", "phases": [(フェーズ名, 秒, 詳細)]}
+    """
+    names = {server_cmd_exe, server_exe}
+    mark_intentional_stop(*names, install_dir=install_dir)
+    processes = await asyncio.to_thread(_find_processes, names, install_dir)
+    phases = []
+    if not processes:
+        return {"already_stopped": True, "forced": False, "remaining": 0, "phases": phases}
+
+    shutdown_requested = False
+    if rest_api_plugin is not None:
+        started = time.monotonic()
+        try:
+            await rest_api_plugin.async_send_command("save", "POST")
+            phases.append(("ワールド保存", time.monotonic() - started, "完了"))
+        except Exception as e:
+            logger.warning(f"Failed to save world before stopping: {e}")
+            phases.append(("ワールド保存", time.monotonic() - started, f"失敗: {e}"))
+
+        started = time.monotonic()
+        try:
+            await rest_api_plugin.async_send_command(
+                "shutdown", "POST",
+                {"waittime": shutdown_wait, "message": f"{shutdown_wait}秒後にサーバーを停止します"}
+            )
+            shutdown_requested = True
+            phases.append(("停止要求", time.monotonic() - started, f"{shutdown_wait}秒後に停止"))
+        except Exception as e:
+            logger.warning(f"Failed to request shutdown: {e}")
+            phases.append(("停止要求", time.monotonic() - started, f"失敗: {e}"))
+
+    alive = processes
+    if shutdown_requested:
+        started = time.monotonic()
+        _, alive = await asyncio.to_thread(psutil.wait_procs, processes, shutdown_wait + exit_timeout)
+        phases.append((
+            "終了待ち", time.monotonic() - started,
+            "終了しました" if not alive else "期限内に終了しませんでした"
+        ))
+
+    forced = bool(alive)
+    if alive:
+        started = time.monotonic()
+        for p in alive:
+            try:
+                p.kill()
+            except psutil.NoSuchProcess:
+                pass
+        _, alive = await asyncio.to_thread(psutil.wait_procs, alive, kill_timeout)
+        phases.append(("強制終了", time.monotonic() - started, "完了" if not alive else f"{len(alive)}プロセスが残っています"))
+
+    for name, seconds, detail in phases:
+        logger.info(f"Stop phase {name}: {seconds:.1f}s ({detail})")
+    return {"already_stopped": False, "forced": forced, "remaining": len(alive), "phases": phases}
+
+async def stop_server(server_cmd_exe: str, server_exe: str, rest_api_plugin=None,
+                      shutdown_wait: int = 10, exit_timeout: float = 60.0, install_dir: str = None) -> discord.Embed:
     """
     サーバーを停止する関数
+    REST API が使える場合は保存・停止要求を行い、プロセスの終了まで待ってから返す
     """
     try:
-        subprocess.run(["taskkill", "/IM", server_cmd_exe, "/F"], shell=True)
-        return discord.Embed(
-            title=f"{server_exe}を停止しました",
+        result = await graceful_stop(
+            server_cmd_exe, server_exe, rest_api_plugin, shutdown_wait, exit_timeout, install_dir=install_dir
+        )
+        if result["already_stopped"]:
+            return discord.Embed(
+                title=f"{server_exe}は起動していません",
+                color=0xff0000
+            )
+        if result["remaining"]:
+            return discord.Embed(
+                title=f"{server_exe}を停止できませんでした",
+                description=f"Error: {result['remaining']}プロセスが終了しませんでした",
+                color=0xff0000
+            )
+        embed = discord.Embed(
+            title=f"{server_exe}を停止しました" + ("（強制終了）" if result["forced"] else ""),
             color=0xff0000
         )
+        for name, seconds, detail in result["phases"]:
+            embed.add_field(name=name, value=f"{seconds:.1f}秒 / {detail}", inline=False)
+        return embed
     except Exception as e:
         return discord.Embed(
             title=f"{server_exe}を停止できませんでした",
@@ -90,10 +226,13 @@ async def stop_server(server_cmd_exe: str, server_exe: str) -> discord.Embed:
             color=0xff0000
         )
 
-async def check_server_status(server_exe: str) -> bool:
+async def check_server_status(server_exe: str, install_dir: str = None) -> bool:
     """
     サーバーの状態を確認する関数
+    install_dir を指定した場合は、その配下の実行ファイルのプロセスのみを対象とする
     """
+    if install_dir is not None:
+        return bool(await asyncio.to_thread(_find_processes, {server_exe}, install_dir))
     return server_exe in (p.name() for p in psutil.process_iter())
 
 async def check_memory_usage() -> discord.Embed:
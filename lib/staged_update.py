@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+from lib.steamcmd_runner import build_update_command, run_steamcmd_async
+
+# 入れ替え対象から除外するパス（ワールドデータ・サーバー設定）
+EXCLUDED_DIRS = (os.path.join("Pal", "Saved"),)
+
+STATE_FILE = ".staged_state.json"
+ROLLBACK_MANIFEST = "rollback.json"
+
+
+def is_excluded(rel_path: str, excluded=EXCLUDED_DIRS) -> bool:
+    rel_path = os.path.normpath(rel_path)
+    return any(rel_path == d or rel_path.startswith(d + os.sep) for d in excluded)
+
+
+def scan_tree(root: str, excluded=EXCLUDED_DIRS) -> dict:
+    """
+    ディレクトリ配下のファイルを (サイズ, 更新時刻ns) で一覧化する
+    """
+    result = {}
+    if not os.path.isdir(root):
+        return result
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(os.path.join(root, rel_dir)) as it:
+            for entry in it:
+                rel = os.path.join(rel_dir, entry.name)
+                if is_excluded(rel, excluded):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(rel)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    result[rel] = (st.st_size, st.st_mtime_ns)
+    return result
+
+
+class StagedUpdater:
+    """
+    サーバー稼働中にステージング用ディレクトリへアップデートをダウンロードし、
+    停止時には変更のあったファイルだけを rename で入れ替える
+
+    - prepare(): steamcmd でステージングを更新し、変更ファイルを install_dir と同じボリュームの
+      incoming ディレクトリへ事前コピーする（サーバー稼働中に実行）
+    - swap(): incoming から install_dir へ rename で入れ替え、置き換えた旧ファイルは rollback に退避
+    - rollback(): 直前の swap を取り消す
+    """
+
+    def __init__(self, steamcmd_path: str, install_dir: str, app_id, staging_dir: str = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.steamcmd_path = steamcmd_path
+        self.install_dir = os.path.normpath(install_dir)
+        self.app_id = app_id
+        self.staging_dir = os.path.normpath(staging_dir) if staging_dir else self.install_dir + "_staging"
+        # incoming/rollback は rename が使えるよう install_dir と同じ親ディレクトリに置く
+        self.incoming_dir = self.install_dir + "_incoming"
+        self.rollback_dir = self.install_dir + "_rollback"
+        self.changes = None
+
+    def _load_state(self) -> dict:
+        path = os.path.join(self.staging_dir, STATE_FILE)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return {k: tuple(v) for k, v in json.load(f).items()}
+        return {}
+
+    def _save_state(self, state: dict):
+        with open(os.path.join(self.staging_dir, STATE_FILE), "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    def compute_changes(self) -> dict:
+        """
+        前回入れ替え時からステージング内で変化したファイルと、削除されたファイルを求める
+        steamcmd が触れていないファイルはサイズ・更新時刻が変わらないため、中身を読まずに判定できる
+        """
+        staged = scan_tree(self.staging_dir)
+        staged.pop(STATE_FILE, None)
+        previous = self._load_state()
+        installed = scan_tree(self.install_dir)
+
+        changed = [rel for rel, stat in staged.items() if previous.get(rel) != stat or rel not in installed]
+        removed = [rel for rel in installed if rel not in staged and rel in previous]
+        return {"changed": changed, "removed": removed, "state": staged}
+
+    async def prepare(self, on_event=None) -> dict:
+        """
+        ステージングを更新し、入れ替えるファイルを incoming に用意する
+        :return: {"changed": 件数, "removed": 件数, "bytes": コピー量, "duration": 秒}
+        """
+        started = time.monotonic()
+        os.makedirs(self.staging_dir, exist_ok=True)
+        cmd = build_update_command(self.steamcmd_path, self.staging_dir, self.app_id)
+        result = await run_steamcmd_async(cmd, on_event)
+        if result.returncode != 0:
+            raise RuntimeError(f"steamcmd failed with status {result.returncode}:\n{result.tail_text(10)}")
+
+        changes = await asyncio.to_thread(self.compute_changes)
+        copied = await asyncio.to_thread(self._copy_incoming, changes["changed"])
+        self.changes = changes
+        summary = {
+            "changed": len(changes["changed"]),
+            "removed": len(changes["removed"]),
+            "bytes": copied,
+            "duration": time.monotonic() - started,
+        }
+        self.logger.info(f"Staged update prepared: {summary}")
+        return summary
+
+    def _copy_incoming(self, changed: list) -> int:
+        if os.path.exists(self.incoming_dir):
+            shutil.rmtree(self.incoming_dir)
+        copied = 0
+        for rel in changed:
+            src = os.path.join(self.staging_dir, rel)
+            dst = os.path.join(self.incoming_dir, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(src, dst)
+            copied += os.path.getsize(dst)
+        return copied
+
+    def swap(self) -> dict:
+        """
+        incoming のファイルを install_dir に rename で入れ替える（サーバー停止中に実行）
+        :return: {"changed": 件数, "removed": 件数, "duration": 秒}
+        """
+        if self.changes is None:
+            raise RuntimeError("prepare() has not been completed")
+
+        started = time.monotonic()
+        if os.path.exists(self.rollback_dir):
+            shutil.rmtree(self.rollback_dir)
+        os.makedirs(self.rollback_dir)
+
+        manifest = {"replaced": [], "added": [], "removed": []}
+        try:
+            for rel in self.changes["changed"]:
+                target = os.path.join(self.install_dir, rel)
+                if os.path.exists(target):
+                    self._move(target, os.path.join(self.rollback_dir, rel))
+                    manifest["replaced"].append(rel)
+                else:
+                    manifest["added"].append(rel)
+                self._move(os.path.join(self.incoming_dir, rel), target)
+            for rel in self.changes["removed"]:
+                self._move(os.path.join(self.install_dir, rel), os.path.join(self.rollback_dir, rel))
+                manifest["removed"].append(rel)
+        finally:
+            # 途中で失敗しても rollback() で戻せるよう、実施済みの操作を必ず記録する
+            with open(os.path.join(self.rollback_dir, ROLLBACK_MANIFEST), "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+        self._save_state(self.changes["state"])
+        shutil.rmtree(self.incoming_dir, ignore_errors=True)
+        self.changes = None
+
+        summary = {
+            "changed": len(manifest["replaced"]) + len(manifest["added"]),
+            "removed": len(manifest["removed"]),
+            "duration": time.monotonic() - started,
+        }
+        self.logger.info(f"Staged update swapped: {summary}")
+        return summary
+
+    def rollback(self) -> int:
+        """
+        直前の swap を取り消し、退避した旧ファイルを元に戻す
+        :return: 戻したファイル数
+        """
+        manifest_path = os.path.join(self.rollback_dir, ROLLBACK_MANIFEST)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError("ロールバック用のデータがありません")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        for rel in manifest["added"]:
+            target = os.path.join(self.install_dir, rel)
+            if os.path.exists(target):
+                os.remove(target)
+        for rel in manifest["replaced"] + manifest["removed"]:
+            self._move(os.path.join(self.rollback_dir, rel), os.path.join(self.install_dir, rel))
+
+        # 次回の差分計算がやり直しになるよう、ステージングの記録を破棄する
+        state_path = os.path.join(self.staging_dir, STATE_FILE)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        shutil.rmtree(self.rollback_dir, ignore_errors=True)
+        restored = len(manifest["replaced"]) + len(manifest["removed"])
+        self.logger.info(f"Staged update rolled back: {restored} files restored")
+        return restored
+
+    @staticmethod
+    def _move(src: str, dst: str):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        os.replace(src, dst)
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import zipfile
+import requests
+
+STEAMCMD_URL = "https://steamcdn-a.akamaihd.net/client/installer/steamcmd.zip"
+
+# 1回の読み込み・書き込みの大きさ
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+
+logger = logging.getLogger("SteamCmdDownload")
+
+
+class DownloadError(Exception):
+    """ダウンロードまたは検証の失敗"""
+
+
+def _load_part_meta(meta_path: str) -> dict:
+    if not os.path.exists(meta_path):
+        return {}
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _hash_existing(path: str, hasher):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(COPY_BUFFER_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+
+
+def download_file(url: str, dest: str, expected_sha256: str = None, on_progress=None,
+                  session: requests.Session = None, chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+                  timeout: float = 30.0, should_cancel=None) -> str:
+    """
+    ファイルをダウンロードする
+    - <dest>.part に書き込み、中断された場合は次回 Range リクエストで続きから再開する
+    - サーバー側のファイルが変わっていれば（If-Range）最初からやり直す
+    - SHA-256 を書き込みと同時に計算し、expected_sha256 が指定されていれば照合する
+    :param on_progress: on_progress(受信済みバイト数, 全体のバイト数 or None)
+    :param should_cancel: True を返すとダウンロードを中断する（.part は残るため再開可能）
+    :return: SHA-256（16進数）
+    """
+    part_path = dest + ".part"
+    meta_path = part_path + ".json"
+    session = session or requests.Session()
+    hasher = hashlib.sha256()
+
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    meta = _load_part_meta(meta_path) if offset else {}
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        validator = meta.get("etag") or meta.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+
+    with session.get(url, stream=True, headers=headers, timeout=timeout) as response:
+        if response.status_code == 416:
+            # 範囲外（.part が壊れているなど）は最初からやり直す
+            logger.warning("Range not satisfiable, restarting download")
+            _remove_part(part_path, meta_path)
+            return download_file(url, dest, expected_sha256, on_progress, session, chunk_size, timeout, should_cancel)
+        response.raise_for_status()
+
+        if response.status_code == 206:
+            logger.info(f"Resuming download from {offset} bytes")
+            _hash_existing(part_path, hasher)
+            mode = "ab"
+        else:
+            offset = 0
+            mode = "wb"
+
+        length = response.headers.get("Content-Length")
+        total = offset + int(length) if length is not None else None
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "total": total,
+            }, f)
+
+        received = offset
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if should_cancel is not None and should_cancel():
+                    raise DownloadError("ダウンロードが中断されました")
+                if not chunk:
+                    continue
+                f.write(chunk)
+                hasher.update(chunk)
+                received += len(chunk)
+                if on_progress is not None:
+                    on_progress(received, total)
+
+    if total is not None and received != total:
+        raise DownloadError(f"ダウンロードが途中で終了しました（{received} / {total} bytes）")
+    digest = hasher.hexdigest()
+    if expected_sha256 and digest.lower() != expected_sha256.lower():
+        # 壊れたファイルから再開しないよう破棄する
+        _remove_part(part_path, meta_path)
+        raise DownloadError(f"SHA-256 が一致しません: {digest}")
+
+    os.replace(part_path, dest)
+    os.remove(meta_path)
+    logger.info(f"Downloaded {url} ({received} bytes, sha256={digest})")
+    return digest
+
+
+def _remove_part(part_path: str, meta_path: str):
+    for path in (part_path, meta_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def extract_zip(zip_path: str, dest_dir: str) -> int:
+    """
+    ZIPをストリーミングで展開する（各エントリの CRC は読み込み時に検証される）
+    展開先ディレクトリの外を指すエントリは拒否する
+    :return: 展開したファイル数
+    """
+    dest_root = os.path.abspath(dest_dir)
+    count = 0
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for info in zf.infolist():
+            target = os.path.abspath(os.path.join(dest_root, info.filename))
+            if os.path.commonpath([dest_root, target]) != dest_root:
+                raise DownloadError(f"不正なパスが含まれています: {info.filename}")
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zf.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            count += 1
+    return count
+
+
+def install_steamcmd(install_dir: str, url: str = STEAMCMD_URL, expected_sha256: str = None,
+                     on_progress=None, session: requests.Session = None, should_cancel=None) -> dict:
+    """
+    steamcmd.zip をダウンロードし install_dir に展開する
+    :return: {"sha256", "files", "duration"}
+    """
+    started = time.monotonic()
+    os.makedirs(install_dir, exist_ok=True)
+    zip_path = os.path.join(install_dir, "steamcmd.zip")
+    digest = download_file(url, zip_path, expected_sha256, on_progress, session, should_cancel=should_cancel)
+    try:
+        files = extract_zip(zip_path, install_dir)
+    except zipfile.BadZipFile as e:
+        raise DownloadError(f"ZIPファイルが壊れています: {e}")
+    finally:
+        os.remove(zip_path)
+    return {"sha256": digest, "files": files, "duration": time.monotonic() - started}
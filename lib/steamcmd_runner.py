@@ -0,0 +1,194 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import subprocess
+from collections import deque
+from lib.resource_manager import place_background
+
+# 例: " Update state (0x61) downloading, progress: 42.13 (1234567 / 2930000000)"
+PROGRESS_RE = re.compile(
+    r"Update state \(0x([0-9a-fA-F]+)\) ([^,]+), progress: ([\d.]+) \((\d+) / (\d+)\)"
+)
+SUCCESS_RE = re.compile(r"Success! App '(\d+)'")
+ERROR_RE = re.compile(r"ERROR! (.+)")
+
+# 出力の保持行数（リングバッファ）
+DEFAULT_TAIL_LINES = 200
+MAX_LINE_BYTES = 64 * 1024
+
+logger = logging.getLogger("SteamCmdRunner")
+
+
+def build_update_command(steamcmd_path: str, install_dir: str, app_id, validate: bool = True) -> list:
+    """
+    app_update を実行する steamcmd のコマンドライン（引数リスト）を作成
+    """
+    steamcmd_exe = os.path.join(steamcmd_path, "steamcmd.exe")
+    args = [steamcmd_exe, "+force_install_dir", install_dir, "+login", "anonymous", "+app_update", str(app_id)]
+    if validate:
+        args.append("validate")
+    args.append("+quit")
+    return args
+
+
+class SteamCmdOutputParser:
+    """
+    steamcmd の出力を逐次受け取り、行単位のイベントに変換する
+    steamcmd は進捗行を \\r で上書きすることがあるため、\\r と \\n の両方を行区切りとして扱う
+    """
+
+    def __init__(self, tail_lines: int = DEFAULT_TAIL_LINES):
+        self.tail = deque(maxlen=tail_lines)
+        self.last_progress = None
+        self.success = False
+        self.errors = []
+        self._pending = b""
+
+    def feed(self, data: bytes) -> list:
+        """受信したバイト列を処理し、イベントのリストを返す"""
+        self._pending += data
+        parts = re.split(rb"[\r\n]", self._pending)
+        self._pending = parts.pop()
+        if len(self._pending) > MAX_LINE_BYTES:
+            # 改行のない長大な出力で保留バッファが膨らまないようにする
+            parts.append(self._pending)
+            self._pending = b""
+        return [event for event in (self._parse_line(p) for p in parts) if event]
+
+    def close(self) -> list:
+        """残りのデータを処理する"""
+        rest, self._pending = self._pending, b""
+        event = self._parse_line(rest)
+        return [event] if event else []
+
+    def _parse_line(self, raw: bytes):
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            return None
+        self.tail.append(line)
+
+        match = PROGRESS_RE.search(line)
+        if match:
+            self.last_progress = {
+                "type": "progress",
+                "state_code": int(match.group(1), 16),
+                "state": match.group(2).strip(),
+                "percent": float(match.group(3)),
+                "current": int(match.group(4)),
+                "total": int(match.group(5)),
+            }
+            return self.last_progress
+        if SUCCESS_RE.search(line):
+            self.success = True
+            return {"type": "success", "text": line}
+        match = ERROR_RE.search(line)
+        if match:
+            self.errors.append(match.group(1))
+            return {"type": "error", "text": line}
+        return {"type": "line", "text": line}
+
+
+class SteamCmdResult:
+    """steamcmd の実行結果"""
+
+    def __init__(self, returncode: int, parser: SteamCmdOutputParser, duration: float):
+        self.returncode = returncode
+        self.success = parser.success
+        self.errors = list(parser.errors)
+        self.tail = list(parser.tail)
+        self.last_progress = parser.last_progress
+        self.duration = duration
+
+    def tail_text(self, lines: int = 15) -> str:
+        return "\n".join(self.tail[-lines:])
+
+
+class ProgressThrottle:
+    """
+    進捗通知の間引き
+    前回の通知から interval 秒経過した場合のみ通知を許可する
+    """
+
+    def __init__(self, interval: float, clock=time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self._last = None
+
+    def ready(self, force: bool = False) -> bool:
+        now = self.clock()
+        if force or self._last is None or now - self._last >= self.interval:
+            self._last = now
+            return True
+        return False
+
+
+async def run_steamcmd_async(args: list, on_event=None, tail_lines: int = DEFAULT_TAIL_LINES,
+                             read_size: int = 4096) -> SteamCmdResult:
+    """
+    steamcmd を非同期に実行し、出力を逐次解析する（出力全体はメモリに保持しない）
+    :param on_event: イベントごとに呼ばれる async 関数
+    """
+    started = time.monotonic()
+    parser = SteamCmdOutputParser(tail_lines)
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT
+    )
+    # サーバーとコアを奪い合わないよう、低優先度・バックグラウンド用コアに割り当てる
+    place_background(process.pid)
+
+    while True:
+        data = await process.stdout.read(read_size)
+        if not data:
+            break
+        for event in parser.feed(data):
+            if on_event is not None:
+                await on_event(event)
+    for event in parser.close():
+        if on_event is not None:
+            await on_event(event)
+
+    returncode = await process.wait()
+    result = SteamCmdResult(returncode, parser, time.monotonic() - started)
+    logger.info(f"steamcmd finished: returncode={returncode}, success={result.success}, {result.duration:.1f}s")
+    return result
+
+
+def run_steamcmd(args: list, on_event=None, tail_lines: int = DEFAULT_TAIL_LINES,
+                 read_size: int = 4096) -> SteamCmdResult:
+    """
+    steamcmd を同期的に実行し、出力を逐次解析する（QThread などワーカースレッドから利用）
+    :param on_event: イベントごとに呼ばれる関数
+    """
+    started = time.monotonic()
+    parser = SteamCmdOutputParser(tail_lines)
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    place_background(process.pid)
+
+    fd = process.stdout.fileno()
+    while True:
+        data = os.read(fd, read_size)
+        if not data:
+            break
+        for event in parser.feed(data):
+            if on_event is not None:
+                on_event(event)
+    for event in parser.close():
+        if on_event is not None:
+            on_event(event)
+
+    process.stdout.close()
+    returncode = process.wait()
+    result = SteamCmdResult(returncode, parser, time.monotonic() - started)
+    logger.info(f"steamcmd finished: returncode={returncode}, success={result.success}, {result.duration:.1f}s")
+    return result
+
+
+def format_progress(event: dict) -> str:
+    """進捗イベントを表示用の文字列に変換"""
+    total_gb = event["total"] / (1024 ** 3)
+    current_gb = event["current"] / (1024 ** 3)
+    return f"{event['state']}: {event['percent']:.1f}% ({current_gb:.2f} / {total_gb:.2f} GB)"
@@ -0,0 +1,149 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from lib.resource_manager import place_background
+
+logger = logging.getLogger("UpdateChecker")
+
+_TOKEN_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|([{}])')
+
+
+def parse_vdf(text: str) -> dict:
+    """
+    Valve KeyValues（.acf / app_info_print の出力）を辞書に変換する簡易パーサー
+    """
+    root = {}
+    stack = [root]
+    key = None
+    for match in _TOKEN_RE.finditer(text):
+        string, brace = match.groups()
+        if brace == "{":
+            child = {}
+            if key is not None:
+                stack[-1][key] = child
+            stack.append(child)
+            key = None
+        elif brace == "}":
+            if len(stack) > 1:
+                stack.pop()
+            key = None
+        elif key is None:
+            key = string
+        else:
+            stack[-1][key] = string
+            key = None
+    return root
+
+
+def read_local_build_id(install_dir: str, app_id) -> str:
+    """
+    steamapps/appmanifest_<app_id>.acf からインストール済みのビルドIDを取得
+    見つからない場合は None を返す
+    """
+    manifest_path = os.path.join(install_dir, "steamapps", f"appmanifest_{app_id}.acf")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8", errors="replace") as f:
+        data = parse_vdf(f.read())
+    return data.get("AppState", {}).get("buildid")
+
+
+def parse_app_info_build_id(output: str, app_id, branch: str = "public") -> str:
+    """
+    steamcmd +app_info_print の出力からブランチのビルドIDを取得
+    """
+    marker = f'"{app_id}"'
+    start = output.find(marker)
+    if start < 0:
+        return None
+    data = parse_vdf(output[start:])
+    info = data.get(str(app_id), {})
+    return info.get("depots", {}).get("branches", {}).get(branch, {}).get("buildid")
+
+
+class SteamCmdAppInfoProvider:
+    """steamcmd +app_info_print でリモートのビルドIDを取得する"""
+
+    def __init__(self, steamcmd_path: str, branch: str = "public", timeout: float = 120.0):
+        self.steamcmd_path = steamcmd_path
+        self.branch = branch
+        self.timeout = timeout
+
+    async def get_remote_build_id(self, app_id) -> str:
+        steamcmd_exe = os.path.join(self.steamcmd_path, "steamcmd.exe")
+        process = await asyncio.create_subprocess_exec(
+            steamcmd_exe, "+login", "anonymous", "+app_info_update", "1", "+app_info_print", str(app_id), "+quit",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+        place_background(process.pid)
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        return parse_app_info_build_id(stdout.decode("utf-8", errors="replace"), app_id, self.branch)
+
+
+class FileAppInfoProvider:
+    """保存済みの app_info_print の出力からビルドIDを取得する（テスト・オフライン用）"""
+
+    def __init__(self, path: str, branch: str = "public"):
+        self.path = path
+        self.branch = branch
+
+    async def get_remote_build_id(self, app_id) -> str:
+        with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+            return parse_app_info_build_id(f.read(), app_id, self.branch)
+
+
+class UpdateChecker:
+    """
+    ローカルとリモートのビルドIDを比較し、アップデートの有無を判定する
+    リモートの確認結果は cache_ttl 秒キャッシュする
+    """
+
+    def __init__(self, install_dir: str, app_id, provider, cache_ttl: float = 600.0, clock=time.monotonic):
+        self.install_dir = install_dir
+        self.app_id = app_id
+        self.provider = provider
+        self.cache_ttl = cache_ttl
+        self.clock = clock
+        self._remote_build_id = None
+        self._checked_at = None
+        self._lock = asyncio.Lock()
+
+    async def get_remote_build_id(self) -> str:
+        async with self._lock:
+            now = self.clock()
+            if self._checked_at is None or now - self._checked_at >= self.cache_ttl:
+                self._remote_build_id = await self.provider.get_remote_build_id(self.app_id)
+                self._checked_at = now
+            return self._remote_build_id
+
+    async def check(self) -> dict:
+        """
+        アップデートの有無を返す
+        update_available: True（あり）/ False（なし）/ None（判定できない）
+        """
+        local = await asyncio.to_thread(read_local_build_id, self.install_dir, self.app_id)
+        try:
+            remote = await self.get_remote_build_id()
+        except Exception as e:
+            logger.warning(f"Failed to get remote build id: {e}")
+            remote = None
+
+        if local is None or remote is None:
+            available = None
+        else:
+            available = local != remote
+        logger.info(f"Update check: local={local}, remote={remote}, update_available={available}")
+        return {"local": local, "remote": remote, "update_available": available}
+
+    def invalidate(self):
+        """アップデート実行後などにキャッシュを破棄する"""
+        self._checked_at = None
+        self._remote_build_id = None
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from lib.staged_update import scan_tree
+from lib.steamcmd_runner import build_update_command, run_steamcmd_async
+
+# 各インスタンスに配布済みのファイル構成を記録するファイル（インスタンスのディレクトリ直下）
+SYNC_STATE_FILE = ".sync_state.json"
+
+logger = logging.getLogger("UpdateOrchestrator")
+
+
+class UpdateOrchestrator:
+    """
+    共有のインストール（canonical）を steamcmd で1回だけ更新し、各インスタンスへ変更ファイルを配布する
+
+    - 配布はサイズ・更新時刻の比較で変更のあったファイルのみ行う
+    - 同じボリューム上ではハードリンク、リンクできない場合はコピーで配布する
+    - 各インスタンスの Pal/Saved（ワールドデータ・設定）は比較・配布の対象外
+    - インスタンスへの配布は workers 個までのスレッドで並列に実行する
+    - 配布先は呼び出し側が停止を確認したインスタンスに限る（実行中のサーバーのファイルは置き換えない）
+
+    ハードリンクで配布したファイルは共有インストールと実体を共有するため、
+    共有インストールの更新は全インスタンスの停止中に行うこと（できない場合は use_hardlinks=False）
+    """
+
+    def __init__(self, steamcmd_path: str, canonical_dir: str, app_id, instance_dirs: list,
+                 workers: int = 4, use_hardlinks: bool = True):
+        self.steamcmd_path = steamcmd_path
+        self.canonical_dir = os.path.normpath(canonical_dir)
+        self.app_id = app_id
+        self.instance_dirs = [os.path.normpath(d) for d in instance_dirs]
+        self.workers = max(1, workers)
+        self.use_hardlinks = use_hardlinks
+
+    async def update_canonical(self, on_event=None, validate: bool = True):
+        """共有インストールを steamcmd で更新する"""
+        os.makedirs(self.canonical_dir, exist_ok=True)
+        cmd = build_update_command(self.steamcmd_path, self.canonical_dir, self.app_id, validate)
+        return await run_steamcmd_async(cmd, on_event)
+
+    def plan(self, instance_dir: str, source: dict = None) -> dict:
+        """
+        インスタンスに配布が必要なファイル（changed）と、削除すべきファイル（removed）を求める
+        removed は前回配布したが共有インストールからなくなったファイルのみ（インスタンス独自のファイルは残す）
+        """
+        source = source if source is not None else scan_tree(self.canonical_dir)
+        installed = scan_tree(instance_dir)
+        installed.pop(SYNC_STATE_FILE, None)
+        previous = _load_sync_state(instance_dir)
+
+        changed = [rel for rel, stat in source.items() if installed.get(rel) != stat]
+        removed = [rel for rel in installed if rel not in source and rel in previous]
+        return {"changed": changed, "removed": removed}
+
+    def sync_instance(self, instance_dir: str, source: dict = None) -> dict:
+        """
+        インスタンス1つに変更ファイルを配布する（インスタンスのサーバーは停止している必要がある）
+        :return: {"instance", "changed", "removed", "linked", "copied", "bytes", "duration"}
+        """
+        started = time.monotonic()
+        source = source if source is not None else scan_tree(self.canonical_dir)
+        plan = self.plan(instance_dir, source)
+        linked = copied = copied_bytes = 0
+
+        for rel in plan["changed"]:
+            src = os.path.join(self.canonical_dir, rel)
+            dst = os.path.join(instance_dir, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            # 一時ファイルに用意してから rename で置き換える（途中で失敗しても壊れたファイルを残さない）
+            tmp = dst + ".sync_tmp"
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            if self.use_hardlinks and _try_link(src, tmp):
+                linked += 1
+            else:
+                shutil.copy2(src, tmp)
+                copied += 1
+                copied_bytes += source[rel][0]
+            os.replace(tmp, dst)
+
+        for rel in plan["removed"]:
+            path = os.path.join(instance_dir, rel)
+            if os.path.exists(path):
+                os.remove(path)
+
+        _save_sync_state(instance_dir, source)
+        report = {
+            "instance": instance_dir,
+            "changed": len(plan["changed"]),
+            "removed": len(plan["removed"]),
+            "linked": linked,
+            "copied": copied,
+            "bytes": copied_bytes,
+            "duration": time.monotonic() - started,
+        }
+        logger.info(f"Synced instance: {report}")
+        return report
+
+    def fan_out(self, instance_dirs: list = None) -> list:
+        """
+        全インスタンスへ並列に配布する
+        失敗したインスタンスは "error" を含むレポートを返し、他のインスタンスの配布は続行する
+        """
+        instance_dirs = instance_dirs if instance_dirs is not None else self.instance_dirs
+        # 共有インストールの走査は1回だけ行い、全インスタンスで使い回す
+        source = scan_tree(self.canonical_dir)
+
+        def run(instance_dir):
+            started = time.monotonic()
+            try:
+                return self.sync_instance(instance_dir, source)
+            except Exception as e:
+                logger.error(f"Failed to sync instance {instance_dir}: {e}")
+                return {"instance": instance_dir, "error": str(e), "duration": time.monotonic() - started}
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(instance_dirs)))) as executor:
+            return list(executor.map(run, instance_dirs))
+
+    async def run(self, on_event=None, validate: bool = True, instance_dirs: list = None) -> dict:
+        """
+        共有インストールを更新し、成功した場合のみ各インスタンスへ配布する
+        :param instance_dirs: 配布先（停止中のインスタンス、None の場合は全インスタンス）
+        :return: {"result": SteamCmdResult, "instances": [配布レポート], "download_duration": 秒}
+        """
+        result = await self.update_canonical(on_event, validate)
+        instances = []
+        if result.returncode == 0:
+            instances = await asyncio.to_thread(self.fan_out, instance_dirs)
+        return {"result": result, "instances": instances, "download_duration": result.duration}
+
+
+def _try_link(src: str, dst: str) -> bool:
+    """ハードリンクを作成する（別ボリュームなどで作成できない場合は False）"""
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        return False
+
+
+def _load_sync_state(instance_dir: str) -> dict:
+    path = os.path.join(instance_dir, SYNC_STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_sync_state(instance_dir: str, source: dict):
+    with open(os.path.join(instance_dir, SYNC_STATE_FILE), "w", encoding="utf-8") as f:
+        json.dump({rel: list(stat) for rel, stat in source.items()}, f)
@@ -0,0 +1,186 @@
+import os
+import glob
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+import psutil
+from lib.server_control import last_intentional_stop
+from lib.readiness import find_process
+
+# サーバーログの既定の場所（インストールディレクトリからの相対パス）
+LOG_SUBDIR = os.path.join("Pal", "Saved", "Logs")
+
+logger = logging.getLogger("Watchdog")
+
+
+def read_log_tail(log_dir: str, lines: int = 30, max_bytes: int = 64 * 1024) -> str:
+    """
+    ディレクトリ内で最も新しいログファイルの末尾を返す（末尾の max_bytes のみ読み込む）
+    """
+    files = glob.glob(os.path.join(log_dir, "*.log"))
+    if not files:
+        return ""
+    latest = max(files, key=os.path.getmtime)
+    with open(latest, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        data = f.read()
+    text = data.decode("utf-8", errors="replace")
+    return "\n".join(text.splitlines()[-lines:])
+
+
+class ServerWatchdog:
+    """
+    サーバープロセスの終了を監視し、クラッシュ時に自動で再起動する
+
+    - 終了の検知はプロセスハンドルの待機（psutil.Process.wait）で行い、ポーリングはしない
+    - 停止処理（server_control.graceful_stop）による終了と、終了コード0の正常終了はクラッシュとみなさない
+    - 再起動までの待機時間はクラッシュが続くたびに倍増する（base_delay ～ max_delay）
+    - window 秒以内に max_crashes 回クラッシュした場合は再起動をあきらめて通知する
+    """
+
+    def __init__(self, server_cmd_exe: str, restart_callback, alert_callback=None, log_dir: str = None,
+                 base_delay: float = 5.0, max_delay: float = 300.0, max_crashes: int = 3, window: float = 600.0,
+                 clock=time.monotonic, install_dir: str = None):
+        """
+        :param restart_callback: async def restart() -> None（サーバーを起動し、準備完了後に arm() を呼ぶ）
+        :param alert_callback: async def alert(report: dict) -> None
+        :param install_dir: 指定した場合、この配下の実行ファイルのプロセスのみを監視する（複数インスタンス時）
+        """
+        self.server_cmd_exe = server_cmd_exe
+        self.install_dir = install_dir
+        self.restart_callback = restart_callback
+        self.alert_callback = alert_callback
+        self.log_dir = log_dir
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_crashes = max_crashes
+        self.window = window
+        self.clock = clock
+
+        self.crashes = deque()
+        self.gave_up = False
+        self._armed_at = None
+        self._pid = None
+        self._task = None
+
+    async def arm(self, missing_is_crash: bool = True) -> bool:
+        """
+        現在のサーバープロセスの監視を開始する（起動処理の完了後に呼び出す）
+        :param missing_is_crash: プロセスが見つからない場合にクラッシュとして扱う（起動直後に落ちた場合）
+        :return: 監視を開始した場合 True
+        """
+        process = await asyncio.to_thread(find_process, self.server_cmd_exe, self.install_dir)
+        if process is None:
+            if missing_is_crash and self._armed_at is not None and not self._stopped_intentionally():
+                await self._on_crash(None, 0.0)
+            return False
+        if self._task is not None and not self._task.done() and self._pid == process.pid:
+            return True
+
+        self._cancel_task()
+        self._pid = process.pid
+        self._armed_at = self.clock()
+        self._task = asyncio.create_task(self._watch(process))
+        logger.info(f"Watching server process (pid {process.pid})")
+        return True
+
+    def reset(self):
+        """クラッシュの記録を消去し、再起動をあきらめた状態を解除する（手動で起動した場合など）"""
+        self.crashes.clear()
+        self.gave_up = False
+
+    def stop(self):
+        self._cancel_task()
+
+    def _cancel_task(self):
+        # 再起動処理は監視タスク内から arm() を呼ぶため、実行中の自分自身はキャンセルしない
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+    def _stopped_intentionally(self) -> bool:
+        stopped_at = last_intentional_stop(self.server_cmd_exe, self.install_dir)
+        return stopped_at is not None and self._armed_at is not None and stopped_at >= self._armed_at
+
+    async def _watch(self, process):
+        exit_code = await self._wait_exit(process)
+        uptime = self.clock() - self._armed_at
+        if self._stopped_intentionally():
+            logger.info(f"Server stopped intentionally (exit code {exit_code})")
+            return
+        if exit_code == 0:
+            logger.info("Server exited normally (exit code 0)")
+            return
+        await self._on_crash(exit_code, uptime)
+
+    @staticmethod
+    async def _wait_exit(process):
+        """
+        プロセスの終了を待つ
+        待機は専用のデーモンスレッドで行い、Bot 終了時にスレッドの終了待ちで止まらないようにする
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wait():
+            try:
+                code = process.wait()
+            except psutil.NoSuchProcess:
+                code = None
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(code))
+
+        threading.Thread(target=wait, name="watchdog-wait", daemon=True).start()
+        return await future
+
+    async def _on_crash(self, exit_code, uptime: float):
+        now = self.clock()
+        self.crashes.append(now)
+        while self.crashes and now - self.crashes[0] > self.window:
+            self.crashes.popleft()
+
+        crash_count = len(self.crashes)
+        self.gave_up = crash_count >= self.max_crashes
+        delay = None if self.gave_up else min(self.max_delay, self.base_delay * (2 ** (crash_count - 1)))
+        report = {
+            "exit_code": exit_code,
+            "uptime": uptime,
+            "crash_count": crash_count,
+            "window": self.window,
+            "gave_up": self.gave_up,
+            "next_delay": delay,
+            "log_tail": await asyncio.to_thread(self._log_tail),
+        }
+        logger.warning(f"Server crashed: exit_code={exit_code}, crashes={crash_count}, next_delay={delay}")
+        await self._alert(report)
+        if self.gave_up:
+            return
+
+        await asyncio.sleep(delay)
+        if self._stopped_intentionally():
+            # 待機中に手動で停止・起動された場合は再起動しない
+            return
+        try:
+            await self.restart_callback()
+        except Exception as e:
+            logger.error(f"Watchdog restart failed: {e}")
+
+    def _log_tail(self) -> str:
+        if not self.log_dir:
+            return ""
+        try:
+            return read_log_tail(self.log_dir)
+        except OSError as e:
+            logger.warning(f"Failed to read server log: {e}")
+            return ""
+
+    async def _alert(self, report: dict):
+        if self.alert_callback is None:
+            return
+        try:
+            await self.alert_callback(report)
+        except Exception as e:
+            logger.error(f"Watchdog alert failed: {e}")
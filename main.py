@@ -1,23 +1,25 @@
 import traceback
 import os
 import sys
+import multiprocessing
 import logging
 import psutil
 import json
 from PySide6.QtWidgets import (
     QApplication, QVBoxLayout, QPushButton, 
     QWidget, QMessageBox, QFileDialog, QMainWindow,
-    QToolButton, QLineEdit, QHBoxLayout, QLabel, QComboBox
+    QToolButton, QLineEdit, QHBoxLayout, QLabel, QComboBox, QDialog
 )
 from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QIcon
 import qtawesome as qta
-import requests
-import zipfile
 import asyncio
 from lib.server_control import start_server, stop_server, check_server_status, check_memory_usage
 from lib.appconfig import AppConfig
 from lib.config import Config
+from lib.steamcmd_download import STEAMCMD_URL
+from lib.launch_profiles import get_profile
+from lib.instances import ServerInstance, load_instances
 from discord_bot import DiscordBot
 from plugin_manager import PluginManager
 
@@ -61,9 +63,19 @@ class SettingsApp(QMainWindow):
         self.server_cmd_exe = AppConfig.get("server_cmd_exe")       # EXEファイル名
         self.server_name = self.server_exe.split(".")[0]            # サーバー名（EXEファイル名から拡張子を除いたもの）
         self.discord_bot_thread  = None
+        self.stop_server_thread = None
         self.internal_config_path = Config.get_config_path()
         self.config = self.load_config()
 
+        # 管理するサーバー（app.json のサーバーと、設定 instances の追加のインスタンス）
+        self.instances = load_instances(
+            ServerInstance(
+                self.config.get("instance_name", "default"), self.server_path, self.server_exe, self.server_cmd_exe,
+                AppConfig.get("app_id", "")
+            ),
+            self.config
+        )
+
         # steamcmd の設定を確認
         self.logger.info("checking and setting up steamcmd...")
         self.check_and_setup_steamcmd()
@@ -166,6 +178,12 @@ class SettingsApp(QMainWindow):
         start_bot_button.clicked.connect(self.on_start_discord_bot)
         layout.addWidget(start_bot_button)
 
+        # 操作対象のインスタンス（複数のインスタンスを設定している場合のみ表示）
+        self.instance_combo = QComboBox()
+        self.instance_combo.addItems(list(self.instances))
+        self.instance_combo.setVisible(len(self.instances) > 1)
+        layout.addWidget(self.instance_combo)
+
         # サーバー起動ボタンを追加
         start_server_button = QPushButton("サーバーを起動")
         start_server_button.clicked.connect(self.on_start_server_clicked)
@@ -201,8 +219,7 @@ class SettingsApp(QMainWindow):
             )
 
             if reply == QMessageBox.Yes:
-                self.download_and_install_steamcmd()
-                steamcmd_path = "C:\\steamcmd"
+                steamcmd_path = "C:\\steamcmd" if self.download_and_install_steamcmd() else None
             else:
                 steamcmd_path = self.ask_user_for_steamcmd_path()
 
@@ -211,30 +228,19 @@ class SettingsApp(QMainWindow):
             else:
                 QMessageBox.warning(None, "警告", "SteamCMD の設定が完了していません。")
 
-    def download_and_install_steamcmd(self):
-        """SteamCMD をダウンロードして C:\\steamcmd にインストール"""
-        url = "https://steamcdn-a.akamaihd.net/client/installer/steamcmd.zip"
+    def download_and_install_steamcmd(self) -> bool:
+        """SteamCMD をダウンロードして C:\\steamcmd にインストール（成功した場合 True）"""
+        from steamcmd_installer import SteamCmdInstallDialog
         install_dir = "C:\\steamcmd"
 
-        try:
-            response = requests.get(url, stream=True)
-            zip_path = os.path.join(install_dir, "steamcmd.zip")
-            os.makedirs(install_dir, exist_ok=True)
-
-            with open(zip_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=1024):
-                    if chunk:
-                        f.write(chunk)
-
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(install_dir)
-
-            os.remove(zip_path)
-            QMessageBox.information(None, "成功", "SteamCMD をインストールしました！")
-
-        except Exception as e:
-            QMessageBox.critical(None, "エラー", f"SteamCMD のインストールに失敗しました: {str(e)}")
-            self.logger.error(f"Failed to download and install SteamCMD: {e}")
+        # ダウンロードはバックグラウンドで行い、完了までダイアログで進捗を表示する
+        dialog = SteamCmdInstallDialog(
+            install_dir,
+            url=self.config.get("steamcmd_url", STEAMCMD_URL),
+            expected_sha256=self.config.get("steamcmd_sha256") or None,
+            parent=self
+        )
+        return dialog.exec() == QDialog.Accepted
 
     def ask_user_for_steamcmd_path(self):
         """ユーザーに SteamCMD のパスを選択させる"""
@@ -394,27 +400,37 @@ class SettingsApp(QMainWindow):
             # 設定画面を開く
             self.open_settings_window()
 
+        instance = self.selected_instance()
         try:
             # サーバーが既に起動しているか確認
-            if asyncio.run(check_server_status(self.server_exe)):
-                QMessageBox.warning(self, "サーバー重複起動", f"{self.server_exe} は既に起動しています。")
-                self.logger.warning(f"{self.server_exe} is already running.")
+            if asyncio.run(check_server_status(instance.server_exe, self.process_filter(instance))):
+                QMessageBox.warning(self, "サーバー重複起動", f"{instance.name}（{instance.server_exe}）は既に起動しています。")
+                self.logger.warning(f"{instance.name} ({instance.server_exe}) is already running.")
                 return
 
             # 非同期関数を同期的に実行
-            asyncio.run(self.start_server_async())
+            asyncio.run(self.start_server_async(instance))
         except Exception as e:
             QMessageBox.critical(self, "エラー", f"サーバー起動中にエラーが発生しました: {e}")
 
-    async def start_server_async(self):
+    async def start_server_async(self, instance: ServerInstance):
         """サーバー起動処理"""
-        result = await start_server(self.server_path, self.server_exe)
-        if result:
-            QMessageBox.information(self, "サーバー起動", result.title)
-            self.logger.info(f"Server started successfully: {self.server_exe}")
+        launch_args = instance.launch_args if instance.launch_args is not None else get_profile(Config.load_config())["args"]
+        ok, embed = await start_server(instance.server_path, instance.server_exe, launch_args)
+        if ok:
+            QMessageBox.information(self, "サーバー起動", embed.title)
+            self.logger.info(f"Server started successfully: {instance.name} ({instance.server_exe})")
         else:
-            QMessageBox.warning(self, "サーバー起動失敗", f"{self.server_exe} を起動できませんでした。")
-            self.logger.warning(f"Failed to start server: {self.server_exe}")
+            QMessageBox.warning(self, "サーバー起動失敗", f"{instance.name}（{instance.server_exe}）を起動できませんでした。")
+            self.logger.warning(f"Failed to start server: {instance.name} ({instance.server_exe})")
+
+    def selected_instance(self) -> ServerInstance:
+        """操作対象として選択されているインスタンス"""
+        return self.instances.get(self.instance_combo.currentText()) or next(iter(self.instances.values()))
+
+    def process_filter(self, instance: ServerInstance) -> str:
+        """同じ実行ファイル名のインスタンスが複数ある場合のみ、インストール先でプロセスを区別する"""
+        return instance.server_path if len(self.instances) > 1 else None
 
     def on_stop_server_clicked(self):
         """サーバー起動ボタンがクリックされたときの処理"""
@@ -426,16 +442,57 @@ class SettingsApp(QMainWindow):
             QMessageBox.warning(self, "エラー", "Discord Bot は既に起動しています。")
             return
         
-        try:
-            # 非同期関数を同期的に実行
-            asyncio.run(self.stop_server_async())
-        except Exception as e:
-            QMessageBox.critical(self, "エラー", f"サーバー起動中にエラーが発生しました: {e}")
+        if self.stop_server_thread is not None and self.stop_server_thread.isRunning():
+            QMessageBox.warning(self, "エラー", "サーバーを停止しています。完了までお待ちください。")
+            return
+
+        # 保存と終了待ちに時間がかかるため、バックグラウンドで実行する
+        # REST APIプラグインが有効な場合は、ワールドを保存してから停止する
+        instance = self.selected_instance()
+        # プラグインは表示名で登録され、モジュールもファイルから読み込まれるため、クラス名で探す
+        rest_api_plugin = next(
+            (p for p in self.plugin_manager.get_enabled_plugins().values() if type(p).__name__ == "RestAPIPlugin"), None
+        )
+        if rest_api_plugin is not None and instance is not next(iter(self.instances.values())):
+            # 追加のインスタンスは、そのインスタンスの接続設定で REST API を使う
+            rest_api_plugin = type(rest_api_plugin)(instance.rest_api, instance.server_cmd_exe) if instance.rest_api else None
+        self.stop_server_thread = ServerStopThread(
+            instance.server_cmd_exe, instance.server_exe, rest_api_plugin, install_dir=self.process_filter(instance)
+        )
+        self.stop_server_thread.finished_signal.connect(self.on_stop_server_finished)
+        self.stop_server_thread.start()
+
+    def on_stop_server_finished(self, title, error):
+        """サーバー停止処理の完了時"""
+        if error:
+            QMessageBox.critical(self, "エラー", f"サーバー停止中にエラーが発生しました: {error}")
+        else:
+            QMessageBox.information(self, "サーバー停止", title)
+
+class ServerStopThread(QThread):
+    """サーバーの停止（保存・停止要求・終了待ち）をバックグラウンドで実行するスレッド"""
+    finished_signal = Signal(str, str)  # 結果のタイトル, エラーメッセージ
+
+    def __init__(self, server_cmd_exe, server_exe, rest_api_plugin=None, parent=None, install_dir=None):
+        super().__init__(parent)
+        self.server_cmd_exe = server_cmd_exe
+        self.server_exe = server_exe
+        self.rest_api_plugin = rest_api_plugin
+        self.install_dir = install_dir
 
     async def stop_server_async(self):
-        """サーバー起動処理"""
-        result = await stop_server(self.server_cmd_exe, self.server_exe)
-        QMessageBox.information(self, "サーバー起動", result.title)
+        try:
+            return await stop_server(self.server_cmd_exe, self.server_exe, self.rest_api_plugin, install_dir=self.install_dir)
+        finally:
+            if self.rest_api_plugin is not None:
+                await self.rest_api_plugin.aclose()
+
+    def run(self):
+        try:
+            result = asyncio.run(self.stop_server_async())
+            self.finished_signal.emit(result.title, "")
+        except Exception as e:
+            self.finished_signal.emit("", str(e))
 
 class DiscordBotThread(QThread):
     error_signal = Signal(str)
@@ -453,6 +510,8 @@ class DiscordBotThread(QThread):
             self.error_signal.emit(error_message)
 
 if __name__ == "__main__":
+    # PyInstallerでビルドした場合にプロセスプール（整合性検証など）を使用するため
+    multiprocessing.freeze_support()
     try:
         app = QApplication(sys.argv)
         window = SettingsApp()
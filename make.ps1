@@ -20,6 +20,7 @@ $pyInstallerCommand = @(
     "--noconfirm",
     "--hidden-import=PySide6.QtGui",
     "--hidden-import=PySide6.QtWidgets",
+    "--hidden-import=lib.rest_cache",
     "--icon=images/256.ico",
     "--add-data 'conf/app.json;conf'",
     "--add-data 'conf/setting_key_map.json;conf'",
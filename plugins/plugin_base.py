@@ -57,6 +57,13 @@ class PluginBase:
         """
         raise NotImplementedError("execute() must be implemented by plugin")
 
+    def on_log_event(self, event):
+        """
+        サーバーログのイベント（join / leave / chat / error / crash）を受け取る（必要に応じてオーバーライド）
+        event: {"kind": 種類, "line": ログの行, "time": 検知時刻, "player" / "message" など}
+        """
+        pass
+
     def create_window(self):
             """
             プラグインの画面を作成して返す（必要に応じてオーバーライド）
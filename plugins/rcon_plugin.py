@@ -1,6 +1,8 @@
 from PySide6.QtWidgets import QVBoxLayout, QLabel, QPushButton, QLineEdit, QDialog, QComboBox, QMessageBox
 from PySide6.QtCore import Qt
 from plugins.plugin_base import PluginBase, PluginSettingsWindow
+from lib.circuit_breaker import get_breaker, local_process_check
+from lib.appconfig import AppConfig
 
 import socket
 import struct
@@ -9,8 +11,14 @@ import logging
 class RCONPlugin(PluginBase):
     display_name = "RCON Command送信"  # プラグインの表示名を定義
 
-    def __init__(self):
+    def __init__(self, overrides: dict = None, server_cmd_exe: str = None):
+        """
+        :param overrides: インスタンスごとの接続設定（設定ファイルより優先し、設定ファイルには保存しない）
+        :param server_cmd_exe: 停止中の判定に使用するサーバープロセス名（省略時は app.json の server_cmd_exe）
+        """
         super().__init__()
+        if overrides:
+            self.config = {**self.config, **overrides}
         self.client = None
         self.window = None
 
@@ -19,6 +27,12 @@ class RCONPlugin(PluginBase):
         self.port = self.config.get("port", 25575)
         self.password = self.config.get("password", "")
 
+        # サーバー停止中は接続を試みずに即座に失敗させる（REST APIと同じサーバープロセスを監視）
+        self.breaker = get_breaker(
+            f"RCON {self.host}:{self.port}",
+            process_check=local_process_check(self.host, server_cmd_exe or AppConfig.get("server_cmd_exe"))
+        )
+
     def initialize(self, main_app):
         """プラグインをアプリケーションに登録"""
         self.main_app = main_app
@@ -44,11 +58,20 @@ class RCONPlugin(PluginBase):
 
     def connect(self):
         """RCONサーバーに接続"""
+        self.breaker.before_call()
         try:
             self.client = RCONClient(self.host, self.port, self.password)
             self.client.connect()
+        except ConnectionError as e:
+            self.client = None
+            self.breaker.record_failure(str(e))
+            raise ConnectionError(f"RCONの接続または認証に失敗しました: {e}")
+        self.breaker.record_success()
+
+        try:
             self.client.authenticate()
         except Exception as e:
+            self.close()
             raise ConnectionError(f"RCONの接続または認証に失敗しました: {e}")
 
     def send_command(self, command: str, additional_args: str = "") -> str:
@@ -57,7 +80,13 @@ class RCONPlugin(PluginBase):
             self.connect()
 
         full_command = f"{command} {additional_args}".strip()
-        return self.client.send_command(full_command)
+        try:
+            return self.client.send_command(full_command)
+        except (ConnectionError, OSError) as e:
+            # 接続が切れた場合は次回の呼び出しで再接続する
+            self.close()
+            self.breaker.record_failure(str(e))
+            raise ConnectionError(f"RCONコマンドの送信に失敗しました: {e}")
 
     def close(self):
         """RCON接続を閉じる"""
@@ -121,23 +150,31 @@ class RCONClient:
         self.password = password
         self.socket = None
         self.request_id = 1
+        self.connect_timeout = 5.0
 
         # RCON専用のロガーを設定
         self.logger = logging.getLogger("RCON")
-        rcon_log_handler = logging.FileHandler("rcon.log")  # RCON専用のログファイル
-        rcon_log_handler.setLevel(logging.DEBUG)
-        rcon_log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-        self.logger.addHandler(rcon_log_handler)
-        self.logger.setLevel(logging.DEBUG)
+        if not self.logger.handlers:
+            # 再接続のたびにハンドラーが重複しないよう、初回のみ追加する
+            rcon_log_handler = logging.FileHandler("rcon.log")  # RCON専用のログファイル
+            rcon_log_handler.setLevel(logging.DEBUG)
+            rcon_log_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+            self.logger.addHandler(rcon_log_handler)
+            self.logger.setLevel(logging.DEBUG)
 
     def connect(self):
         """サーバーに接続"""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.settimeout(self.connect_timeout)
             self.socket.connect((self.host, self.port))
+            self.socket.settimeout(None)
             self.logger.info("Connected to RCON server at %s:%d", self.host, self.port)
         except Exception as e:
-            self.logger.error("Failed to connect to RCON server: %s", e)
+            self.logger.warning("Failed to connect to RCON server: %s", e)
+            if self.socket:
+                self.socket.close()
+                self.socket = None
             raise ConnectionError(f"RCONサーバーへの接続に失敗しました: {e}")
 
     def authenticate(self):
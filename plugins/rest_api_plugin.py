@@ -1,16 +1,39 @@
 from PySide6.QtWidgets import QVBoxLayout, QLabel, QPushButton, QLineEdit, QDialog, QComboBox, QTextEdit, QMessageBox
 from PySide6.QtCore import Qt
 from plugins.plugin_base import PluginBase, PluginSettingsWindow
+from lib.rest_cache import RestResponseCache
+from lib.circuit_breaker import get_breaker, local_process_check
+from lib.appconfig import AppConfig
 import requests
+import aiohttp
+import asyncio
 import json
 import base64
 import logging
 
+# エンドポイントごとのタイムアウト（秒）。未定義のエンドポイントは設定値 timeout を使用
+DEFAULT_TIMEOUT = 5.0
+ENDPOINT_TIMEOUTS = {
+    "info": 3.0,
+    "players": 5.0,
+    "settings": 5.0,
+    "metrics": 3.0,
+    "announce": 5.0,
+    "save": 60.0,
+    "shutdown": 10.0,
+}
+
 class RestAPIPlugin(PluginBase):
     display_name = "REST API送信"
 
-    def __init__(self):
+    def __init__(self, overrides: dict = None, server_cmd_exe: str = None):
+        """
+        :param overrides: インスタンスごとの接続設定（設定ファイルより優先し、設定ファイルには保存しない）
+        :param server_cmd_exe: 停止中の判定に使用するサーバープロセス名（省略時は app.json の server_cmd_exe）
+        """
         super().__init__()
+        if overrides:
+            self.config = {**self.config, **overrides}
         self.base_url = None
         self.window = None
 
@@ -20,6 +43,24 @@ class RestAPIPlugin(PluginBase):
         self.admin_password = self.config.get("admin_password", None)
         self.base_url = f"http://{self.host}:{self.port}/v1/api/"
 
+        # 認証ヘッダーは一度だけ計算し、keep-aliveセッションに設定して使い回す
+        self.headers = self._build_headers()
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+
+        # 非同期クライアント（Discord Bot用）はイベントループ上で遅延生成する
+        self.async_session = None
+        self._async_session_loop = None
+
+        # 読み取り専用エンドポイント（info/players/settings/metrics）のレスポンスキャッシュ
+        self.cache = RestResponseCache()
+
+        # サーバー停止中は接続を試みずに即座に失敗させる（RCONと同じサーバープロセスを監視）
+        self.breaker = get_breaker(
+            f"REST {self.host}:{self.port}",
+            process_check=local_process_check(self.host, server_cmd_exe or AppConfig.get("server_cmd_exe"))
+        )
+
     def initialize(self, main_app):
         self.main_app = main_app
 
@@ -35,50 +76,182 @@ class RestAPIPlugin(PluginBase):
         return {
             "host": "127.0.0.1",
             "port": 8212,
-            "admin_password": None
+            "admin_password": None,
+            "timeout": DEFAULT_TIMEOUT
         }
 
+    def _build_headers(self) -> dict:
+        """
+        全リクエスト共通のヘッダーを生成（Basic認証ヘッダーはここで一度だけ計算する）
+        """
+        headers = {
+            'Accept': 'application/json'
+        }
+        if self.admin_password:
+            auth_string = f"admin:{self.admin_password}"
+            auth_encoded = base64.b64encode(auth_string.encode('utf-8')).decode('utf-8')
+            headers['Authorization'] = f"Basic {auth_encoded}"
+        return headers
+
+    def get_timeout(self, endpoint: str) -> float:
+        """
+        エンドポイントごとのタイムアウト（秒）を取得
+        """
+        if endpoint in ENDPOINT_TIMEOUTS:
+            return ENDPOINT_TIMEOUTS[endpoint]
+        try:
+            return float(self.config.get("timeout", DEFAULT_TIMEOUT))
+        except (TypeError, ValueError):
+            return DEFAULT_TIMEOUT
+
+    def _parse_response(self, text: str) -> dict:
+        """
+        レスポンス本文を解析して辞書で返す（同期・非同期共通）
+        """
+        # レスポンスが空かどうかをチェック
+        body = text.strip()
+        if not body:
+            return {"message": "空のレスポンスが返されました"}
+
+        # responseがOKだけの場合、メッセージのみ返す
+        self.logger.debug(f"レスポンス: {body}")
+        if body == "OK":
+            return {"message": "OK"}
+
+        # JSON形式かどうかを判定
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError:
+            self.logger.error(f"レスポンスがJSON形式ではありません: {text}")
+            return {"message": "レスポンスがJSON形式ではありません", "raw_response": text}
+
     def send_command(self, endpoint: str, method: str, params: dict = None) -> dict:
+        """
+        REST APIを同期で呼び出す（GUIなどから利用）
+        keep-aliveのセッションを使い回すため、TCP接続は再利用される
+        """
+        if method not in ("GET", "POST"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        self.breaker.before_call()
+
         try:
             url = f"{self.base_url}{endpoint}"
-            headers = {
-                'Accept': 'application/json'
-            }
+            timeout = self.get_timeout(endpoint)
 
-            if self.admin_password:
-                auth_string = f"admin:{self.admin_password}"
-                auth_encoded = base64.b64encode(auth_string.encode('utf-8')).decode('utf-8')
-                headers['Authorization'] = f"Basic {auth_encoded}"
-
-            self.logger.info(f"Sending REST API request to {url} with method {method} and params {params} and headers {headers}")
+            self.logger.info(f"Sending REST API request to {url} with method {method} and params {params}")
             if method == "GET":
-                response = requests.get(url, headers=headers, params=params)
-            elif method == "POST":
-                response = requests.post(url, headers=headers, json=params or {})
+                response = self.session.get(url, params=params, timeout=timeout)
             else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+                response = self.session.post(url, json=params or {}, timeout=timeout)
+        except requests.exceptions.ConnectionError as e:
+            # 接続できない場合はサーバー停止とみなし、スタックトレースは出力しない
+            self.breaker.record_failure(str(e))
+            self.logger.warning(f"REST APIに接続できません: {e}")
+            raise ConnectionError(f"APIリクエストエラー: {e}")
+        except requests.exceptions.Timeout as e:
+            self.breaker.record_failure("timeout")
+            self.logger.warning(f"REST APIがタイムアウトしました: {url}")
+            raise ConnectionError(f"APIリクエストエラー: タイムアウト ({url})") from e
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"REST APIリクエストエラー: {str(e)}", exc_info=True)
+            raise ConnectionError(f"APIリクエストエラー: {e}")
 
+        # HTTPレベルの応答があればサーバーは稼働している
+        self.breaker.record_success()
+        try:
             response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"REST APIリクエストエラー: {str(e)}")
+            raise ConnectionError(f"APIリクエストエラー: {e}")
+        return self._parse_response(response.text)
 
-            # レスポンスが空かどうかをチェック
-            if not response.text.strip():
-                return {"message": "空のレスポンスが返されました"}
-
-            # JSON形式かどうかを判定
-            try:
-                # responseがOKだけの場合、メッセージのみ返す
-                self.logger.info(f"レスポンス: {response.text.strip()}", exc_info=True)
-                if response.text.strip() == "OK":
-                    return {"message": "OK"}
-                return response.json()
-            except json.JSONDecodeError:
-                self.logger.error(f"レスポンスがJSON形式ではありません: {response.text}", exc_info=True)
-                return {"message": "レスポンスがJSON形式ではありません", "raw_response": response.text}
+    async def async_send_command(self, endpoint: str, method: str, params: dict = None) -> dict:
+        """
+        REST APIを非同期で呼び出す（Discord Botのコルーチンから利用）
+        イベントループをブロックしないため、コルーチン内ではこちらを使用する
+        """
+        if method not in ("GET", "POST"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        self.breaker.before_call()
 
-        except requests.exceptions.RequestException as e:
+        try:
+            url = f"{self.base_url}{endpoint}"
+            timeout = aiohttp.ClientTimeout(total=self.get_timeout(endpoint))
+            session = self._get_async_session()
+
+            self.logger.info(f"Sending async REST API request to {url} with method {method} and params {params}")
+            if method == "GET":
+                request = session.get(url, params=params or None, timeout=timeout)
+            else:
+                request = session.post(url, json=params or {}, timeout=timeout)
+
+            async with request as response:
+                text = await response.text()
+                response.raise_for_status()
+        except aiohttp.ClientConnectionError as e:
+            # 接続できない場合はサーバー停止とみなし、スタックトレースは出力しない
+            self.breaker.record_failure(str(e) or e.__class__.__name__)
+            self.logger.warning(f"REST APIに接続できません: {e!r}")
+            raise ConnectionError(f"APIリクエストエラー: {e}")
+        except asyncio.TimeoutError as e:
+            # 結果を報告しないと、試行中（half_open）のまま probe_timeout の間すべての呼び出しが失敗する
+            self.breaker.record_failure("timeout")
+            self.logger.warning(f"REST APIがタイムアウトしました: {url}")
+            raise ConnectionError(f"APIリクエストエラー: タイムアウト ({url})") from e
+        except aiohttp.ClientResponseError as e:
+            self.breaker.record_success()
+            self.logger.error(f"REST APIリクエストエラー: {str(e)}")
+            raise ConnectionError(f"APIリクエストエラー: {e}")
+        except aiohttp.ClientError as e:
             self.logger.error(f"REST APIリクエストエラー: {str(e)}", exc_info=True)
             raise ConnectionError(f"APIリクエストエラー: {e}")
 
+        self.breaker.record_success()
+        return self._parse_response(text)
+
+    def get_cached(self, endpoint: str, params: dict = None) -> dict:
+        """
+        読み取り専用エンドポイントをキャッシュ経由で取得（同期版）
+        同時に同じリクエストが来た場合はHTTP呼び出しを1回にまとめる
+        """
+        if not self.cache.is_cacheable(endpoint):
+            return self.send_command(endpoint, "GET", params)
+        return self.cache.get(endpoint, lambda: self.send_command(endpoint, "GET", params), params)
+
+    async def async_get_cached(self, endpoint: str, params: dict = None) -> dict:
+        """
+        読み取り専用エンドポイントをキャッシュ経由で取得（非同期版）
+        """
+        if not self.cache.is_cacheable(endpoint):
+            return await self.async_send_command(endpoint, "GET", params)
+        return await self.cache.aget(endpoint, lambda: self.async_send_command(endpoint, "GET", params), params)
+
+    def _get_async_session(self):
+        """
+        非同期用のセッションを取得（イベントループごとに1つ生成して使い回す）
+        """
+        loop = asyncio.get_running_loop()
+        if self.async_session is None or self.async_session.closed or self._async_session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit_per_host=4, keepalive_timeout=30)
+            self.async_session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+            self._async_session_loop = loop
+        return self.async_session
+
+    async def aclose(self):
+        """
+        非同期セッションを閉じる
+        """
+        if self.async_session is not None and not self.async_session.closed:
+            await self.async_session.close()
+        self.async_session = None
+        self._async_session_loop = None
+
+    def close(self):
+        """
+        同期セッションを閉じる
+        """
+        self.session.close()
+
 class RestAPIWindow(QDialog):
     def __init__(self, plugin, parent=None):
         super().__init__(parent)
@@ -157,7 +330,10 @@ class RestAPIWindow(QDialog):
 
         try:
             params = json.loads(params_text) if params_text else {}
-            response = self.plugin.send_command(endpoint, method, params)
+            if method == "GET":
+                response = self.plugin.get_cached(endpoint, params)
+            else:
+                response = self.plugin.send_command(endpoint, method, params)
             QMessageBox.information(self, "REST API 結果", json.dumps(response, indent=4, ensure_ascii=False))
             self.logger.info(f"REST API response: {response.get('message', response)}")
         except json.JSONDecodeError:
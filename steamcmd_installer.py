@@ -0,0 +1,110 @@
+import logging
+from PySide6.QtWidgets import QVBoxLayout, QLabel, QPushButton, QDialog, QMessageBox, QProgressBar
+from PySide6.QtCore import Qt, QThread, Signal
+from lib.steamcmd_download import install_steamcmd, STEAMCMD_URL
+from lib.steamcmd_runner import ProgressThrottle
+
+
+class SteamCmdInstallDialog(QDialog):
+    """
+    SteamCMD のダウンロードとインストールを行うダイアログ
+    ダウンロードはバックグラウンドスレッドで行い、進捗をプログレスバーに表示する
+    """
+
+    def __init__(self, install_dir: str, url: str = STEAMCMD_URL, expected_sha256: str = None, parent=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        super().__init__(parent)
+        self.setWindowTitle("SteamCMD インストール")
+        self.setFixedSize(400, 150)
+        self.install_dir = install_dir
+
+        layout = QVBoxLayout()
+        layout.setAlignment(Qt.AlignTop)  # 縦軸の要素を上詰めに設定
+
+        self.status_label = QLabel(f"SteamCMD を {install_dir} にインストールしています...")
+        layout.addWidget(self.status_label)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 0)  # サイズが分かるまではビジー表示
+        layout.addWidget(self.progress_bar)
+
+        self.cancel_button = QPushButton("キャンセル")
+        self.cancel_button.clicked.connect(self.on_cancel_clicked)
+        layout.addWidget(self.cancel_button)
+        self.setLayout(layout)
+
+        self.install_thread = SteamCmdInstallThread(install_dir, url, expected_sha256, self)
+        self.install_thread.progress_received.connect(self.on_progress)
+        self.install_thread.finished_signal.connect(self.on_finished)
+
+    def exec(self):
+        self.install_thread.start()
+        return super().exec()
+
+    def on_progress(self, received, total):
+        """進捗を反映"""
+        if total > 0:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(received * 1000 / total))
+            self.progress_bar.setFormat(f"{received / 1024 / 1024:.1f} / {total / 1024 / 1024:.1f} MB")
+        else:
+            self.progress_bar.setFormat(f"{received / 1024 / 1024:.1f} MB")
+
+    def on_finished(self, success, message):
+        """インストール完了時の処理"""
+        self.install_thread.wait()
+        if success:
+            QMessageBox.information(self, "成功", "SteamCMD をインストールしました！")
+            self.accept()
+        else:
+            self.logger.error(f"Failed to download and install SteamCMD: {message}")
+            QMessageBox.critical(self, "エラー", f"SteamCMD のインストールに失敗しました: {message}")
+            self.reject()
+
+    def on_cancel_clicked(self):
+        """キャンセル（ダウンロード途中のファイルは残し、次回続きから再開する）"""
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText("キャンセルしています...")
+        self.install_thread.requestInterruption()
+
+    def closeEvent(self, event):
+        """インストール中はウィンドウを閉じない（スレッド破棄によるクラッシュ防止）"""
+        if self.install_thread.isRunning():
+            self.on_cancel_clicked()
+            event.ignore()
+            return
+        super().closeEvent(event)
+
+    def reject(self):
+        # Escキーで閉じられた場合もスレッドの終了を待つ
+        if self.install_thread.isRunning():
+            self.on_cancel_clicked()
+            return
+        super().reject()
+
+
+class SteamCmdInstallThread(QThread):
+    """steamcmd.zip をダウンロード・展開し、進捗をシグナルで通知するスレッド"""
+    progress_received = Signal(int, int)    # 受信済みバイト数, 全体のバイト数（不明な場合は0）
+    finished_signal = Signal(bool, str)     # 成否, メッセージ
+
+    def __init__(self, install_dir: str, url: str, expected_sha256: str = None, parent=None):
+        super().__init__(parent)
+        self.install_dir = install_dir
+        self.url = url
+        self.expected_sha256 = expected_sha256
+        self.throttle = ProgressThrottle(0.1)
+
+    def on_progress(self, received, total):
+        if self.throttle.ready(force=received == total):
+            self.progress_received.emit(received, total or 0)
+
+    def run(self):
+        try:
+            result = install_steamcmd(
+                self.install_dir, self.url, self.expected_sha256,
+                on_progress=self.on_progress, should_cancel=self.isInterruptionRequested
+            )
+            self.finished_signal.emit(True, f"{result['files']} files, sha256={result['sha256']}")
+        except Exception as e:
+            self.finished_signal.emit(False, str(e))
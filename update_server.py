@@ -1,11 +1,12 @@
 import logging
 import os
 import json
-from PySide6.QtWidgets import QVBoxLayout, QLabel, QPushButton, QDialog, QMessageBox, QTextEdit
+from PySide6.QtWidgets import QVBoxLayout, QLabel, QPushButton, QDialog, QMessageBox, QTextEdit, QProgressBar
 from PySide6.QtCore import Qt, QThread, Signal
 import subprocess
 from lib.appconfig import AppConfig
 from lib.config import Config
+from lib.steamcmd_runner import build_update_command, run_steamcmd, ProgressThrottle, format_progress
 
 class ServerUpdateWindow(QDialog):
     def __init__(self, parent=None):
@@ -34,10 +35,18 @@ class ServerUpdateWindow(QDialog):
         server_info = QLabel(f"■サーバー情報\nサーバーディレクトリ: {self.install_dir}\nアプリID: {self.app_id}")
         layout.addWidget(server_info)
 
+        # 進捗バー（steamcmdの出力から解析した進捗を表示）
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("")
+        layout.addWidget(self.progress_bar)
+
         layout.addSpacing(20)
-        update_button = QPushButton("処理開始")
-        update_button.clicked.connect(self.run_update)
-        layout.addWidget(update_button)
+        self.update_button = QPushButton("処理開始")
+        self.update_button.clicked.connect(self.run_update)
+        layout.addWidget(self.update_button)
+        self.update_thread = None
 
         self.setLayout(layout)
 
@@ -52,31 +61,54 @@ class ServerUpdateWindow(QDialog):
         return {}
 
     def run_update(self):
-        """サーバーのアップデート処理を実行"""
-        try:
-            # 必要な設定値を取得
-            steamcmd_path = self.config.get("steamcmd_path", "")
-            if not steamcmd_path or not os.path.exists(os.path.join(steamcmd_path, "steamcmd.exe")):
-                QMessageBox.critical(self, "エラー", "SteamCMD のパスが無効です。設定を確認してください。")
-                return
-
-            self.status_label.setText("処理中...")
-            steamcmd_exe = os.path.join(steamcmd_path, "steamcmd.exe")
-            cmd = f"{steamcmd_exe} +force_install_dir {self.install_dir} +login anonymous +app_update {self.app_id} validate +quit"
-            QMessageBox.warning(None, "Notice", "cmd: " + cmd)
-            subprocess.run(cmd, check=True)
-        except Exception as e:
-            # エラーコードを判定
-            if hasattr(e, "returncode"):
-                if e.returncode == 7:
-                    QMessageBox.warning(None, "警告", "SteamCMD でエラーが発生しました: ステータスコード 7")
-                else:
-                    QMessageBox.critical(None, "エラー", f"コマンドが失敗しました: ステータスコード {e.returncode}")
-            else:
-                QMessageBox.critical(None, "エラー", f"コマンドが失敗しました: {str(e)}")
+        """サーバーのアップデート処理をバックグラウンドで実行（UIはブロックしない）"""
+        # 必要な設定値を取得
+        steamcmd_path = self.config.get("steamcmd_path", "")
+        if not steamcmd_path or not os.path.exists(os.path.join(steamcmd_path, "steamcmd.exe")):
+            QMessageBox.critical(self, "エラー", "SteamCMD のパスが無効です。設定を確認してください。")
+            return
 
-        QMessageBox.information(None, "成功", "コマンドが正常に実行されました！")
+        if self.update_thread and self.update_thread.isRunning():
+            return
 
+        self.status_label.setText("処理中...")
+        self.update_button.setEnabled(False)
+        cmd = build_update_command(steamcmd_path, self.install_dir, self.app_id)
+        self.logger.info("steamcmd: " + " ".join(cmd))
+
+        self.update_thread = SteamCmdUpdateThread(cmd, self)
+        self.update_thread.progress_received.connect(self.on_update_progress)
+        self.update_thread.finished_signal.connect(self.on_update_finished)
+        self.update_thread.start()
+
+    def closeEvent(self, event):
+        """アップデート中はウィンドウを閉じない（スレッド破棄によるクラッシュ防止）"""
+        if self.update_thread and self.update_thread.isRunning():
+            QMessageBox.warning(self, "警告", "アップデート中です。完了までお待ちください。")
+            event.ignore()
+            return
+        super().closeEvent(event)
+
+    def on_update_progress(self, percent, text):
+        """進捗を反映"""
+        self.progress_bar.setValue(int(percent * 10))
+        self.progress_bar.setFormat(f"{percent:.1f}%")
+        self.status_label.setText(text)
+
+    def on_update_finished(self, returncode, tail):
+        """アップデート完了時の処理"""
+        self.update_button.setEnabled(True)
+        if returncode == 0:
+            self.progress_bar.setValue(self.progress_bar.maximum())
+            self.progress_bar.setFormat("100%")
+            self.status_label.setText("完了しました。")
+            QMessageBox.information(self, "成功", "コマンドが正常に実行されました！")
+        elif returncode == 7:
+            self.status_label.setText("SteamCMD でエラーが発生しました。")
+            QMessageBox.warning(self, "警告", f"SteamCMD でエラーが発生しました: ステータスコード 7\n\n{tail}")
+        else:
+            self.status_label.setText("失敗しました。")
+            QMessageBox.critical(self, "エラー", f"コマンドが失敗しました: ステータスコード {returncode}\n\n{tail}")
 
     def run_update_with_output_window(self):
         """コマンドを実行し、リアルタイムで別ウィンドウに出力"""
@@ -145,3 +177,24 @@ class CommandThread(QThread):
         except Exception as e:
             self.output_received.emit(f"エラー: {str(e)}")
             self.finished_signal.emit(-1)
+
+class SteamCmdUpdateThread(QThread):
+    """steamcmd を実行し、解析した進捗をシグナルで通知するスレッド"""
+    progress_received = Signal(float, str)  # 進捗率(%), 表示用テキスト
+    finished_signal = Signal(int, str)      # 終了コード, 出力の末尾
+
+    def __init__(self, cmd, parent=None):
+        super().__init__(parent)
+        self.cmd = cmd
+        self.throttle = ProgressThrottle(0.25)
+
+    def on_event(self, event):
+        if event["type"] == "progress" and self.throttle.ready(force=event["percent"] >= 100):
+            self.progress_received.emit(event["percent"], format_progress(event))
+
+    def run(self):
+        try:
+            result = run_steamcmd(self.cmd, self.on_event)
+            self.finished_signal.emit(result.returncode, result.tail_text(10))
+        except Exception as e:
+            self.finished_signal.emit(-1, f"エラー: {str(e)}")